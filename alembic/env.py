@@ -23,6 +23,10 @@ if config.config_file_name is not None:
 from app.models.models import Base
 target_metadata = Base.metadata
 
+# Migrate the same database the app uses (DATABASE_URL)
+from app.core.config import settings
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -0,0 +1,38 @@
+"""Add hot lookup indexes
+
+Revision ID: 3f9a2b7c1d4e
+Revises: c71e15249cb7
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a2b7c1d4e'
+down_revision: Union[str, Sequence[str], None] = 'c71e15249cb7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_referrals_referred_by_referred_user_id', 'referrals', ['referred_by', 'referred_user_id'], unique=False)
+    op.create_index('ix_referrals_referred_user_id', 'referrals', ['referred_user_id'], unique=False)
+    op.create_index('ix_referrals_created_at', 'referrals', ['created_at'], unique=False)
+    op.create_index('ix_reward_ledger_user_id_status', 'reward_ledger', ['user_id', 'status'], unique=False)
+    op.create_index('ix_reward_ledger_user_id_created_at', 'reward_ledger', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_reward_ledger_status_created_at', 'reward_ledger', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reward_ledger_status_created_at', table_name='reward_ledger')
+    op.drop_index('ix_reward_ledger_user_id_created_at', table_name='reward_ledger')
+    op.drop_index('ix_reward_ledger_user_id_status', table_name='reward_ledger')
+    op.drop_index('ix_referrals_created_at', table_name='referrals')
+    op.drop_index('ix_referrals_referred_user_id', table_name='referrals')
+    op.drop_index('ix_referrals_referred_by_referred_user_id', table_name='referrals')
@@ -0,0 +1,30 @@
+"""Add activity analytics indexes
+
+Revision ID: 8b41d0e6a2f5
+Revises: 3f9a2b7c1d4e
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b41d0e6a2f5'
+down_revision: Union[str, Sequence[str], None] = '3f9a2b7c1d4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_referrals_used_at', 'referrals', ['used_at'], unique=False)
+    op.create_index('ix_reward_ledger_created_at', 'reward_ledger', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reward_ledger_created_at', table_name='reward_ledger')
+    op.drop_index('ix_referrals_used_at', table_name='referrals')
@@ -0,0 +1,42 @@
+"""Add reward outbox
+
+Revision ID: b3d8f1a5c7e2
+Revises: a9c4e2f6d8b1
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d8f1a5c7e2'
+down_revision: Union[str, Sequence[str], None] = 'a9c4e2f6d8b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reward_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reward_id', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('claimed_by', sa.String(), nullable=True),
+    sa.Column('claimed_until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['reward_id'], ['reward_ledger.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reward_outbox_available_at', 'reward_outbox', ['available_at'], unique=False)
+    op.create_index('ix_reward_outbox_claimed_by', 'reward_outbox', ['claimed_by'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reward_outbox_claimed_by', table_name='reward_outbox')
+    op.drop_index('ix_reward_outbox_available_at', table_name='reward_outbox')
+    op.drop_table('reward_outbox')
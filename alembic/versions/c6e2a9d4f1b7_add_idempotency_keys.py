@@ -0,0 +1,37 @@
+"""Add idempotency keys
+
+Revision ID: c6e2a9d4f1b7
+Revises: b3d8f1a5c7e2
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e2a9d4f1b7'
+down_revision: Union[str, Sequence[str], None] = 'b3d8f1a5c7e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('idempotency_keys',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('request_hash', sa.String(length=64), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('response', sa.Text(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index('ix_idempotency_keys_expires_at', 'idempotency_keys', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_idempotency_keys_expires_at', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
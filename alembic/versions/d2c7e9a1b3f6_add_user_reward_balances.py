@@ -0,0 +1,47 @@
+"""Add user reward balances
+
+Revision ID: d2c7e9a1b3f6
+Revises: 8b41d0e6a2f5
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2c7e9a1b3f6'
+down_revision: Union[str, Sequence[str], None] = '8b41d0e6a2f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_reward_balances',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('reward_unit', sa.String(), nullable=False),
+    sa.Column('pending', sa.Integer(), nullable=False),
+    sa.Column('credited', sa.Integer(), nullable=False),
+    sa.Column('revoked', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'reward_unit')
+    )
+    # Backfill from the ledger so balances are correct from the first read
+    op.execute("""
+        INSERT INTO user_reward_balances (user_id, reward_unit, pending, credited, revoked)
+        SELECT user_id, reward_unit,
+               SUM(CASE WHEN status = 'PENDING' THEN reward_value ELSE 0 END),
+               SUM(CASE WHEN status = 'CREDITED' THEN reward_value ELSE 0 END),
+               SUM(CASE WHEN status = 'REVOKED' THEN reward_value ELSE 0 END)
+        FROM reward_ledger
+        GROUP BY user_id, reward_unit
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_reward_balances')
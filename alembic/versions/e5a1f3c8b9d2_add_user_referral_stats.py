@@ -0,0 +1,53 @@
+"""Add user referral stats
+
+Revision ID: e5a1f3c8b9d2
+Revises: d2c7e9a1b3f6
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1f3c8b9d2'
+down_revision: Union[str, Sequence[str], None] = 'd2c7e9a1b3f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_referral_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('referral_code', sa.String(), nullable=True),
+    sa.Column('codes_issued', sa.Integer(), nullable=False),
+    sa.Column('codes_used', sa.Integer(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Backfill from referrals; the user's code is the first one issued
+    op.execute("""
+        INSERT INTO user_referral_stats (user_id, referral_code, codes_issued, codes_used, last_used_at)
+        SELECT per_user.referred_by, referrals.referral_code,
+               per_user.codes_issued, per_user.codes_used, per_user.last_used_at
+        FROM (
+            SELECT referred_by,
+                   COUNT(id) AS codes_issued,
+                   COUNT(referred_user_id) AS codes_used,
+                   MAX(used_at) AS last_used_at,
+                   MIN(id) AS first_id
+            FROM referrals
+            GROUP BY referred_by
+        ) AS per_user
+        JOIN referrals ON referrals.id = per_user.first_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_referral_stats')
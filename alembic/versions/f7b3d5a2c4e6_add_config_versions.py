@@ -0,0 +1,33 @@
+"""Add config versions
+
+Revision ID: f7b3d5a2c4e6
+Revises: e5a1f3c8b9d2
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b3d5a2c4e6'
+down_revision: Union[str, Sequence[str], None] = 'e5a1f3c8b9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('config_versions',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('config_versions')
@@ -1,91 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Annotated
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Annotated, Literal
+from app.core import database
+from app.core.config import settings
+from app.core.database import DBSession, get_db, run_db
+from app.core.rate_limit import rate_limiter
 from app.core.security import require_admin
+from app.crud import admin as admin_crud
+from app.crud import outbox as outbox_crud
 from app.crud import referral as referral_crud
 from app.crud import reward as reward_crud
-from app.models.models import User, Referral, RewardLedger
-from sqlalchemy import func, desc
+from app.crud.referral_graph import referral_graph
+from app.crud.reward_config import reward_config_cache
+from app.crud.user import username_cache
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 @router.get("/dashboard")
-def get_admin_dashboard(
-    db: Session = Depends(get_db),
+async def get_admin_dashboard(
+    db: DBSession = Depends(get_db),
     admin: Annotated[bool, Depends(require_admin)] = None
 ):
-    """Get comprehensive admin dashboard stats"""
-    
-    # Total users
-    total_users = db.query(User).count()
-    
-    # Total referrals
-    total_referrals = db.query(Referral).count()
-    
-    # Successful referrals
-    successful_referrals = db.query(Referral).filter(
-        Referral.referred_user_id.isnot(None)
-    ).count()
-    
-    # Conversion rate
-    conversion_rate = 0
-    if total_referrals > 0:
-        conversion_rate = (successful_referrals / total_referrals) * 100
-    
-    # Total rewards
-    total_rewards = db.query(RewardLedger).count()
-    pending_rewards = db.query(RewardLedger).filter(
-        RewardLedger.status == "PENDING"
-    ).count()
-    credited_rewards = db.query(RewardLedger).filter(
-        RewardLedger.status == "CREDITED"
-    ).count()
-    
-    # Total reward value
-    total_value = db.query(func.sum(RewardLedger.reward_value)).filter(
-        RewardLedger.status == "CREDITED"
-    ).scalar() or 0
+    """Get comprehensive admin dashboard stats (served from a short-lived snapshot)"""
+    snapshot = admin_crud.dashboard_snapshot.get()
+    if snapshot is None:
+        generation = admin_crud.dashboard_snapshot.generation
+        stats = await run_db(db, admin_crud.get_dashboard_stats)
+        snapshot = admin_crud.dashboard_snapshot.put(stats, generation)
+    stats, taken_at, age = snapshot
     
     return {
-        "total_users": total_users,
-        "total_referrals": total_referrals,
-        "successful_referrals": successful_referrals,
-        "conversion_rate": f"{conversion_rate:.1f}%",
-        "total_rewards": total_rewards,
-        "pending_rewards": pending_rewards,
-        "credited_rewards": credited_rewards,
-        "total_reward_value": total_value
+        **stats,
+        "snapshot_taken_at": taken_at,
+        "snapshot_age_seconds": round(age, 3)
     }
 
 @router.get("/analytics/daily")
-def get_daily_analytics(
-    db: Session = Depends(get_db),
+async def get_daily_analytics(
+    days: int = Query(30, ge=1, le=366),
+    granularity: Literal["hour", "day", "week"] = "day",
+    db: DBSession = Depends(get_db),
     admin: Annotated[bool, Depends(require_admin)] = None
 ):
-    """Get daily analytics for charting"""
-    # Get referrals per day (last 30 days)
-    from datetime import datetime, timedelta
-    import json
-    
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=30)
-    
-    # This is a simplified version - in production you'd use proper date grouping
-    referrals = db.query(Referral).filter(
-        Referral.created_at >= start_date
-    ).all()
-    
-    # Group by date
-    daily_counts = {}
-    for ref in referrals:
-        date_str = ref.created_at.date().isoformat() if ref.created_at else end_date.date().isoformat()
-        daily_counts[date_str] = daily_counts.get(date_str, 0) + 1
-    
-    # Format for chart
-    chart_data = [
-        {"date": date, "count": count}
-        for date, count in sorted(daily_counts.items())
-    ]
-    
-    return chart_data
\ No newline at end of file
+    """
+    Get referral activity for charting: created, used and rewarded counts per
+    hour/day/week bucket over the last `days`, zero-filled.
+    `count` mirrors `created` for existing chart clients.
+    """
+    return await run_db(db, admin_crud.get_activity_series, days, granularity)
+
+@router.get("/diagnostics/db")
+async def get_db_diagnostics(
+    db: DBSession = Depends(get_db),
+    admin: Annotated[bool, Depends(require_admin)] = None
+):
+    """Get effective database configuration and live connection pool statistics"""
+    return {
+        "database_url": database.engine.url.render_as_string(hide_password=True),
+        "db_mode": settings.DB_MODE,
+        "pool": database.pool_status(database.engine),
+        "async_pool": database.pool_status(database.async_engine.sync_engine) if database.async_engine else None,
+        "sqlite_pragmas": await run_db(db, database.read_sqlite_pragmas)
+    }
+
+@router.get("/diagnostics/cache")
+async def get_cache_diagnostics(admin: Annotated[bool, Depends(require_admin)] = None):
+    """Get hit/miss counters for the process-local caches"""
+    return {
+        "reward_configs": reward_config_cache.stats(),
+        "usernames": username_cache.stats(),
+        "rate_limits": rate_limiter.stats(),
+        "referral_graph": referral_graph.stats()
+    }
+
+@router.get("/diagnostics/outbox")
+async def get_outbox_diagnostics(
+    db: DBSession = Depends(get_db),
+    admin: Annotated[bool, Depends(require_admin)] = None
+):
+    """Get the auto-credit outbox queue depth"""
+    return await run_db(db, outbox_crud.get_outbox_stats)
@@ -1,46 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from typing import Optional
+from app.core.config import settings
+from app.core.database import DBSession, get_db, run_db
+from app.core.idempotency import idempotent
+from app.core.http_cache import etag_matches, not_modified, set_cache_headers, version_etag
+from app.core.pagination import ndjson_response, rows_page_response
 from app.crud import referral as crud
-from app.schemas.referral import ReferralApplyRequest, ReferralSummaryResponse, ReferralListItem
+from app.crud.user import get_user_version
+from app.schemas.referral import (
+    ReferralApplyRequest, ReferralBulkApplyRequest, ReferralBulkApplyResult,
+    ReferralSummaryResponse, ReferralListItem
+)
 
 router = APIRouter(prefix="/api/referral", tags=["referral"])
 
+# Columns of the list rows that make up ReferralListItem
+REFERRAL_LIST_FIELDS = tuple(ReferralListItem.model_fields)
+
 @router.post("/generate")
-def generate_referral_code(user_id: str, db: Session = Depends(get_db)):
+async def generate_referral_code(user_id: str, db: DBSession = Depends(get_db)):
     """Generate a referral code for user"""
     try:
-        result = crud.get_or_create_referral_code(db, username=user_id)
+        result = await run_db(db, crud.get_or_create_referral_code, username=user_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/apply")
-def apply_referral_code(
+async def apply_referral_code(
     request: ReferralApplyRequest, 
     user_id: str, 
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
 ):
-    """Apply a referral code"""
+    """Apply a referral code; retries with the same Idempotency-Key get the first response back"""
+    async def apply(run):
+        try:
+            result = await run(crud.apply_referral_code, user_id=user_id, code=request.referral_code)
+            return result
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    payload = {"user_id": user_id, "referral_code": request.referral_code}
+    return await idempotent(db, idempotency_key, "referral.apply", payload, apply, owner=user_id)
+
+@router.post("/apply/bulk", response_model=list[ReferralBulkApplyResult])
+async def bulk_apply_referral_codes(request: ReferralBulkApplyRequest, db: DBSession = Depends(get_db)):
+    """Apply a batch of (user_id, referral_code) pairs in one transaction; one result per item"""
+    if len(request.items) > settings.BULK_APPLY_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_APPLY_MAX_ITEMS} items per batch"
+        )
     try:
-        result = crud.apply_referral_code(db, user_id=user_id, code=request.referral_code)
-        return result
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        items = [(item.user_id, item.referral_code) for item in request.items]
+        return await run_db(db, crud.bulk_apply_referral_codes, items)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/analytics/summary", response_model=ReferralSummaryResponse)
-def get_analytics_summary(user_id: str, db: Session = Depends(get_db)):
-    """Get analytics summary for user"""
-    return crud.get_analytics_summary(db, user_id)
+async def get_analytics_summary(user_id: str, request: Request, response: Response, db: DBSession = Depends(get_db)):
+    """Get analytics summary for user (ETag / If-None-Match aware)"""
+    etag = version_etag(await run_db(db, get_user_version, user_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    return await run_db(db, crud.get_analytics_summary, user_id)
 
 @router.get("/analytics/list", response_model=list[ReferralListItem])
-def get_referral_list(user_id: str, db: Session = Depends(get_db)):
-    """Get list of referrals for user"""
-    return crud.get_referral_list(db, user_id)
+async def get_referral_list(
+    user_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    stream: bool = False,
+    db: DBSession = Depends(get_db)
+):
+    """Get list of referrals for user (newest first, paginated via X-Next-Cursor or streamed as NDJSON)"""
+    if stream:
+        return ndjson_response(db, crud.iter_referral_list, user_id, cursor=cursor)
+    etag = version_etag(await run_db(db, get_user_version, user_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    rows = await run_db(db, crud.get_referral_list, user_id, limit=limit + 1, cursor=cursor)
+    return rows_page_response(response, rows, limit, REFERRAL_LIST_FIELDS)
+
+@router.get("/analytics/rank")
+async def get_referrer_rank(user_id: str, window_days: Optional[int] = None, db: DBSession = Depends(get_db)):
+    """Get the user's leaderboard rank, all-time or over the last `window_days` days"""
+    try:
+        return await run_db(db, crud.get_referrer_rank, user_id, window_days=window_days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/analytics/downline")
+async def get_downline_stats(user_id: str, max_depth: int = 5, db: DBSession = Depends(get_db)):
+    """Get the user's downline size per level up to `max_depth`, and their largest direct-referral subtrees"""
+    try:
+        return await run_db(db, crud.get_downline_stats, user_id, max_depth=max_depth)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/analytics/chain")
+async def get_referral_chain(user_id: str, db: DBSession = Depends(get_db)):
+    """Get who referred the user, who referred them, and so on"""
+    return await run_db(db, crud.get_referral_chain, user_id)
 
 @router.get("/admin/top")
-def get_top_referrers(db: Session = Depends(get_db)):
-    """Get top referrers leaderboard (admin)"""
-    return crud.get_top_referrers(db)
\ No newline at end of file
+async def get_top_referrers(
+    limit: int = Query(10, ge=1, le=settings.MAX_PAGE_SIZE),
+    window_days: Optional[int] = None,
+    db: DBSession = Depends(get_db)
+):
+    """Get top referrers leaderboard (admin), all-time or over the last `window_days` days"""
+    try:
+        return await run_db(db, crud.get_top_referrers, limit=limit, window_days=window_days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -1,74 +1,150 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Annotated, List
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from typing import Annotated, List, Optional
+from app.core.config import settings
+from app.core.database import DBSession, get_db, run_db
+from app.core.idempotency import idempotent
+from app.core.http_cache import etag_matches, not_modified, set_cache_headers, version_etag
+from app.core.pagination import ndjson_response, rows_page_response
 from app.core.security import require_admin
 from app.crud import reward as reward_crud
-from app.schemas.reward import RewardSummaryResponse, RewardHistoryItem, RewardConfigResponse
+from app.crud.user import get_user_version
+from app.schemas.reward import (
+    RewardSummaryResponse, RewardHistoryItem, RewardConfigResponse,
+    RewardBulkActionRequest, RewardBulkActionResponse
+)
 
 router = APIRouter(prefix="/api/rewards", tags=["rewards"])
 
+REWARD_HISTORY_FIELDS = tuple(RewardHistoryItem.model_fields)
+
 # User routes
 @router.get("/summary", response_model=RewardSummaryResponse)
-def get_reward_summary(user_id: str, db: Session = Depends(get_db)):
-    """Get reward summary for user"""
-    return reward_crud.get_reward_summary(db, user_id)
+async def get_reward_summary(user_id: str, request: Request, response: Response, db: DBSession = Depends(get_db)):
+    """Get reward summary for user (ETag / If-None-Match aware)"""
+    etag = version_etag(await run_db(db, get_user_version, user_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    return await run_db(db, reward_crud.get_reward_summary, user_id)
 
 @router.get("/history", response_model=List[RewardHistoryItem])
-def get_reward_history(user_id: str, db: Session = Depends(get_db)):
-    """Get reward history for user"""
-    return reward_crud.get_reward_history(db, user_id)
+async def get_reward_history(
+    user_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    stream: bool = False,
+    db: DBSession = Depends(get_db)
+):
+    """Get reward history for user (newest first, paginated via X-Next-Cursor or streamed as NDJSON)"""
+    if stream:
+        return ndjson_response(db, reward_crud.iter_reward_history, user_id, cursor=cursor)
+    etag = version_etag(await run_db(db, get_user_version, user_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    rows = await run_db(db, reward_crud.get_reward_history, user_id, limit=limit + 1, cursor=cursor)
+    return rows_page_response(response, rows, limit, REWARD_HISTORY_FIELDS)
 
 # Admin routes
 @router.get("/admin/pending")
-def get_pending_rewards(
-    db: Session = Depends(get_db),
+async def get_pending_rewards(
+    response: Response,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    stream: bool = False,
+    db: DBSession = Depends(get_db),
     admin: Annotated[bool, Depends(require_admin)] = None
 ):
-    """Get pending rewards for admin approval"""
-    return reward_crud.get_pending_rewards(db)
+    """Get pending rewards for admin approval (newest first, paginated via X-Next-Cursor or streamed as NDJSON)"""
+    if stream:
+        return ndjson_response(db, reward_crud.iter_pending_rewards, cursor=cursor)
+    rows = await run_db(db, reward_crud.get_pending_rewards, limit=limit + 1, cursor=cursor)
+    return rows_page_response(response, rows, limit)
 
-@router.post("/admin/rewards/{reward_id}/credit")
-def credit_reward(
-    reward_id: int,
-    db: Session = Depends(get_db),
+def _bulk_selection(request: RewardBulkActionRequest) -> dict:
+    if request.ids is None and request.reward_type is None and request.created_from is None and request.created_to is None:
+        raise HTTPException(status_code=400, detail="Provide ids or at least one filter (reward_type, created_from, created_to)")
+    return {
+        "ids": request.ids,
+        "reward_type": request.reward_type,
+        "created_from": request.created_from,
+        "created_to": request.created_to
+    }
+
+@router.post("/admin/rewards/bulk-credit", response_model=RewardBulkActionResponse)
+async def bulk_credit_rewards(
+    request: RewardBulkActionRequest,
+    db: DBSession = Depends(get_db),
+    admin: Annotated[bool, Depends(require_admin)] = None
+):
+    """Credit all PENDING rewards matching ids or filter in one guarded UPDATE"""
+    if request.status != "PENDING":
+        raise HTTPException(status_code=400, detail="Only PENDING rewards can be credited")
+    return await run_db(db, reward_crud.bulk_credit_rewards, **_bulk_selection(request))
+
+@router.post("/admin/rewards/bulk-revoke", response_model=RewardBulkActionResponse)
+async def bulk_revoke_rewards(
+    request: RewardBulkActionRequest,
+    db: DBSession = Depends(get_db),
     admin: Annotated[bool, Depends(require_admin)] = None
 ):
-    """Credit a pending reward"""
+    """Revoke all rewards in `status` (PENDING by default) matching ids or filter in one guarded UPDATE"""
     try:
-        reward_crud.credit_reward(db, reward_id)
-        return {"status": "success", "message": f"Reward {reward_id} credited"}
+        return await run_db(db, reward_crud.bulk_revoke_rewards, status=request.status, **_bulk_selection(request))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/admin/rewards/{reward_id}/credit")
+async def credit_reward(
+    reward_id: int,
+    db: DBSession = Depends(get_db),
+    admin: Annotated[bool, Depends(require_admin)] = None,
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
+    """Credit a pending reward (Idempotency-Key aware)"""
+    async def credit(run):
+        try:
+            await run(reward_crud.credit_reward, reward_id)
+            return {"status": "success", "message": f"Reward {reward_id} credited"}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    return await idempotent(db, idempotency_key, "reward.credit", {"reward_id": reward_id}, credit)
+
 @router.post("/admin/rewards/{reward_id}/revoke")
-def revoke_reward(
+async def revoke_reward(
     reward_id: int,
-    db: Session = Depends(get_db),
-    admin: Annotated[bool, Depends(require_admin)] = None
+    db: DBSession = Depends(get_db),
+    admin: Annotated[bool, Depends(require_admin)] = None,
+    idempotency_key: Optional[str] = Header(None, max_length=255)
 ):
-    """Revoke a reward"""
-    try:
-        reward_crud.revoke_reward(db, reward_id)
-        return {"status": "success", "message": f"Reward {reward_id} revoked"}
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    """Revoke a reward (Idempotency-Key aware)"""
+    async def revoke(run):
+        try:
+            await run(reward_crud.revoke_reward, reward_id)
+            return {"status": "success", "message": f"Reward {reward_id} revoked"}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    return await idempotent(db, idempotency_key, "reward.revoke", {"reward_id": reward_id}, revoke)
 
 @router.post("/admin/config", response_model=RewardConfigResponse)
-def create_reward_config(
+async def create_reward_config(
     reward_type: str,
     reward_value: int,
     reward_unit: str = "points",
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_db),
     admin: Annotated[bool, Depends(require_admin)] = None
 ):
     """Create or update reward configuration"""
-    return reward_crud.create_reward_config(db, reward_type, reward_value, reward_unit)
+    return await run_db(db, reward_crud.create_reward_config, reward_type, reward_value, reward_unit)
 
 @router.get("/admin/configs", response_model=List[RewardConfigResponse])
-def list_reward_configs(
-    db: Session = Depends(get_db),
+async def list_reward_configs(
+    db: DBSession = Depends(get_db),
     admin: Annotated[bool, Depends(require_admin)] = None
 ):
     """Get all reward configurations"""
-    return reward_crud.get_all_reward_configs(db)
\ No newline at end of file
+    return await run_db(db, reward_crud.get_all_reward_configs)
\ No newline at end of file
@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Optional, Tuple
+
+class SnapshotCache:
+    """
+    Holds a single computed value for up to `ttl_seconds`.
+    Callers check get(), compute on a miss and put() the result with the
+    generation they read before computing, so a result that raced with
+    invalidate() is returned to its caller but not kept.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        # (value, taken_at, taken_monotonic), replaced atomically
+        self._snapshot: Optional[Tuple[Any, datetime, float]] = None
+        self.generation = 0
+
+    def get(self) -> Optional[Tuple[Any, datetime, float]]:
+        """Return (value, taken_at, age_seconds), or None when expired"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        value, taken_at, taken_monotonic = snapshot
+        age = time.monotonic() - taken_monotonic
+        if age >= self.ttl_seconds:
+            return None
+        return value, taken_at, age
+
+    def put(self, value: Any, generation: int) -> Tuple[Any, datetime, float]:
+        snapshot = (value, datetime.now(), time.monotonic())
+        if generation == self.generation:
+            self._snapshot = snapshot
+        return value, snapshot[1], 0.0
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self._snapshot = None
+
+class VersionedCache:
+    """
+    Process-local copy of a small, rarely changing table.
+    A hit within `check_seconds` of the last check costs nothing; after that
+    the caller's cheap version read decides whether to keep the copy, and
+    after `ttl_seconds` it is reloaded regardless. Counters feed hit-rate
+    metrics.
+    """
+
+    def __init__(self, ttl_seconds: float, check_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.check_seconds = check_seconds
+        # (value, version, loaded_monotonic, checked_monotonic), replaced atomically
+        self._entry: Optional[Tuple[Any, int, float, float]] = None
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.version_checks = 0
+
+    def get(self, read_version: Callable[[], int], load: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        entry = self._entry
+        if entry is not None and now - entry[2] < self.ttl_seconds:
+            value, version, loaded, checked = entry
+            if now - checked < self.check_seconds:
+                self.hits += 1
+                return value
+            self.version_checks += 1
+            if read_version() == version:
+                self._entry = (value, version, loaded, now)
+                self.hits += 1
+                return value
+        
+        self.misses += 1
+        generation = self.generation
+        # Version first: a change landing during load() is seen on the next check
+        version = read_version()
+        value = load()
+        if generation == self.generation:
+            self._entry = (value, version, now, now)
+        return value
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self._entry = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "version_checks": self.version_checks,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+# Returned by LRUCache.get() for absent or expired keys, so None can be cached
+MISSING = object()
+
+class LRUCache:
+    """
+    Bounded mapping with per-entry expiry; the least recently used entry is
+    evicted first. None values are negative results and expire after
+    `negative_ttl_seconds`. The lock only guards in-memory work.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, negative_ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._lock = threading.Lock()
+        # key -> (value, expires_monotonic), least recently used first
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if entry[0] is None:
+                self.negative_hits += 1
+            return entry[0]
+
+    def put(self, key, value: Any) -> None:
+        ttl = self.negative_ttl_seconds if value is None else self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
@@ -3,13 +3,113 @@ from typing import Optional
 
 class Settings:
     # Database
-    DATABASE_URL: str = "sqlite:///./referral.db"
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./referral.db")
+    # "sync" (Session in the threadpool) or "async" (AsyncSession on the event loop)
+    DB_MODE: str = os.getenv("DB_MODE", "sync")
+    
+    # Connection pool
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    
+    # SQLite tuning, applied on every new connection
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
     
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production-12345"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Referral codes: key for the sequence -> code permutation. Independent
+    # of SECRET_KEY and never to be rotated: a new key maps users to new
+    # codes, which then collide with the ones already issued.
+    REFERRAL_CODE_KEY: str = os.getenv("REFERRAL_CODE_KEY", "your-secret-key-change-in-production-12345")
+    
+    # Pagination
+    DEFAULT_PAGE_SIZE: int = 100
+    MAX_PAGE_SIZE: int = 1000
+    
+    # Largest batch accepted by /api/referral/apply/bulk
+    BULK_APPLY_MAX_ITEMS: int = 50000
+    
+    # Admin dashboard snapshot lifetime
+    DASHBOARD_CACHE_TTL_SECONDS: float = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "5"))
+    
+    # Reward configs are cached per worker: the version row is re-read at
+    # most every CHECK seconds and the whole cache reloaded after TTL
+    REWARD_CONFIG_CACHE_TTL_SECONDS: float = float(os.getenv("REWARD_CONFIG_CACHE_TTL_SECONDS", "300"))
+    REWARD_CONFIG_VERSION_CHECK_SECONDS: float = float(os.getenv("REWARD_CONFIG_VERSION_CHECK_SECONDS", "5"))
+    
+    # Username -> user id cache shared by the CRUD read paths; unknown
+    # names are remembered briefly so repeated misses skip the database
+    USERNAME_CACHE_SIZE: int = int(os.getenv("USERNAME_CACHE_SIZE", "100000"))
+    USERNAME_CACHE_TTL_SECONDS: float = float(os.getenv("USERNAME_CACHE_TTL_SECONDS", "3600"))
+    USERNAME_CACHE_NEGATIVE_TTL_SECONDS: float = float(os.getenv("USERNAME_CACHE_NEGATIVE_TTL_SECONDS", "5"))
+    
+    # Cache-Control max-age for the per-user ETagged reads (0 = always revalidate)
+    USER_CACHE_MAX_AGE_SECONDS: int = int(os.getenv("USER_CACHE_MAX_AGE_SECONDS", "0"))
+    
+    # Referral leaderboard: trailing windows served besides all-time, and
+    # how long a worker trusts its in-memory board before rebuilding it
+    LEADERBOARD_WINDOWS_DAYS: tuple = (7, 30)
+    LEADERBOARD_REBUILD_SECONDS: float = float(os.getenv("LEADERBOARD_REBUILD_SECONDS", "300"))
+    
+    # Multi-level referral analytics: deepest downline/upline walked, and the
+    # optional in-memory adjacency index (off by default; rebuilt on age like
+    # the leaderboard, which reloads every edge)
+    REFERRAL_GRAPH_MAX_DEPTH: int = int(os.getenv("REFERRAL_GRAPH_MAX_DEPTH", "20"))
+    REFERRAL_GRAPH_INDEX_ENABLED: bool = os.getenv("REFERRAL_GRAPH_INDEX_ENABLED", "false").lower() == "true"
+    REFERRAL_GRAPH_REBUILD_SECONDS: float = float(os.getenv("REFERRAL_GRAPH_REBUILD_SECONDS", "300"))
+    
+    # Request metrics at /metrics and the slow-request log
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    SLOW_REQUEST_SECONDS: float = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+    SLOW_REQUEST_MAX_STATEMENTS: int = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", "20"))
+    
+    # Startup work against DATABASE_URL: backfilling maintained tables that
+    # create_all just added, leaderboard/graph warm-up and the in-process
+    # outbox workers. The test suite turns it off.
+    STARTUP_TASKS_ENABLED: bool = os.getenv("STARTUP_TASKS_ENABLED", "true").lower() == "true"
+    
+    # Auto-credit pipeline: rewards are queued in reward_outbox and credited
+    # by background workers once held long enough, up to a value ceiling
+    # (larger rewards stay PENDING for an admin). OUTBOX_WORKERS threads run
+    # inside each API process; outbox_worker.py runs more on their own.
+    AUTO_CREDIT_MAX_VALUE: int = int(os.getenv("AUTO_CREDIT_MAX_VALUE", "100"))
+    AUTO_CREDIT_HOLD_SECONDS: float = float(os.getenv("AUTO_CREDIT_HOLD_SECONDS", "86400"))
+    OUTBOX_WORKERS: int = int(os.getenv("OUTBOX_WORKERS", "1"))
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+    OUTBOX_POLL_SECONDS: float = float(os.getenv("OUTBOX_POLL_SECONDS", "1.0"))
+    OUTBOX_LEASE_SECONDS: float = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+    
+    # Idempotency-Key on apply/credit/revoke: how long a first response is
+    # replayed, how long an unfinished request holds its key, and how often
+    # each process deletes expired keys
+    IDEMPOTENCY_TTL_SECONDS: float = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_LOCK_SECONDS: float = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+    IDEMPOTENCY_PURGE_SECONDS: float = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "300"))
+    
+    # Token-bucket rate limits per route, keyed by the user_id query
+    # parameter and by client IP: (burst capacity, refill per second).
+    # Behind a reverse proxy or load balancer, list its addresses or CIDR
+    # ranges in RATE_LIMIT_TRUSTED_PROXIES so the client IP is read from
+    # X-Forwarded-For; otherwise every client shares the proxy's IP bucket.
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    RATE_LIMIT_TRUSTED_PROXIES: tuple = tuple(
+        proxy.strip() for proxy in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if proxy.strip()
+    )
+    RATE_LIMITS: dict = {
+        ("POST", "/api/referral/generate"): {"user": (5, 5 / 60), "ip": (60, 1.0)},
+        ("POST", "/api/referral/apply"): {"user": (5, 5 / 60), "ip": (60, 1.0)},
+    }
+    
     # App
     APP_NAME: str = "Referral & Rewards API"
     DEBUG: bool = True
@@ -1,20 +1,175 @@
-
-from sqlalchemy import create_engine
+from types import SimpleNamespace
+from typing import Callable, Union
+from sqlalchemy import create_engine, event, insert, text, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+# Async drivers for each sync URL scheme
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+SQLITE_PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "mmap_size")
+
+# Values per IN (...) clause, well under SQLite's bound-parameter limit
+IN_CLAUSE_CHUNK = 500
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./referral.db"
+def async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """Pool settings from config; in-memory SQLite keeps its single-connection pool"""
+    parsed = make_url(url)
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            return options
+        if is_async:
+            # Each aiosqlite connection owns a worker thread; opening a
+            # file is cheap, so don't keep idle ones (and their threads) around
+            options["poolclass"] = NullPool
+            return options
+    options.update(
+        poolclass=AsyncAdaptedQueuePool if is_async else QueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    return options
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers proceed while the writer commits; busy_timeout waits out locks"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+def create_db_engine(url: str):
+    db_engine = create_engine(url, **engine_options(url))
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine, "connect", _apply_sqlite_pragmas)
+    return db_engine
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db():
+# What get_db yields; CRUD code always sees a sync Session via run_db
+DBSession = Union[Session, AsyncSession]
+
+# The async engine is only built in async mode so the sync deployment
+# doesn't need an async driver installed
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_MODE == "async":
+    async_engine = create_async_engine(
+        async_url(SQLALCHEMY_DATABASE_URL), **engine_options(SQLALCHEMY_DATABASE_URL, is_async=True)
+    )
+    if async_engine.dialect.name == "sqlite":
+        event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Routers depend on get_db; DB_MODE picks which session flavour it yields
+get_db = get_async_db if settings.DB_MODE == "async" else get_sync_db
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Run a CRUD function without blocking the event loop.
+    CRUD functions take a sync Session: with an AsyncSession they run via
+    run_sync (async driver I/O), otherwise in the threadpool as FastAPI
+    does for plain `def` handlers.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+def chunked(values: list, size: int = IN_CLAUSE_CHUNK):
+    """Split a list into IN-clause sized slices"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def insert_or_ignore(db: Session, table, rows, conflict_columns) -> None:
+    """
+    INSERT rows, silently skipping any that hit a unique conflict on
+    `conflict_columns` (ON CONFLICT DO NOTHING where the dialect has it).
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        db.execute(dialect_insert(table).on_conflict_do_nothing(index_elements=conflict_columns), rows)
+        return
+    for row in rows if isinstance(rows, list) else [rows]:
+        try:
+            with db.begin_nested():
+                db.execute(insert(table), row)
+        except IntegrityError:
+            pass
+
+def upsert(db: Session, table, rows, conflict_columns, set_values: Callable) -> None:
+    """
+    INSERT rows; a row that hits a unique conflict on `conflict_columns`
+    instead updates the existing one with set_values(incoming), where
+    `incoming.<column>` is the row's own value (EXCLUDED under ON CONFLICT
+    DO UPDATE where the dialect has it).
+    """
+    rows = rows if isinstance(rows, list) else [rows]
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(table)
+        db.execute(stmt.on_conflict_do_update(index_elements=conflict_columns, set_=set_values(stmt.excluded)), rows)
+        return
+    for row in rows:
+        updated = db.execute(
+            update(table).where(*(table.c[column] == row[column] for column in conflict_columns))
+            .values(**set_values(SimpleNamespace(**row)))
+        ).rowcount
+        if not updated:
+            db.execute(insert(table), row)
+
+def pool_status(db_engine) -> dict:
+    """Live pool counters; pools without sizing report only their class"""
+    pool = db_engine.pool
+    stats = {"pool_class": type(pool).__name__, "status": pool.status()}
+    for counter in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, counter):
+            stats[counter] = getattr(pool, counter)()
+    if hasattr(pool, "_max_overflow"):
+        stats["max_overflow"] = pool._max_overflow
+    return stats
+
+def read_sqlite_pragmas(db: Session) -> dict:
+    """Effective PRAGMA values on the session's connection (empty off SQLite)"""
+    if db.get_bind().dialect.name != "sqlite":
+        return {}
+    return {name: db.execute(text(f"PRAGMA {name}")).scalar() for name in SQLITE_PRAGMAS}
@@ -0,0 +1,28 @@
+from fastapi import Request, Response
+from app.core.config import settings
+
+def version_etag(version: int) -> str:
+    """Strong ETag for a representation that changes only when `version` does"""
+    return f'"v{version}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check; the weak comparison RFC 9110 prescribes for GET"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in header.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+def cache_headers(etag: str) -> dict:
+    max_age = settings.USER_CACHE_MAX_AGE_SECONDS
+    # Clients may reuse for max_age, then must revalidate; shared caches never store
+    cache_control = f"private, max-age={max_age}, must-revalidate" if max_age else "private, no-cache"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
+
+def set_cache_headers(response: Response, etag: str) -> None:
+    response.headers.update(cache_headers(etag))
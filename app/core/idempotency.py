@@ -0,0 +1,150 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import run_db
+from app.models.models import IdempotencyKey
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# monotonic time of this process's last purge of expired keys
+_last_purge = 0.0
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+def key_digest(scope: str, key: str, owner: Optional[str] = None) -> str:
+    """Keys are per caller: two users sending the same key don't collide"""
+    return _digest(f"{scope}\n{owner or ''}\n{key}")
+
+def request_digest(payload: dict) -> str:
+    return _digest(json.dumps(payload, sort_keys=True, default=str))
+
+def reserve_key(db: Session, key_id: str, request_hash: str):
+    """
+    Take key_id for a new request, or return the row already holding it.
+    The primary key settles races between simultaneous first requests;
+    an expired row (finished or abandoned) is replaced.
+    """
+    table = IdempotencyKey.__table__
+    now = datetime.now()
+    existing = db.execute(select(table).where(table.c.key == key_id)).first()
+    if existing is not None and existing.expires_at > now:
+        db.rollback()
+        return existing
+    if existing is not None:
+        db.execute(delete(table).where(table.c.key == key_id, table.c.expires_at <= now))
+    
+    try:
+        db.execute(insert(table).values(
+            key=key_id,
+            request_hash=request_hash,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+        ))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return db.execute(select(table).where(table.c.key == key_id)).first()
+    return None
+
+def run_in_key_transaction(db: Session, key_id: str, fn: Callable, args: tuple, kwargs: dict):
+    """
+    Run a CRUD function whose commits only release savepoints: its writes
+    stay in db's transaction until complete_key (or release_key) records
+    the outcome and commits both together. Work the function leaves
+    uncommitted, e.g. when it raises, is rolled back here.
+    """
+    table = IdempotencyKey.__table__
+    # Writing first puts the connection in a real transaction (pysqlite only
+    # emits BEGIN before DML), so the savepoints nest inside it
+    db.execute(update(table).where(table.c.key == key_id).values(
+        expires_at=datetime.now() + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+    ))
+    work = Session(bind=db.connection(), join_transaction_mode="create_savepoint", autoflush=False)
+    try:
+        return fn(work, *args, **kwargs)
+    finally:
+        work.close()
+
+def complete_key(db: Session, key_id: str, status_code: int, body) -> None:
+    """Store the first response with the request's writes and commit both; replayed for IDEMPOTENCY_TTL_SECONDS"""
+    table = IdempotencyKey.__table__
+    db.execute(update(table).where(table.c.key == key_id).values(
+        status_code=status_code,
+        response=json.dumps(body),
+        expires_at=datetime.now() + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+    ))
+    db.commit()
+
+def release_key(db: Session, key_id: str) -> None:
+    """Free the key after a failure nobody should be replayed; what the request committed stays committed"""
+    table = IdempotencyKey.__table__
+    db.execute(delete(table).where(table.c.key == key_id, table.c.status_code.is_(None)))
+    db.commit()
+
+def purge_expired_keys(db: Session) -> int:
+    table = IdempotencyKey.__table__
+    purged = db.execute(delete(table).where(table.c.expires_at <= datetime.now())).rowcount
+    db.commit()
+    return purged
+
+def _replay(row) -> JSONResponse:
+    if row.status_code is None:
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"}
+        )
+    return JSONResponse(json.loads(row.response), status_code=row.status_code, headers={REPLAYED_HEADER: "true"})
+
+async def idempotent(db, key: Optional[str], scope: str, payload: dict, call: Callable[[Callable], Awaitable],
+                     owner: Optional[str] = None):
+    """
+    Run `call` once per (scope, owner, Idempotency-Key). `call(run)` does
+    its database work through `run(fn, *args, **kwargs)`, which under a key
+    keeps the writes uncommitted until the response is stored with them,
+    so a crash in between leaves neither. The first response, success or
+    4xx, is replayed to retries without touching anything but
+    idempotency_keys; a 5xx frees the key for a real retry. Reusing a key
+    with a different payload is rejected with 422.
+    """
+    global _last_purge
+    if key is None:
+        return await call(lambda fn, *args, **kwargs: run_db(db, fn, *args, **kwargs))
+    
+    key_id = key_digest(scope, key, owner)
+    request_hash = request_digest(payload)
+    row = await run_db(db, reserve_key, key_id, request_hash)
+    if row is not None:
+        if row.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        return _replay(row)
+    
+    def run(fn, *args, **kwargs):
+        return run_db(db, run_in_key_transaction, key_id, fn, args, kwargs)
+    
+    try:
+        result = await call(run)
+    except HTTPException as e:
+        if e.status_code >= 500:
+            await run_db(db, release_key, key_id)
+        else:
+            await run_db(db, complete_key, key_id, e.status_code, {"detail": jsonable_encoder(e.detail)})
+        raise
+    except Exception:
+        await run_db(db, release_key, key_id)
+        raise
+    await run_db(db, complete_key, key_id, 200, jsonable_encoder(result))
+    
+    if time.monotonic() - _last_purge >= settings.IDEMPOTENCY_PURGE_SECONDS:
+        _last_purge = time.monotonic()
+        await run_db(db, purge_expired_keys)
+    return result
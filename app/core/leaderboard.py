@@ -0,0 +1,181 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+class RankedCounts:
+    """
+    Counts per key, bucketed by value so reads walk only what they return.
+    Ties keep the order in which keys reached the count.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        # count -> {key: None}, an insertion-ordered set
+        self.buckets = {}
+        # distinct counts, ascending
+        self.levels = []
+
+    def add(self, key, delta: int = 1) -> None:
+        old = self.counts.get(key, 0)
+        new = old + delta
+        if old:
+            bucket = self.buckets[old]
+            del bucket[key]
+            if not bucket:
+                del self.buckets[old]
+                self.levels.pop(bisect_left(self.levels, old))
+        if new <= 0:
+            self.counts.pop(key, None)
+            return
+        self.counts[key] = new
+        if new not in self.buckets:
+            self.buckets[new] = {}
+            insort(self.levels, new)
+        self.buckets[new][key] = None
+
+    def top(self, n: int) -> list:
+        """[(key, count)] for the n highest counts"""
+        result = []
+        for count in reversed(self.levels):
+            for key in self.buckets[count]:
+                if len(result) == n:
+                    return result
+                result.append((key, count))
+        return result
+
+    def rank(self, key) -> Optional[Tuple[int, int]]:
+        """(rank, count) with ties sharing a rank, or None when the key has no count"""
+        count = self.counts.get(key)
+        if count is None:
+            return None
+        ahead = sum(len(self.buckets[level]) for level in self.levels[bisect_right(self.levels, count):])
+        return ahead + 1, count
+
+class Leaderboard:
+    """
+    All-time and trailing-window referral counts kept in memory.
+    load() builds fresh boards and swaps them in, record() applies one
+    successful referral; windows expire old events lazily on read. One
+    rebuild runs at a time and records made while its query runs are
+    replayed into the new boards. The lock only guards in-memory work,
+    never I/O.
+    """
+
+    def __init__(self, windows_days: Iterable[int], max_age_seconds: float):
+        self.windows = {days: timedelta(days=days) for days in windows_days}
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._load_done = threading.Condition(self._lock)
+        self._loaded_at: Optional[float] = None
+        # Records made while a rebuild's query runs; None when no rebuild is in flight
+        self._pending: Optional[list] = None
+        self._all, self._windowed = self._empty_boards()
+        # user id -> username for users that have appeared on a board
+        self.names = {}
+
+    def _empty_boards(self) -> tuple:
+        return RankedCounts(), {days: (RankedCounts(), deque()) for days in self.windows}
+
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def is_stale(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at >= self.max_age_seconds
+
+    def begin_load(self) -> bool:
+        """Claim the rebuild; False if another thread already has it"""
+        with self._lock:
+            if self._pending is not None:
+                return False
+            self._pending = []
+            return True
+
+    def cancel_load(self) -> None:
+        with self._lock:
+            self._pending = None
+            self._load_done.notify_all()
+
+    def wait_loaded(self, timeout: Optional[float] = None) -> bool:
+        """Block until the rebuild in flight finishes; True if a board is loaded"""
+        with self._lock:
+            self._load_done.wait_for(lambda: self._pending is None, timeout)
+            return self._loaded_at is not None
+
+    def load(self, totals: Iterable[Tuple[int, int]], events: Iterable[Tuple[datetime, int]]) -> None:
+        """
+        Replace the boards with (user_id, count) totals and (used_at, user_id)
+        events oldest first, read after begin_load()
+        """
+        all_time, windowed = self._empty_boards()
+        seen = Counter()
+        for user_id, count in totals:
+            all_time.add(user_id, count)
+        for used_at, user_id in events:
+            self._record_windows(windowed, user_id, used_at)
+            seen[_event_key(used_at, user_id)] += 1
+        with self._lock:
+            # Applies committed after the query's snapshot would otherwise be
+            # lost; ones it already counted show up among its events
+            for used_at, user_id in self._pending or ():
+                key = _event_key(used_at, user_id)
+                if seen[key]:
+                    seen[key] -= 1
+                    continue
+                all_time.add(user_id)
+                self._record_windows(windowed, user_id, used_at)
+            self._pending = None
+            self._all, self._windowed = all_time, windowed
+            self.names = {}
+            self._loaded_at = time.monotonic()
+            self._load_done.notify_all()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+            self._pending = None
+            self._all, self._windowed = self._empty_boards()
+            self.names = {}
+            self._load_done.notify_all()
+
+    def record(self, user_id: int, used_at: datetime) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((used_at, user_id))
+            # Before the first load there is nothing to keep current
+            if self._loaded_at is None:
+                return
+            self._all.add(user_id)
+            self._record_windows(self._windowed, user_id, used_at)
+
+    @staticmethod
+    def _record_windows(windowed: dict, user_id: int, used_at: datetime) -> None:
+        for counts, events in windowed.values():
+            events.append((used_at, user_id))
+            counts.add(user_id)
+
+    def _board(self, window_days: Optional[int]) -> RankedCounts:
+        if window_days is None:
+            return self._all
+        counts, events = self._windowed[window_days]
+        cutoff = datetime.now() - self.windows[window_days]
+        while events and events[0][0] < cutoff:
+            _, user_id = events.popleft()
+            counts.add(user_id, -1)
+        return counts
+
+    def top(self, n: int, window_days: Optional[int] = None) -> list:
+        with self._lock:
+            return self._board(window_days).top(n)
+
+    def rank(self, user_id: int, window_days: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            return self._board(window_days).rank(user_id)
+
+def _event_key(used_at: datetime, user_id: int) -> tuple:
+    # Timestamps read back from a timezone-aware column carry a tzinfo
+    # that the in-process datetime.now() values don't
+    return used_at.replace(tzinfo=None), user_id
@@ -0,0 +1,176 @@
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from app.core.config import settings
+
+logger = logging.getLogger("app.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+# Label for requests no route matched, so scanners can't blow up cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+class Histogram:
+    """Prometheus-style histogram; observed only from the event loop, so unlocked"""
+
+    def __init__(self, name: str, help_text: str, labels: tuple, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._series = {}
+
+    def observe(self, label_values: tuple, value: float) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def totals(self) -> dict:
+        """label values -> (sum, count)"""
+        return {label_values: (series[1], series[2]) for label_values, series in self._series.items()}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(self._series.items()):
+            labels = ",".join(f'{key}="{_escape(value)}"' for key, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+class Gauge:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+REQUEST_LABELS = ("method", "route", "status")
+request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route.", REQUEST_LABELS, LATENCY_BUCKETS
+)
+request_statements = Histogram(
+    "http_request_sql_statements", "SQL statements executed per request.", REQUEST_LABELS, STATEMENT_BUCKETS
+)
+request_db_time = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per request.", REQUEST_LABELS, LATENCY_BUCKETS
+)
+requests_in_progress = Gauge("http_requests_in_progress", "Requests currently being served.")
+
+METRICS = (request_duration, request_statements, request_db_time, requests_in_progress)
+
+class RequestStats:
+    """SQL executed on behalf of one request; statements are kept only up to a cap"""
+    __slots__ = ("statements", "db_seconds", "captured")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.captured = []
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        if len(self.captured) < settings.SLOW_REQUEST_MAX_STATEMENTS:
+            self.captured.append((seconds, statement))
+
+# Threadpool and run_sync calls inherit it, so engine events find their request
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_started"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    started = exception_context.connection.info.get("metrics_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+def instrument_engine(db_engine) -> None:
+    """Attribute SQL statement counts and time on `db_engine` (sync or async) to the current request"""
+    sync_engine = getattr(db_engine, "sync_engine", db_engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task hop): times each HTTP
+    request through the last body chunk, so streamed responses count in
+    full, and logs requests slower than SLOW_REQUEST_SECONDS with their SQL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        requests_in_progress.value += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_progress.value -= 1
+            current_request.reset(token)
+            labels = (scope["method"], _route_template(scope), str(status[0]))
+            request_duration.observe(labels, elapsed)
+            request_statements.observe(labels, stats.statements)
+            request_db_time.observe(labels, stats.db_seconds)
+            if elapsed >= settings.SLOW_REQUEST_SECONDS:
+                _log_slow_request(scope, status[0], elapsed, stats)
+
+def _log_slow_request(scope, status: int, elapsed: float, stats: RequestStats) -> None:
+    slowest = sorted(stats.captured, key=lambda item: item[0], reverse=True)
+    statements = "\n".join(f"  {seconds * 1000:8.2f} ms  {' '.join(sql.split())}" for seconds, sql in slowest)
+    logger.warning(
+        "slow request %s %s -> %s in %.1f ms: %d SQL statements, %.1f ms in database\n%s",
+        scope["method"], scope["path"], status, elapsed * 1000, stats.statements, stats.db_seconds * 1000,
+        statements
+    )
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,87 @@
+from operator import itemgetter
+from typing import Callable, Iterable, Optional
+import orjson
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import SessionLocal
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+STREAM_BATCH_SIZE = 500
+
+def keyset_filter(model, cursor: int):
+    """
+    Rows strictly after `cursor` in (created_at DESC, id DESC) order.
+    The cursor is the id of the last row of the previous page; its created_at
+    is read back by the database so values are compared in storage format.
+    """
+    cursor_created_at = select(model.created_at).where(model.id == cursor).scalar_subquery()
+    return or_(
+        model.created_at < cursor_created_at,
+        and_(model.created_at == cursor_created_at, model.id < cursor)
+    )
+
+def paginate(query, model, limit: Optional[int] = None, cursor: Optional[int] = None):
+    """Order a query newest first and apply the keyset cursor and page size"""
+    if cursor is not None:
+        query = query.filter(keyset_filter(model, cursor))
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def page_response(response: Response, items: list, limit: int) -> list:
+    """
+    Trim a `limit + 1` fetch to one page and advertise the next cursor.
+    The body stays a plain list; the cursor travels in X-Next-Cursor.
+    """
+    if len(items) <= limit:
+        return items
+    items = items[:limit]
+    last = items[-1]
+    response.headers[NEXT_CURSOR_HEADER] = str(last["id"] if isinstance(last, dict) else last.id)
+    return items
+
+def ndjson_response(db, iter_rows: Callable[..., Iterable[dict]], *args, **kwargs) -> StreamingResponse:
+    """
+    Stream `iter_rows(session, ...)` as newline-delimited JSON, one object
+    per line. Starlette drives the generator in the threadpool, so it needs
+    a sync Session; in async mode a dedicated one is opened for the stream.
+    """
+    def encode():
+        session = SessionLocal() if isinstance(db, AsyncSession) else db
+        try:
+            for row in iter_rows(session, *args, **kwargs):
+                yield orjson.dumps(row) + b"\n"
+        finally:
+            if session is not db:
+                session.close()
+    return StreamingResponse(encode(), media_type="application/x-ndjson")
+
+def encode_rows(rows: list, fields: Optional[tuple] = None) -> bytes:
+    """JSON array of objects with `fields` (default: every column) picked by name from SQLAlchemy rows"""
+    if not rows:
+        return b"[]"
+    columns = rows[0]._fields
+    fields = tuple(fields or columns)
+    positions = [columns.index(field) for field in fields]
+    pick = itemgetter(*positions) if len(positions) > 1 else (lambda row: (row[positions[0]],))
+    return orjson.dumps([dict(zip(fields, pick(row))) for row in rows])
+
+class RowsJSONResponse(Response):
+    """
+    List endpoint body encoded straight from query rows by orjson. The rows
+    come from our own tables, so the Pydantic validation and
+    jsonable_encoder pass FastAPI would run are skipped; `fields` keeps the
+    output to the endpoint's response model.
+    """
+    media_type = "application/json"
+
+    def __init__(self, rows: list, fields: Optional[tuple] = None, **kwargs):
+        super().__init__(encode_rows(rows, fields), **kwargs)
+
+def rows_page_response(response: Response, rows: list, limit: int, fields: Optional[tuple] = None) -> RowsJSONResponse:
+    """page_response for rows, keeping the headers already set on `response`"""
+    rows = page_response(response, rows, limit)
+    return RowsJSONResponse(rows, fields, headers=dict(response.headers))
@@ -0,0 +1,168 @@
+import ipaddress
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+from urllib.parse import parse_qs
+from app.core.config import settings
+
+# (bucket key, capacity, refill per second)
+BucketRequest = Tuple[tuple, float, float]
+
+class MemoryBucketStore:
+    """
+    Token buckets for one process, at most `max_keys` of them. The least
+    recently used bucket is evicted first; by then it has usually refilled,
+    so eviction rarely forgives a client anything.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> [tokens, updated_monotonic], least recently used first
+        self._buckets = OrderedDict()
+        self.evictions = 0
+
+    def acquire(self, requests: Iterable[BucketRequest], now: Optional[float] = None) -> float:
+        """
+        Take one token from every bucket, or from none of them. Returns 0 on
+        success, otherwise the seconds until all of them could pay.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            buckets, wait = [], 0.0
+            for key, capacity, rate in requests:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = [capacity, now]
+                else:
+                    bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                    bucket[1] = now
+                if bucket[0] < 1:
+                    wait = max(wait, (1 - bucket[0]) / rate)
+                buckets.append((key, bucket))
+            for key, bucket in buckets:
+                if not wait:
+                    bucket[0] -= 1
+                self._buckets[key] = bucket
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        return wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        return {"buckets": len(self._buckets), "max_keys": self.max_keys, "evictions": self.evictions}
+
+class RateLimiter:
+    """
+    Per-route limits keyed by the user_id query parameter and the client IP.
+    `store` is anything with MemoryBucketStore's acquire(); a store shared
+    between processes (Redis and the like) plugs in the same way.
+    """
+
+    def __init__(self, rules: dict, store, enabled: bool = True, trusted_proxies: Iterable[str] = ()):
+        # (method, path) -> {"user" | "ip": (capacity, refill per second)}
+        self.rules = rules
+        self.store = store
+        self.enabled = enabled
+        # Peers whose X-Forwarded-For is believed: reverse proxies, load balancers
+        self.trusted_proxies = [ipaddress.ip_network(proxy, strict=False) for proxy in trusted_proxies]
+        self.throttled = 0
+
+    def _trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted_proxies)
+
+    def client_ip(self, peer: Optional[str], forwarded_for: Optional[str]) -> Optional[str]:
+        """
+        The address the IP bucket is keyed on. X-Forwarded-For is only read
+        when the peer is a trusted proxy, and walked from the right past the
+        other trusted proxies: the first hop that isn't one is the client.
+        """
+        if not forwarded_for or peer is None or not self._trusted(peer):
+            return peer
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not self._trusted(hop):
+                return hop
+        return hops[0] if hops else peer
+
+    def check(self, method: str, path: str, user_id: Optional[str], client_ip: Optional[str]) -> float:
+        """0 when the request may proceed, else the Retry-After in seconds"""
+        rule = self.rules.get((method, path))
+        if rule is None:
+            return 0.0
+        requests = []
+        for scope, identity in (("user", user_id), ("ip", client_ip)):
+            if identity is not None and scope in rule:
+                capacity, rate = rule[scope]
+                requests.append(((path, scope, identity), capacity, rate))
+        wait = self.store.acquire(requests) if requests else 0.0
+        if wait:
+            self.throttled += 1
+        return wait
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "throttled": self.throttled, **self.store.stats()}
+
+rate_limiter = RateLimiter(
+    settings.RATE_LIMITS, MemoryBucketStore(settings.RATE_LIMIT_MAX_KEYS), settings.RATE_LIMIT_ENABLED,
+    settings.RATE_LIMIT_TRUSTED_PROXIES
+)
+
+def _user_id(scope) -> Optional[str]:
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("user_id")
+    return values[0] if values else None
+
+def _forwarded_for(scope) -> Optional[str]:
+    # Repeated headers are one list, in order
+    values = [value.decode("latin-1") for name, value in scope.get("headers", ()) if name == b"x-forwarded-for"]
+    return ",".join(values) if values else None
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware that answers over-limit requests with 429 and
+    Retry-After before routing, so they never reach a DB session.
+    Unlimited routes cost one dict lookup.
+    """
+
+    def __init__(self, app, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limiter
+        if scope["type"] != "http" or not limiter.enabled or (scope["method"], scope["path"]) not in limiter.rules:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else None
+        if limiter.trusted_proxies:
+            client_ip = limiter.client_ip(client_ip, _forwarded_for(scope))
+        wait = limiter.check(scope["method"], scope["path"], _user_id(scope), client_ip)
+        if not wait:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(wait)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,53 @@
+import hashlib
+import string
+from typing import Optional
+from app.core.config import settings
+
+# SVH-<2 letters><2 digits><2 letters>
+LETTER_PAIRS = 26 * 26
+DIGIT_PAIRS = 100
+CODE_SPACE = LETTER_PAIRS * DIGIT_PAIRS * LETTER_PAIRS  # 45,697,600
+
+# Balanced Feistel network over 2**26 >= CODE_SPACE, cycle-walked into range
+_HALF_BITS = 13
+_HALF_MASK = (1 << _HALF_BITS) - 1
+_ROUNDS = 4
+
+def _round(key: bytes, round_index: int, value: int) -> int:
+    digest = hashlib.blake2b(
+        value.to_bytes(2, "big") + bytes([round_index]), key=key, digest_size=4
+    ).digest()
+    return int.from_bytes(digest, "big") & _HALF_MASK
+
+def _feistel(key: bytes, value: int) -> int:
+    left, right = value >> _HALF_BITS, value & _HALF_MASK
+    for round_index in range(_ROUNDS):
+        left, right = right, left ^ _round(key, round_index, right)
+    return (left << _HALF_BITS) | right
+
+def permute(sequence: int, key: Optional[bytes] = None) -> int:
+    """
+    Keyed bijection on [0, CODE_SPACE): distinct sequences always map to
+    distinct indexes, and consecutive sequences look unrelated.
+    """
+    if not 0 <= sequence < CODE_SPACE:
+        raise ValueError("Referral code space exhausted")
+    key = key or settings.REFERRAL_CODE_KEY.encode()
+    value = _feistel(key, sequence)
+    while value >= CODE_SPACE:
+        value = _feistel(key, value)
+    return value
+
+def format_code(index: int) -> str:
+    """Render a code-space index as SVH-AB12CD"""
+    rest, second = divmod(index, LETTER_PAIRS)
+    first, digits = divmod(rest, DIGIT_PAIRS)
+    letters = string.ascii_uppercase
+    return (
+        f"SVH-{letters[first // 26]}{letters[first % 26]}"
+        f"{digits:02d}"
+        f"{letters[second // 26]}{letters[second % 26]}"
+    )
+
+def code_for_sequence(sequence: int) -> str:
+    return format_code(permute(sequence))
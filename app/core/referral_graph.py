@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Iterable, Optional, Tuple
+
+class ReferralGraph:
+    """
+    In-memory adjacency index of successful referrals (referrer -> referred).
+    load() builds fresh maps and swaps them in, record() adds one edge;
+    reads walk whichever maps are current without taking the lock (they
+    only call dict.get and iterate lists, which record()'s appends don't
+    break). Traversals never re-enter the starting user, so a referral
+    cycle through them can't count anyone twice. The lock only guards
+    in-memory work, never I/O.
+    """
+
+    def __init__(self, max_age_seconds: float):
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        # Edges recorded while a rebuild's query runs; None when no rebuild is in flight
+        self._pending: Optional[list] = None
+        self._children = defaultdict(list)
+        self._parent = {}
+
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def is_stale(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at >= self.max_age_seconds
+
+    def begin_load(self) -> bool:
+        """Claim the rebuild; False if another thread already has it"""
+        with self._lock:
+            if self._pending is not None:
+                return False
+            self._pending = []
+            return True
+
+    def cancel_load(self) -> None:
+        with self._lock:
+            self._pending = None
+
+    def load(self, edges: Iterable[Tuple[int, int]]) -> None:
+        """Replace the index with (referrer, referred) pairs read after begin_load()"""
+        children, parent = defaultdict(list), {}
+        for referrer, referred in edges:
+            children[referrer].append(referred)
+            parent[referred] = referrer
+        with self._lock:
+            # Applies committed after the query's snapshot would otherwise be lost
+            for referrer, referred in self._pending or ():
+                if parent.get(referred) != referrer:
+                    children[referrer].append(referred)
+                    parent[referred] = referrer
+            self._pending = None
+            self._children, self._parent = children, parent
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+            self._pending = None
+            self._children, self._parent = defaultdict(list), {}
+
+    def record(self, referrer: int, referred: int) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((referrer, referred))
+            # Before the first load there is nothing to keep current
+            if self._loaded_at is None:
+                return
+            self._children[referrer].append(referred)
+            self._parent[referred] = referrer
+
+    def downline(self, root: int, max_depth: int) -> Tuple[dict, dict]:
+        """({depth: users}, {direct referral: subtree size}) down to max_depth levels"""
+        levels, branches = defaultdict(int), {}
+        children = self._children
+        for branch in list(children.get(root, ())):
+            if branch == root:
+                continue
+            size, frontier = 0, [branch]
+            for depth in range(1, max_depth + 1):
+                if not frontier:
+                    break
+                levels[depth] += len(frontier)
+                size += len(frontier)
+                if depth < max_depth:
+                    frontier = [
+                        child for node in frontier for child in children.get(node, ()) if child != root
+                    ]
+            branches[branch] = size
+        return dict(levels), branches
+
+    def upline(self, user: int, max_depth: int) -> list:
+        """Referrer, their referrer and so on, nearest first"""
+        chain = []
+        parent = self._parent
+        node = parent.get(user)
+        while node is not None and node != user and len(chain) < max_depth:
+            chain.append(node)
+            node = parent.get(node)
+        return chain
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self._loaded_at is not None,
+            "rebuilding": self._pending is not None,
+            "users_with_referrals": len(self._children),
+            "edges": len(self._parent)
+        }
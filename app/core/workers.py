@@ -0,0 +1,47 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger("app.workers")
+
+class WorkerPool:
+    """
+    Daemon threads that each call task(worker_name) in a loop. A call that
+    returns 0 (nothing to do) or raises is followed by a poll_seconds pause;
+    busy workers go straight back for more.
+    """
+
+    def __init__(self, name: str, task: Callable[[str], int], count: int, poll_seconds: float):
+        self.name = name
+        self.task = task
+        self.count = count
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for index in range(self.count):
+            thread = threading.Thread(
+                target=self._run, args=(f"{self.name}-{index}",), name=f"{self.name}-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self, worker: str) -> None:
+        while not self._stop.is_set():
+            try:
+                done = self.task(worker)
+            except Exception:
+                logger.exception("%s failed", worker)
+                done = 0
+            if not done:
+                self._stop.wait(self.poll_seconds)
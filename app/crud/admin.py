@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+from app.core.cache import SnapshotCache
+from app.core.config import settings
+from app.models.models import User, Referral, RewardLedger
+
+# Dashboard stats are polled constantly; reward credit/revoke invalidates
+dashboard_snapshot = SnapshotCache(ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS)
+
+def get_dashboard_stats(db: Session) -> dict:
+    """Compute admin dashboard stats with one aggregate query per table"""
+    total_users = db.query(func.count(User.id)).scalar()
+    
+    referrals = db.query(
+        func.count(Referral.id).label("total"),
+        func.count(Referral.referred_user_id).label("successful")
+    ).one()
+    
+    rewards = db.query(
+        func.count(RewardLedger.id).label("total"),
+        func.sum(case((RewardLedger.status == "PENDING", 1), else_=0)).label("pending"),
+        func.sum(case((RewardLedger.status == "CREDITED", 1), else_=0)).label("credited"),
+        func.sum(case((RewardLedger.status == "CREDITED", RewardLedger.reward_value), else_=0)).label("credited_value")
+    ).one()
+    
+    conversion_rate = 0
+    if referrals.total > 0:
+        conversion_rate = (referrals.successful / referrals.total) * 100
+    
+    return {
+        "total_users": total_users,
+        "total_referrals": referrals.total,
+        "successful_referrals": referrals.successful,
+        "conversion_rate": f"{conversion_rate:.1f}%",
+        "total_rewards": rewards.total,
+        "pending_rewards": rewards.pending or 0,
+        "credited_rewards": rewards.credited or 0,
+        "total_reward_value": rewards.credited_value or 0
+    }
+
+# Bucket label formats; Python and SQL must produce identical strings
+BUCKET_FORMATS = {
+    "hour": "%Y-%m-%dT%H:00",
+    "day": "%Y-%m-%d",
+    "week": "%Y-%m-%d",  # Monday of the week
+}
+
+def _bucket_expr(column, granularity: str, dialect: str):
+    """SQL expression that maps a timestamp column to its bucket label"""
+    if dialect == "sqlite":
+        if granularity == "week":
+            return func.date(column, "weekday 0", "-6 days")
+        return func.strftime(BUCKET_FORMATS[granularity], column)
+    pg_formats = {"hour": 'YYYY-MM-DD"T"HH24:00', "day": "YYYY-MM-DD", "week": "YYYY-MM-DD"}
+    return func.to_char(func.date_trunc(granularity, column), pg_formats[granularity])
+
+def _bucket_floor(moment: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+def _count_by_bucket(db: Session, column, granularity: str, start: datetime, *filters) -> dict:
+    bucket = _bucket_expr(column, granularity, db.get_bind().dialect.name).label("bucket")
+    rows = db.query(bucket, func.count()).filter(
+        column >= start, *filters
+    ).group_by(bucket).all()
+    return dict(rows)
+
+def get_activity_series(db: Session, days: int, granularity: str) -> list:
+    """
+    Created / used / rewarded referral counts per bucket over the last `days`,
+    grouped in the database and zero-filled for empty buckets.
+    """
+    end = datetime.now()
+    start = end - timedelta(days=days)
+    
+    created = _count_by_bucket(db, Referral.created_at, granularity, start)
+    used = _count_by_bucket(db, Referral.used_at, granularity, start)
+    rewarded = _count_by_bucket(
+        db, RewardLedger.created_at, granularity, start, RewardLedger.referral_id.isnot(None)
+    )
+    
+    step = timedelta(weeks=1) if granularity == "week" else timedelta(**{f"{granularity}s": 1})
+    series = []
+    bucket_start = _bucket_floor(start, granularity)
+    while bucket_start <= end:
+        label = bucket_start.strftime(BUCKET_FORMATS[granularity])
+        series.append({
+            "date": label,
+            "count": created.get(label, 0),
+            "created": created.get(label, 0),
+            "used": used.get(label, 0),
+            "rewarded": rewarded.get(label, 0)
+        })
+        bucket_start += step
+    
+    return series
@@ -0,0 +1,138 @@
+from collections import defaultdict
+from typing import Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, delete, insert, select
+from app.core.database import upsert
+from app.crud.user import bump_user_versions, resolve_user_id
+from app.models.models import RewardLedger, UserRewardBalance
+
+STATUS_COLUMNS = {"PENDING": "pending", "CREDITED": "credited", "REVOKED": "revoked"}
+
+def transition_delta(user_id: int, reward_unit: str, reward_value: int, old_status, new_status: str) -> dict:
+    """Balance change for one ledger row moving old_status -> new_status (None = new row)"""
+    delta = {"user_id": user_id, "reward_unit": reward_unit, "pending": 0, "credited": 0, "revoked": 0}
+    if old_status == new_status:
+        return delta
+    if old_status is not None:
+        delta[STATUS_COLUMNS[old_status]] -= reward_value
+    delta[STATUS_COLUMNS[new_status]] += reward_value
+    return delta
+
+def adjust_balances(db: Session, deltas: list) -> None:
+    """
+    Apply balance deltas in the caller's transaction (no commit), merged
+    per (user_id, reward_unit) and written with one upsert.
+    """
+    merged = defaultdict(lambda: {"pending": 0, "credited": 0, "revoked": 0})
+    for delta in deltas:
+        totals = merged[(delta["user_id"], delta["reward_unit"])]
+        for column in totals:
+            totals[column] += delta[column]
+    rows = [
+        {"user_id": user_id, "reward_unit": unit, **totals}
+        for (user_id, unit), totals in merged.items()
+        if any(totals.values())
+    ]
+    if not rows:
+        return
+    
+    table = UserRewardBalance.__table__
+    upsert(db, table, rows, ["user_id", "reward_unit"], lambda incoming: {
+        "pending": table.c.pending + incoming.pending,
+        "credited": table.c.credited + incoming.credited,
+        "revoked": table.c.revoked + incoming.revoked,
+        "updated_at": func.now()
+    })
+
+def get_balance_summary(db: Session, username: str) -> dict:
+    """Reward summary from the materialized balances: one primary-key read"""
+    user_id = resolve_user_id(db, username)
+    if user_id is None:
+        return {"total_earned": 0, "pending": 0, "credited": 0, "unit": "points"}
+    
+    result = db.query(
+        func.sum(UserRewardBalance.pending).label("pending"),
+        func.sum(UserRewardBalance.credited).label("credited"),
+        func.max(UserRewardBalance.reward_unit).label("unit")
+    ).filter(
+        UserRewardBalance.user_id == user_id
+    ).first()
+    
+    pending, credited, unit = result.pending or 0, result.credited or 0, result.unit
+    if unit is None:
+        # No balance row: either no rewards yet or a table not backfilled yet
+        totals = _ledger_totals(db, user_id)
+        pending = sum(values[0] for values in totals.values())
+        credited = sum(values[1] for values in totals.values())
+        unit = max((reward_unit for _, reward_unit in totals), default=None)
+    return {
+        "total_earned": pending + credited,
+        "pending": pending,
+        "credited": credited,
+        "unit": unit or "points"
+    }
+
+def _ledger_totals(db: Session, user_id: Optional[int] = None) -> dict:
+    rows = db.query(
+        RewardLedger.user_id,
+        RewardLedger.reward_unit,
+        func.sum(case((RewardLedger.status == "PENDING", RewardLedger.reward_value), else_=0)),
+        func.sum(case((RewardLedger.status == "CREDITED", RewardLedger.reward_value), else_=0)),
+        func.sum(case((RewardLedger.status == "REVOKED", RewardLedger.reward_value), else_=0))
+    )
+    if user_id is not None:
+        rows = rows.filter(RewardLedger.user_id == user_id)
+    rows = rows.group_by(RewardLedger.user_id, RewardLedger.reward_unit)
+    return {(user_id, unit): (pending, credited, revoked) for user_id, unit, pending, credited, revoked in rows}
+
+def reconcile_balances(db: Session, fix: bool = False, report_limit: int = 50) -> dict:
+    """
+    Compare user_reward_balances with totals recomputed from reward_ledger.
+    With fix=True the table is rebuilt from the ledger in one transaction.
+    """
+    expected = _ledger_totals(db)
+    actual = {
+        (row.user_id, row.reward_unit): (row.pending, row.credited, row.revoked)
+        for row in db.execute(select(UserRewardBalance.__table__))
+    }
+    zero = (0, 0, 0)
+    columns = ("pending", "credited", "revoked")
+    drifted = []
+    for user_id, unit in sorted(set(expected) | set(actual)):
+        want, have = expected.get((user_id, unit), zero), actual.get((user_id, unit), zero)
+        if want != have:
+            drifted.append({
+                "user_id": user_id,
+                "reward_unit": unit,
+                "expected": dict(zip(columns, want)),
+                "actual": dict(zip(columns, have))
+            })
+    
+    if fix and drifted:
+        table = UserRewardBalance.__table__
+        db.execute(delete(table))
+        rows = [
+            {"user_id": user_id, "reward_unit": unit, "pending": pending, "credited": credited, "revoked": revoked}
+            for (user_id, unit), (pending, credited, revoked) in expected.items()
+        ]
+        if rows:
+            db.execute(insert(table), rows)
+        # Corrected users must not be served a cached copy of the old numbers
+        bump_user_versions(db, [row["user_id"] for row in drifted])
+        db.commit()
+    
+    return {
+        "checked": len(set(expected) | set(actual)),
+        "drift_count": len(drifted),
+        "drifted": drifted[:report_limit],
+        "fixed": bool(fix and drifted)
+    }
+
+def backfill_balances(db: Session) -> bool:
+    """
+    Rebuild user_reward_balances when it is empty but the ledger is not,
+    as on a database where create_all has just added the table.
+    """
+    if db.query(UserRewardBalance.user_id).first() or not db.query(RewardLedger.id).first():
+        return False
+    return reconcile_balances(db, fix=True)["fixed"]
@@ -0,0 +1,124 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import case, delete, func, insert, or_, select, update
+from app.core.config import settings
+from app.core.database import chunked
+from app.crud.reward import bulk_credit_rewards
+from app.models.models import RewardLedger, RewardOutbox
+
+def enqueue_rewards(db: Session, reward_ids: list) -> None:
+    """Queue ledger rows `reward_ids` for auto-credit in the caller's transaction (no commit)"""
+    if not reward_ids:
+        return
+    available_at = datetime.now() + timedelta(seconds=settings.AUTO_CREDIT_HOLD_SECONDS)
+    db.execute(insert(RewardOutbox.__table__), [
+        {"reward_id": reward_id, "available_at": available_at, "attempts": 0} for reward_id in reward_ids
+    ])
+
+def _claimable(outbox, now: datetime) -> tuple:
+    return (
+        outbox.c.available_at <= now,
+        or_(outbox.c.claimed_until.is_(None), outbox.c.claimed_until < now),
+        outbox.c.attempts < settings.OUTBOX_MAX_ATTEMPTS
+    )
+
+def claim_batch(db: Session, worker: str, limit: Optional[int] = None, now: Optional[datetime] = None) -> list:
+    """
+    Lease up to `limit` due events to `worker`; returns (id, reward_id) rows.
+    Candidates are read with FOR UPDATE SKIP LOCKED where the database has
+    it, so concurrent workers pick disjoint rows, and taken by an UPDATE
+    guarded on the lease still being free, which settles races on SQLite.
+    An idle poll never writes. An expired lease makes a row claimable again.
+    """
+    outbox = RewardOutbox.__table__
+    now = now or datetime.now()
+    claimable = _claimable(outbox, now)
+    ids = db.execute(
+        select(outbox.c.id).where(*claimable)
+        .order_by(outbox.c.id)
+        .limit(limit or settings.OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        db.rollback()
+        return []
+    
+    token = f"{worker}:{uuid.uuid4().hex}"
+    for chunk in chunked(ids):
+        db.execute(update(outbox).where(outbox.c.id.in_(chunk), *claimable).values(
+            claimed_by=token,
+            claimed_until=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+            attempts=outbox.c.attempts + 1
+        ))
+    db.commit()
+    return db.execute(
+        select(outbox.c.id, outbox.c.reward_id).where(outbox.c.claimed_by == token).order_by(outbox.c.id)
+    ).all()
+
+def process_batch(db: Session, claimed: list) -> dict:
+    """
+    Apply the auto-credit rules to claimed events and delete them, in one
+    transaction. PENDING rewards up to AUTO_CREDIT_MAX_VALUE are credited;
+    larger ones stay PENDING for an admin and anything already credited or
+    revoked is dropped. Crediting is guarded on PENDING, so a batch that is
+    re-run after an expired lease changes nothing twice.
+    """
+    ledger, outbox = RewardLedger.__table__, RewardOutbox.__table__
+    eligible = []
+    for chunk in chunked([row.reward_id for row in claimed]):
+        eligible.extend(db.execute(select(ledger.c.id).where(
+            ledger.c.id.in_(chunk),
+            ledger.c.status == "PENDING",
+            ledger.c.reward_value <= settings.AUTO_CREDIT_MAX_VALUE
+        )).scalars())
+    for chunk in chunked([row.id for row in claimed]):
+        db.execute(delete(outbox).where(outbox.c.id.in_(chunk)))
+    
+    # Commits the deletes together with the credits
+    result = bulk_credit_rewards(db, ids=eligible)
+    return {"processed": len(claimed), "credited": result["transitioned_count"]}
+
+def drain_once(db: Session, worker: str, limit: Optional[int] = None) -> int:
+    """Claim and process one batch; returns how many events it handled"""
+    claimed = claim_batch(db, worker, limit)
+    if not claimed:
+        return 0
+    try:
+        return process_batch(db, claimed)["processed"]
+    except Exception:
+        # The lease runs out and another attempt picks the batch up
+        db.rollback()
+        raise
+
+def outbox_task(session_factory, batch_size: Optional[int] = None):
+    """WorkerPool task draining one batch per call in a fresh session"""
+    def task(worker: str) -> int:
+        db = session_factory()
+        try:
+            return drain_once(db, worker, batch_size)
+        finally:
+            db.close()
+    return task
+
+def get_outbox_stats(db: Session) -> dict:
+    """Queue depth by state; dead events ran out of attempts and need a look"""
+    outbox = RewardOutbox.__table__
+    now = datetime.now()
+    dead = outbox.c.attempts >= settings.OUTBOX_MAX_ATTEMPTS
+    leased = outbox.c.claimed_until >= now
+    due = outbox.c.available_at <= now
+    queued, dead_count, claimed_count, due_count = db.execute(select(
+        func.count(outbox.c.id),
+        func.sum(case((dead, 1), else_=0)),
+        func.sum(case((~dead & leased, 1), else_=0)),
+        func.sum(case((~dead & due & or_(outbox.c.claimed_until.is_(None), ~leased), 1), else_=0))
+    )).one()
+    return {
+        "queued": queued,
+        "due": due_count or 0,
+        "claimed": claimed_count or 0,
+        "dead": dead_count or 0,
+        "workers_per_process": settings.OUTBOX_WORKERS
+    }
@@ -1,82 +1,131 @@
 import random
 import string
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
-from app.models.models import Referral, User, RewardLedger, RewardConfig
+from typing import Iterator, Optional
+from app.core.config import settings
+from app.core.database import chunked, insert_or_ignore
+from app.core.leaderboard import Leaderboard
+from app.core.pagination import paginate, STREAM_BATCH_SIZE
+from app.core.referral_codes import code_for_sequence
+from app.crud.balance import adjust_balances, transition_delta
+from app.crud.outbox import enqueue_rewards
+from app.crud.reward_config import get_active_reward_config
+from app.crud.user import bump_user_versions, remember_user_id, resolve_user_id, resolve_user_ids
+from app.crud.referral_graph import downline_stats, referral_chain, referral_graph
+from app.crud.referral_stats import bump_referral_stats, get_referral_stats_summary, stats_delta
+from app.models.models import Referral, User, RewardLedger
 
-def generate_referral_code() -> str:
-    """Generate referral code in format SVH-AB12CD"""
+# Random fallback attempts when a permuted code is already taken
+# (only possible against codes issued before the permutation existed)
+MAX_FALLBACK_ATTEMPTS = 10
+
+# A bulk apply re-validates from scratch if codes were used concurrently
+BULK_APPLY_ATTEMPTS = 3
+
+leaderboard = Leaderboard(settings.LEADERBOARD_WINDOWS_DAYS, settings.LEADERBOARD_REBUILD_SECONDS)
+
+def generate_referral_code(sequence: Optional[int] = None) -> str:
+    """
+    Generate referral code in format SVH-AB12CD.
+    With a sequence (the owner's user id) the code comes from a keyed
+    permutation of the code space, so distinct sequences never collide;
+    without one a random code is drawn.
+    """
+    if sequence is not None:
+        return code_for_sequence(sequence)
     letters1 = ''.join(random.choices(string.ascii_uppercase, k=2))
     digits = ''.join(random.choices(string.digits, k=2))
     letters2 = ''.join(random.choices(string.ascii_uppercase, k=2))
     return f"SVH-{letters1}{digits}{letters2}"
 
-def get_or_create_user(db: Session, username: str) -> User:
-    """Get existing user or create new one"""
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        max_id = db.query(func.max(User.id)).scalar() or 0
-        user = User(id=max_id + 1, username=username)
-        db.add(user)
+def get_or_create_user_id(db: Session, username: str) -> int:
+    """
+    Get existing user's id or create the user. The id is assigned by the
+    database and a concurrent insert of the same username is ignored,
+    so simultaneous first requests both end up with the same row.
+    """
+    user_id = resolve_user_id(db, username)
+    if user_id is None:
+        insert_or_ignore(db, User.__table__, {"username": username}, ["username"])
         db.commit()
-        db.refresh(user)
-    return user
+        user_id = db.query(User.id).filter(User.username == username).one()[0]
+        remember_user_id(username, user_id)
+    return user_id
 
 def get_or_create_referral_code(db: Session, username: str) -> dict:
     """Generate or get existing referral code for user"""
-    user = get_or_create_user(db, username)
+    user_id = get_or_create_user_id(db, username)
     
-    referral = db.query(Referral).filter(Referral.referred_by == user.id).first()
+    referral = db.query(Referral).filter(Referral.referred_by == user_id).first()
     
     if not referral:
-        while True:
-            code = generate_referral_code()
-            existing = db.query(Referral).filter(Referral.referral_code == code).first()
-            if not existing:
-                break
-        
-        referral = Referral(
-            referral_code=code,
-            referred_by=user.id
-        )
-        db.add(referral)
-        db.commit()
-        db.refresh(referral)
+        referral = _insert_referral_code(db, user_id)
     
     return {
-        "id": user.id,
-        "username": user.username,
+        "id": user_id,
+        "username": username,
         "referral_code": referral.referral_code
     }
 
+def _insert_referral_code(db: Session, user_id: int) -> Referral:
+    """
+    Insert the user's code without a lookup first and let the unique
+    constraint settle races: a concurrent request for the same user
+    derives the same code, so the loser returns the winner's row. A clash
+    with a legacy random code falls back to drawing random codes.
+    """
+    code = generate_referral_code(user_id)
+    for _ in range(MAX_FALLBACK_ATTEMPTS + 1):
+        referral = Referral(referral_code=code, referred_by=user_id)
+        db.add(referral)
+        bump_referral_stats(db, [stats_delta(user_id, codes_issued=1, referral_code=code)])
+        bump_user_versions(db, [user_id])
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            existing = db.query(Referral).filter(Referral.referred_by == user_id).first()
+            if existing:
+                return existing
+            code = generate_referral_code()
+            continue
+        db.refresh(referral)
+        return referral
+    raise RuntimeError("Could not allocate a unique referral code")
+
 def apply_referral_code(db: Session, user_id: str, code: str) -> dict:
     """Apply a referral code to get referred"""
-    referred_user = get_or_create_user(db, user_id)
+    referred_user_id = get_or_create_user_id(db, user_id)
     
     referral = db.query(Referral).filter(Referral.referral_code == code).first()
     if not referral:
         raise ValueError("Invalid referral code")
     
-    if referral.referred_by == referred_user.id:
+    if referral.referred_by == referred_user_id:
         raise ValueError("Cannot use your own referral code")
     
     if referral.referred_user_id is not None:
         raise ValueError("Referral code already used")
     
     existing_referral = db.query(Referral).filter(
-        Referral.referred_user_id == referred_user.id
+        Referral.referred_user_id == referred_user_id
     ).first()
     if existing_referral:
         raise ValueError("You have already used a referral code")
     
-    referral.referred_user_id = referred_user.id
-    referral.used_at = datetime.now()
+    used_at = datetime.now()
+    # Guarded like the bulk path: a concurrent apply of the same code
+    # since the read above leaves nothing to claim
+    if not _claim_referrals(db, [{"referral_id": referral.id, "referred_id": referred_user_id}], used_at):
+        db.rollback()
+        raise ValueError("Referral code already used")
+    bump_referral_stats(db, [stats_delta(referral.referred_by, codes_used=1, used_at=used_at)])
+    bump_user_versions(db, [referral.referred_by])
     
-    config = db.query(RewardConfig).filter(
-        RewardConfig.reward_type == "SIGNUP",
-        RewardConfig.is_active == True
-    ).first()
+    config = get_active_reward_config(db, "SIGNUP")
     
     if config:
         reward = RewardLedger(
@@ -88,89 +137,280 @@ def apply_referral_code(db: Session, user_id: str, code: str) -> dict:
             status="PENDING"
         )
         db.add(reward)
+        adjust_balances(db, [transition_delta(
+            referral.referred_by, config.reward_unit, config.reward_value, None, "PENDING"
+        )])
+        # Queued in the same transaction; the auto-credit workers take it from here
+        db.flush()
+        enqueue_rewards(db, [reward.id])
     
+    referrer_id = referral.referred_by
     db.commit()
+    leaderboard.record(referrer_id, used_at)
+    referral_graph.record(referrer_id, referred_user_id)
     
     return {
         "status": "success",
         "message": "Referral code applied successfully",
-        "referrer_id": referral.referred_by
+        "referrer_id": referrer_id
     }
 
-def get_analytics_summary(db: Session, user_id: str) -> dict:
-    """Get analytics summary for a user"""
-    user = db.query(User).filter(User.username == user_id).first()
-    if not user:
-        return {
-            "my_referral_code": None,
-            "total_referrals": 0,
-            "successful_referrals": 0,
-            "conversion_rate": "0%"
-        }
+def _bulk_resolve_users(db: Session, usernames: list) -> dict:
+    """username -> id for every name, creating the missing users in one pass"""
+    user_ids = resolve_user_ids(db, usernames)
+    missing = [name for name in usernames if name not in user_ids]
+    if missing:
+        insert_or_ignore(db, User.__table__, [{"username": name} for name in missing], ["username"])
+        for chunk in chunked(missing):
+            user_ids.update(db.query(User.username, User.id).filter(User.username.in_(chunk)).all())
+    return user_ids
+
+def _claim_referrals(db: Session, updates: list, used_time: datetime) -> set:
+    """
+    Mark the referrals used, guarded on referred_user_id IS NULL, and
+    return the ids that changed. Per-statement rowcounts from executemany
+    aren't reliable on every driver (psycopg2, asyncpg), so it's one
+    UPDATE ... RETURNING per chunk, or a rowcount per row without RETURNING.
+    """
+    referrals = Referral.__table__
+    claimed = set()
+    if not db.get_bind().dialect.update_returning:
+        for u in updates:
+            if db.execute(
+                update(referrals).where(referrals.c.id == u["referral_id"], referrals.c.referred_user_id.is_(None))
+                .values(referred_user_id=u["referred_id"], used_at=used_time)
+            ).rowcount:
+                claimed.add(u["referral_id"])
+        return claimed
+    for chunk in chunked(updates):
+        referred = {u["referral_id"]: u["referred_id"] for u in chunk}
+        claimed.update(db.execute(
+            update(referrals).where(
+                referrals.c.id.in_(list(referred)), referrals.c.referred_user_id.is_(None)
+            ).values(
+                referred_user_id=case(referred, value=referrals.c.id), used_at=used_time
+            ).returning(referrals.c.id)
+        ).scalars())
+    return claimed
+
+def _insert_rewards(db: Session, rows: list) -> list:
+    """Insert ledger rows and return their ids, in one executemany where the driver can return them"""
+    ledger = RewardLedger.__table__
+    if db.get_bind().dialect.insert_executemany_returning:
+        return db.execute(insert(ledger).returning(ledger.c.id), rows).scalars().all()
+    return [db.execute(insert(ledger).values(**row)).inserted_primary_key[0] for row in rows]
+
+def _bulk_apply_once(db: Session, items: list) -> Optional[list]:
+    usernames = list(dict.fromkeys(user_id for user_id, _ in items))
+    codes = list(dict.fromkeys(code for _, code in items))
+    user_ids = _bulk_resolve_users(db, usernames)
+    
+    referrals = {}
+    for chunk in chunked(codes):
+        for row in db.query(
+            Referral.id, Referral.referral_code, Referral.referred_by, Referral.referred_user_id
+        ).filter(Referral.referral_code.in_(chunk)):
+            referrals[row.referral_code] = row
     
-    referral = db.query(Referral).filter(Referral.referred_by == user.id).first()
+    already_referred = set()
+    for chunk in chunked(list(user_ids.values())):
+        already_referred.update(
+            user_id for (user_id,) in db.query(Referral.referred_user_id).filter(Referral.referred_user_id.in_(chunk))
+        )
     
-    total = db.query(Referral).filter(Referral.referred_by == user.id).count()
-    successful = db.query(Referral).filter(
-        Referral.referred_by == user.id,
-        Referral.referred_user_id.isnot(None)
-    ).count()
+    used_codes = set()
+    results, updates = [], []
+    for user_id, code in items:
+        referred_id = user_ids[user_id]
+        referral = referrals.get(code)
+        if not referral:
+            error = "Invalid referral code"
+        elif referral.referred_by == referred_id:
+            error = "Cannot use your own referral code"
+        elif referral.referred_user_id is not None or code in used_codes:
+            error = "Referral code already used"
+        elif referred_id in already_referred:
+            error = "You have already used a referral code"
+        else:
+            error = None
+        
+        if error:
+            results.append({"user_id": user_id, "referral_code": code, "status": "error", "message": error})
+            continue
+        
+        used_codes.add(code)
+        already_referred.add(referred_id)
+        updates.append({"referral_id": referral.id, "referred_id": referred_id, "referrer_id": referral.referred_by})
+        results.append({
+            "user_id": user_id,
+            "referral_code": code,
+            "status": "success",
+            "message": "Referral code applied successfully",
+            "referrer_id": referral.referred_by
+        })
     
-    conversion_rate = "0%"
-    if total > 0:
-        rate = (successful / total) * 100
-        conversion_rate = f"{rate:.1f}%"
+    if updates:
+        used_time = datetime.now()
+        # A code used concurrently since the read above is left out of the
+        # claimed ids; the batch is then retried and reports it as used
+        if len(_claim_referrals(db, updates, used_time)) != len(updates):
+            db.rollback()
+            return None
+        bump_referral_stats(db, [
+            stats_delta(u["referrer_id"], codes_used=1, used_at=used_time) for u in updates
+        ])
+        bump_user_versions(db, [u["referrer_id"] for u in updates])
+        
+        config = get_active_reward_config(db, "SIGNUP")
+        if config:
+            reward_ids = _insert_rewards(db, [
+                {
+                    "user_id": u["referrer_id"],
+                    "referral_id": u["referral_id"],
+                    "reward_type": config.reward_type,
+                    "reward_value": config.reward_value,
+                    "reward_unit": config.reward_unit,
+                    "status": "PENDING"
+                }
+                for u in updates
+            ])
+            adjust_balances(db, [
+                transition_delta(u["referrer_id"], config.reward_unit, config.reward_value, None, "PENDING")
+                for u in updates
+            ])
+            enqueue_rewards(db, reward_ids)
     
-    return {
-        "my_referral_code": referral.referral_code if referral else None,
-        "total_referrals": total,
-        "successful_referrals": successful,
-        "conversion_rate": conversion_rate
-    }
+    db.commit()
+    # Users created by this batch are committed now; overwrite any negative
+    # cache entry left by an earlier lookup of the same name
+    for username in usernames:
+        remember_user_id(username, user_ids[username])
+    for u in updates:
+        leaderboard.record(u["referrer_id"], used_time)
+        referral_graph.record(u["referrer_id"], u["referred_id"])
+    return results
+
+def bulk_apply_referral_codes(db: Session, items: list) -> list:
+    """
+    Apply many (user_id, referral_code) pairs in one transaction.
+    Validation is set-based and mirrors apply_referral_code, including
+    conflicts inside the batch; returns one result per item, in order.
+    """
+    for _ in range(BULK_APPLY_ATTEMPTS):
+        results = _bulk_apply_once(db, items)
+        if results is not None:
+            return results
+    raise RuntimeError("Referral codes changed concurrently; retry the batch")
+
+def get_downline_stats(db: Session, user_id: str, max_depth: int = 5) -> dict:
+    """Multi-level downline of a user"""
+    return downline_stats(db, user_id, max_depth)
+
+def get_referral_chain(db: Session, user_id: str) -> dict:
+    """Upline of a user"""
+    return referral_chain(db, user_id)
+
+def get_analytics_summary(db: Session, user_id: str) -> dict:
+    """Get analytics summary for a user from the maintained referral counters"""
+    return get_referral_stats_summary(db, user_id)
+
+def _referral_list_query(db: Session, referrer_id: int, limit: Optional[int], cursor: Optional[int]):
+    ReferredUser = aliased(User)
+    # Output fields are computed in SQL so rows go to the encoder as they are
+    query = db.query(
+        Referral.id,
+        Referral.referral_code,
+        ReferredUser.username.label("used_by_user_id"),
+        Referral.used_at,
+        case((Referral.referred_user_id.isnot(None), "SUCCESS"), else_="PENDING").label("status")
+    ).outerjoin(
+        ReferredUser, ReferredUser.id == Referral.referred_user_id
+    ).filter(
+        Referral.referred_by == referrer_id
+    )
+    return paginate(query, Referral, limit, cursor)
 
-def get_referral_list(db: Session, user_id: str) -> list:
-    """Get list of referrals for a user"""
-    user = db.query(User).filter(User.username == user_id).first()
-    if not user:
+def get_referral_list(db: Session, user_id: str, limit: Optional[int] = None, cursor: Optional[int] = None) -> list:
+    """Get list of referrals for a user, newest first, as rows"""
+    referrer_id = resolve_user_id(db, user_id)
+    if referrer_id is None:
         return []
     
-    referrals = db.query(Referral).filter(Referral.referred_by == user.id).all()
+    return _referral_list_query(db, referrer_id, limit, cursor).all()
+
+def iter_referral_list(db: Session, user_id: str, cursor: Optional[int] = None) -> Iterator[dict]:
+    """Stream referrals for a user from a server-side cursor"""
+    referrer_id = resolve_user_id(db, user_id)
+    if referrer_id is None:
+        return
     
-    result = []
-    for ref in referrals:
-        referred_user = None
-        if ref.referred_user_id:
-            referred_user = db.query(User).filter(User.id == ref.referred_user_id).first()
+    for row in _referral_list_query(db, referrer_id, None, cursor).yield_per(STREAM_BATCH_SIZE):
+        yield row._asdict()
+
+def rebuild_leaderboard(db: Session) -> bool:
+    """Reload the in-memory leaderboard from referrals; False if another thread already is"""
+    if not leaderboard.begin_load():
+        return False
+    try:
+        totals = db.query(
+            Referral.referred_by, func.count(Referral.id)
+        ).filter(
+            Referral.referred_user_id.isnot(None)
+        ).group_by(Referral.referred_by).all()
         
-        result.append({
-            "referral_code": ref.referral_code,
-            "used_by_user_id": referred_user.username if referred_user else None,
-            "used_at": ref.used_at,
-            "status": "SUCCESS" if ref.referred_user_id else "PENDING"
-        })
+        since = datetime.now() - max(leaderboard.windows.values())
+        events = db.query(
+            Referral.used_at, Referral.referred_by
+        ).filter(
+            Referral.referred_user_id.isnot(None),
+            Referral.used_at >= since
+        ).order_by(Referral.used_at).all()
+    except Exception:
+        leaderboard.cancel_load()
+        raise
     
-    return result
+    leaderboard.load(totals, events)
+    return True
 
-def get_top_referrers(db: Session, limit: int = 10) -> list:
-    """Get top referrers leaderboard"""
-    results = db.query(
-        Referral.referred_by,
-        func.count(Referral.id).label('successful_referrals')
-    ).filter(
-        Referral.referred_user_id.isnot(None)
-    ).group_by(
-        Referral.referred_by
-    ).order_by(
-        desc('successful_referrals')
-    ).limit(limit).all()
-    
-    top_referrers = []
-    for result in results:
-        user = db.query(User).filter(User.id == result.referred_by).first()
-        if user:
-            top_referrers.append({
-                "user_id": user.username,
-                "successful_referrals": result.successful_referrals
-            })
-    
-    return top_referrers
\ No newline at end of file
+def _leaderboard_ready(db: Session, window_days: Optional[int]) -> None:
+    if window_days is not None and window_days not in leaderboard.windows:
+        allowed = ", ".join(str(days) for days in leaderboard.windows)
+        raise ValueError(f"window_days must be one of: {allowed}")
+    # Rebuilding on age bounds drift from writes this worker didn't see.
+    # One request rebuilds while the others read the current board; with
+    # no board loaded yet there is nothing to serve, so they wait for it.
+    if leaderboard.is_stale() and not rebuild_leaderboard(db) and not leaderboard.is_loaded():
+        leaderboard.wait_loaded()
+
+def _leaderboard_names(db: Session, user_ids: list) -> dict:
+    missing = [user_id for user_id in user_ids if user_id not in leaderboard.names]
+    if missing:
+        leaderboard.names.update(db.query(User.id, User.username).filter(User.id.in_(missing)).all())
+    return leaderboard.names
+
+def get_top_referrers(db: Session, limit: int = 10, window_days: Optional[int] = None) -> list:
+    """Get top referrers leaderboard, all-time or over the last `window_days` days"""
+    _leaderboard_ready(db, window_days)
+    entries = leaderboard.top(limit, window_days)
+    names = _leaderboard_names(db, [user_id for user_id, _ in entries])
+    
+    return [
+        {
+            "user_id": names.get(user_id),
+            "successful_referrals": count
+        }
+        for user_id, count in entries
+    ]
+
+def get_referrer_rank(db: Session, username: str, window_days: Optional[int] = None) -> dict:
+    """A user's leaderboard position; rank is None until they have a successful referral"""
+    _leaderboard_ready(db, window_days)
+    user_id = resolve_user_id(db, username)
+    position = leaderboard.rank(user_id, window_days) if user_id is not None else None
+    
+    return {
+        "user_id": username,
+        "rank": position[0] if position else None,
+        "successful_referrals": position[1] if position else 0,
+        "window_days": window_days
+    }
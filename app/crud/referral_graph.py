@@ -0,0 +1,146 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, literal, select
+from app.core.config import settings
+from app.core.referral_graph import ReferralGraph
+from app.crud.user import resolve_user_id
+from app.models.models import Referral, User
+
+# Direct referrals listed as top branches of a downline
+TOP_BRANCHES = 5
+
+referral_graph = ReferralGraph(settings.REFERRAL_GRAPH_REBUILD_SECONDS)
+
+def rebuild_referral_graph(db: Session) -> None:
+    """Reload the in-memory adjacency index from referrals, unless another thread already is"""
+    if not referral_graph.begin_load():
+        return
+    referrals = Referral.__table__
+    try:
+        edges = db.execute(
+            select(referrals.c.referred_by, referrals.c.referred_user_id)
+            .where(referrals.c.referred_user_id.isnot(None))
+        ).all()
+    except Exception:
+        referral_graph.cancel_load()
+        raise
+    referral_graph.load(edges)
+
+def _graph_ready(db: Session) -> bool:
+    """
+    Whether reads should use the index. It is rebuilt on age to pick up
+    other workers' writes; while one request rebuilds, the others keep
+    reading the current index, or SQL before the first load.
+    """
+    if not settings.REFERRAL_GRAPH_INDEX_ENABLED:
+        return False
+    if referral_graph.is_stale():
+        rebuild_referral_graph(db)
+    return referral_graph.is_loaded()
+
+def _downline_sql(db: Session, root: int, max_depth: int) -> tuple:
+    """
+    ({depth: users}, {direct referral: subtree size}) from a recursive CTE.
+    Each row carries the direct referral (branch) it descends from, so one
+    GROUP BY gives both breakdowns.
+    """
+    referrals = Referral.__table__
+    downline = select(
+        referrals.c.referred_user_id.label("user_id"),
+        literal(1).label("depth"),
+        referrals.c.referred_user_id.label("branch")
+    ).where(
+        referrals.c.referred_by == root,
+        referrals.c.referred_user_id.isnot(None),
+        referrals.c.referred_user_id != root
+    ).cte("downline", recursive=True)
+    child = referrals.alias("child")
+    downline = downline.union_all(
+        select(child.c.referred_user_id, downline.c.depth + 1, downline.c.branch).where(
+            child.c.referred_by == downline.c.user_id,
+            child.c.referred_user_id.isnot(None),
+            child.c.referred_user_id != root,
+            downline.c.depth < max_depth
+        )
+    )
+    rows = db.execute(
+        select(downline.c.branch, downline.c.depth, func.count())
+        .group_by(downline.c.branch, downline.c.depth)
+    )
+    levels, branches = {}, {}
+    for branch, depth, users in rows:
+        levels[depth] = levels.get(depth, 0) + users
+        branches[branch] = branches.get(branch, 0) + users
+    return levels, branches
+
+def _upline_sql(db: Session, user_id: int, max_depth: int) -> list:
+    referrals = Referral.__table__
+    upline = select(
+        referrals.c.referred_by.label("user_id"),
+        literal(1).label("depth")
+    ).where(
+        referrals.c.referred_user_id == user_id
+    ).cte("upline", recursive=True)
+    parent = referrals.alias("parent")
+    upline = upline.union_all(
+        select(parent.c.referred_by, upline.c.depth + 1).where(
+            parent.c.referred_user_id == upline.c.user_id,
+            upline.c.user_id != user_id,
+            upline.c.depth < max_depth
+        )
+    )
+    chain = [row.user_id for row in db.execute(select(upline.c.user_id, upline.c.depth).order_by(upline.c.depth))]
+    # A cycle back to the user ends the chain there, as in the index
+    return chain[:chain.index(user_id)] if user_id in chain else chain
+
+def _usernames(db: Session, user_ids: list) -> dict:
+    if not user_ids:
+        return {}
+    return dict(db.query(User.id, User.username).filter(User.id.in_(user_ids)).all())
+
+def downline_stats(db: Session, username: str, max_depth: int = 5) -> dict:
+    """Downline size per level below a user, and their direct referrals with the largest subtrees"""
+    if not 1 <= max_depth <= settings.REFERRAL_GRAPH_MAX_DEPTH:
+        raise ValueError(f"max_depth must be between 1 and {settings.REFERRAL_GRAPH_MAX_DEPTH}")
+    root = resolve_user_id(db, username)
+    levels, branches = {}, {}
+    if root is not None:
+        if _graph_ready(db):
+            levels, branches = referral_graph.downline(root, max_depth)
+        else:
+            levels, branches = _downline_sql(db, root, max_depth)
+    
+    top = sorted(branches.items(), key=lambda item: (-item[1], item[0]))[:TOP_BRANCHES]
+    names = _usernames(db, [user_id for user_id, _ in top])
+    return {
+        "user_id": username,
+        "max_depth": max_depth,
+        "total": sum(levels.values()),
+        "depth_reached": max(levels, default=0),
+        "levels": [{"depth": depth, "users": levels[depth]} for depth in sorted(levels)],
+        "top_branches": [
+            {
+                "user_id": names.get(user_id),
+                "subtree_size": size,
+                # Everyone below the branch's first user joined through a referral inside it
+                "conversions": size - 1
+            }
+            for user_id, size in top
+        ]
+    }
+
+def referral_chain(db: Session, username: str) -> dict:
+    """Who referred a user, who referred them, and so on up to REFERRAL_GRAPH_MAX_DEPTH"""
+    user_id = resolve_user_id(db, username)
+    chain = []
+    if user_id is not None:
+        if _graph_ready(db):
+            chain = referral_graph.upline(user_id, settings.REFERRAL_GRAPH_MAX_DEPTH)
+        else:
+            chain = _upline_sql(db, user_id, settings.REFERRAL_GRAPH_MAX_DEPTH)
+    
+    names = _usernames(db, chain)
+    return {
+        "user_id": username,
+        "chain_depth": len(chain),
+        "upline": [names.get(ancestor) for ancestor in chain]
+    }
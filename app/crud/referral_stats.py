@@ -0,0 +1,147 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import func, delete, insert, select
+from app.core.database import upsert
+from app.crud.user import bump_user_versions, resolve_user_id
+from app.models.models import Referral, UserReferralStats
+
+def stats_delta(user_id: int, codes_issued: int = 0, codes_used: int = 0,
+                referral_code: Optional[str] = None, used_at: Optional[datetime] = None) -> dict:
+    return {
+        "user_id": user_id,
+        "codes_issued": codes_issued,
+        "codes_used": codes_used,
+        "referral_code": referral_code,
+        "last_used_at": used_at
+    }
+
+def bump_referral_stats(db: Session, deltas: list) -> None:
+    """
+    Apply counter deltas in the caller's transaction (no commit), merged
+    per user and written with one upsert. The first code issued is kept
+    as the user's code; last_used_at only moves forward.
+    """
+    merged = {}
+    for delta in deltas:
+        row = merged.setdefault(delta["user_id"], stats_delta(delta["user_id"]))
+        row["codes_issued"] += delta["codes_issued"]
+        row["codes_used"] += delta["codes_used"]
+        row["referral_code"] = row["referral_code"] or delta["referral_code"]
+        if delta["last_used_at"] and (not row["last_used_at"] or delta["last_used_at"] > row["last_used_at"]):
+            row["last_used_at"] = delta["last_used_at"]
+    rows = list(merged.values())
+    if not rows:
+        return
+    
+    table = UserReferralStats.__table__
+    # Scalar max() is SQLite's greatest(); coalescing each side with the
+    # other keeps a NULL on either side from winning
+    latest = func.max if db.get_bind().dialect.name == "sqlite" else func.greatest
+    upsert(db, table, rows, ["user_id"], lambda incoming: {
+        "codes_issued": table.c.codes_issued + incoming.codes_issued,
+        "codes_used": table.c.codes_used + incoming.codes_used,
+        "referral_code": func.coalesce(table.c.referral_code, incoming.referral_code),
+        "last_used_at": latest(
+            func.coalesce(incoming.last_used_at, table.c.last_used_at),
+            func.coalesce(table.c.last_used_at, incoming.last_used_at)
+        ),
+        "updated_at": func.now()
+    })
+
+def get_referral_stats_summary(db: Session, username: str) -> dict:
+    """Analytics summary from the maintained counters: one primary-key lookup"""
+    user_id = resolve_user_id(db, username)
+    stats = None
+    if user_id is not None:
+        stats = db.query(
+            UserReferralStats.referral_code,
+            UserReferralStats.codes_issued,
+            UserReferralStats.codes_used,
+            UserReferralStats.last_used_at
+        ).filter(
+            UserReferralStats.user_id == user_id
+        ).first()
+        if stats is None:
+            # No counters row: either no codes yet or a table not backfilled yet
+            stats = _expected_stats(db, user_id).get(user_id)
+    
+    referral_code, total, successful, last_used_at = stats or (None, 0, 0, None)
+    conversion_rate = "0%"
+    if total > 0:
+        conversion_rate = f"{(successful / total) * 100:.1f}%"
+    
+    return {
+        "my_referral_code": referral_code,
+        "total_referrals": total,
+        "successful_referrals": successful,
+        "conversion_rate": conversion_rate,
+        "last_used_at": last_used_at
+    }
+
+def _expected_stats(db: Session, user_id: Optional[int] = None) -> dict:
+    per_user = select(
+        Referral.referred_by.label("user_id"),
+        func.count(Referral.id).label("codes_issued"),
+        func.count(Referral.referred_user_id).label("codes_used"),
+        func.max(Referral.used_at).label("last_used_at"),
+        func.min(Referral.id).label("first_id")
+    )
+    if user_id is not None:
+        per_user = per_user.where(Referral.referred_by == user_id)
+    per_user = per_user.group_by(Referral.referred_by).subquery()
+    rows = db.execute(
+        select(per_user, Referral.referral_code).join(Referral, Referral.id == per_user.c.first_id)
+    )
+    return {
+        row.user_id: (row.referral_code, row.codes_issued, row.codes_used, row.last_used_at)
+        for row in rows
+    }
+
+def reconcile_referral_stats(db: Session, fix: bool = False, report_limit: int = 50) -> dict:
+    """
+    Compare user_referral_stats with counters recomputed from referrals.
+    With fix=True the table is rebuilt (or backfilled) in one transaction.
+    """
+    expected = _expected_stats(db)
+    actual = {
+        row.user_id: (row.referral_code, row.codes_issued, row.codes_used, row.last_used_at)
+        for row in db.execute(select(UserReferralStats.__table__))
+    }
+    columns = ("referral_code", "codes_issued", "codes_used", "last_used_at")
+    empty = (None, 0, 0, None)
+    drifted = []
+    for user_id in sorted(set(expected) | set(actual)):
+        want, have = expected.get(user_id, empty), actual.get(user_id, empty)
+        if want != have:
+            drifted.append({
+                "user_id": user_id,
+                "expected": dict(zip(columns, want)),
+                "actual": dict(zip(columns, have))
+            })
+    
+    if fix and drifted:
+        table = UserReferralStats.__table__
+        db.execute(delete(table))
+        rows = [dict(zip(("user_id",) + columns, (user_id,) + values)) for user_id, values in expected.items()]
+        if rows:
+            db.execute(insert(table), rows)
+        # Corrected users must not be served a cached copy of the old numbers
+        bump_user_versions(db, [row["user_id"] for row in drifted])
+        db.commit()
+    
+    return {
+        "checked": len(set(expected) | set(actual)),
+        "drift_count": len(drifted),
+        "drifted": drifted[:report_limit],
+        "fixed": bool(fix and drifted)
+    }
+
+def backfill_referral_stats(db: Session) -> bool:
+    """
+    Rebuild user_referral_stats when it is empty but referrals is not,
+    as on a database where create_all has just added the table.
+    """
+    if db.query(UserReferralStats.user_id).first() or not db.query(Referral.id).first():
+        return False
+    return reconcile_referral_stats(db, fix=True)["fixed"]
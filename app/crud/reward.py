@@ -1,89 +1,188 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import String, cast, func, desc, select, update
 from datetime import datetime
+from typing import Iterator, Optional
+from app.core.database import chunked
+from app.core.pagination import paginate, STREAM_BATCH_SIZE
+from app.crud.admin import dashboard_snapshot
+from app.crud.balance import adjust_balances, get_balance_summary, transition_delta
+from app.crud.reward_config import bump_config_version, reward_config_cache
+from app.crud.user import bump_user_versions, resolve_user_id
 from app.models.models import RewardLedger, RewardConfig, User
 
 def get_reward_summary(db: Session, user_id: str) -> dict:
-    """Get reward summary for a user"""
-    user = db.query(User).filter(User.username == user_id).first()
-    if not user:
-        return {"total_earned": 0, "pending": 0, "credited": 0, "unit": "points"}
-    
-    result = db.query(
-        func.sum(RewardLedger.reward_value).filter(RewardLedger.status == "CREDITED").label("credited"),
-        func.sum(RewardLedger.reward_value).filter(RewardLedger.status == "PENDING").label("pending"),
-        func.max(RewardLedger.reward_unit).label("unit")
-    ).filter(
-        RewardLedger.user_id == user.id
-    ).first()
-    
-    total_earned = (result.credited or 0) + (result.pending or 0)
-    
-    return {
-        "total_earned": total_earned,
-        "pending": result.pending or 0,
-        "credited": result.credited or 0,
-        "unit": result.unit or "points"
-    }
+    """Get reward summary for a user from the materialized balances"""
+    return get_balance_summary(db, user_id)
+
+def _reward_history_query(db: Session, owner_id: int, limit: Optional[int], cursor: Optional[int]):
+    query = db.query(
+        RewardLedger.id,
+        RewardLedger.reward_type,
+        RewardLedger.reward_value,
+        RewardLedger.reward_unit,
+        RewardLedger.status,
+        RewardLedger.created_at
+    ).filter(RewardLedger.user_id == owner_id)
+    return paginate(query, RewardLedger, limit, cursor)
 
-def get_reward_history(db: Session, user_id: str) -> list:
-    """Get reward history for a user"""
-    user = db.query(User).filter(User.username == user_id).first()
-    if not user:
+def get_reward_history(db: Session, user_id: str, limit: Optional[int] = None, cursor: Optional[int] = None) -> list:
+    """Get reward history for a user, newest first, as rows"""
+    owner_id = resolve_user_id(db, user_id)
+    if owner_id is None:
         return []
     
-    rewards = db.query(RewardLedger).filter(
-        RewardLedger.user_id == user.id
-    ).order_by(
-        RewardLedger.created_at.desc()
-    ).all()
+    return _reward_history_query(db, owner_id, limit, cursor).all()
+
+def iter_reward_history(db: Session, user_id: str, cursor: Optional[int] = None) -> Iterator[dict]:
+    """Stream reward history for a user from a server-side cursor"""
+    owner_id = resolve_user_id(db, user_id)
+    if owner_id is None:
+        return
     
-    return rewards
+    for row in _reward_history_query(db, owner_id, None, cursor).yield_per(STREAM_BATCH_SIZE):
+        yield row._asdict()
 
-def get_pending_rewards(db: Session) -> list:
-    """Get all pending rewards for admin approval"""
-    rewards = db.query(RewardLedger).filter(
+def _pending_rewards_query(db: Session, limit: Optional[int], cursor: Optional[int]):
+    query = db.query(
+        RewardLedger.id,
+        # Rewards of a deleted user still show who they belonged to
+        func.coalesce(User.username, cast(RewardLedger.user_id, String)).label("user_id"),
+        RewardLedger.reward_type,
+        RewardLedger.reward_value,
+        RewardLedger.reward_unit,
+        RewardLedger.created_at,
+        RewardLedger.referral_id
+    ).outerjoin(
+        User, User.id == RewardLedger.user_id
+    ).filter(
         RewardLedger.status == "PENDING"
-    ).order_by(
-        RewardLedger.created_at.desc()
-    ).all()
-    
-    result = []
-    for reward in rewards:
-        user = db.query(User).filter(User.id == reward.user_id).first()
-        result.append({
-            "id": reward.id,
-            "user_id": user.username if user else str(reward.user_id),
-            "reward_type": reward.reward_type,
-            "reward_value": reward.reward_value,
-            "reward_unit": reward.reward_unit,
-            "created_at": reward.created_at,
-            "referral_id": reward.referral_id
-        })
-    
-    return result
+    )
+    return paginate(query, RewardLedger, limit, cursor)
+
+def get_pending_rewards(db: Session, limit: Optional[int] = None, cursor: Optional[int] = None) -> list:
+    """Get pending rewards for admin approval, newest first, as rows"""
+    return _pending_rewards_query(db, limit, cursor).all()
+
+def iter_pending_rewards(db: Session, cursor: Optional[int] = None) -> Iterator[dict]:
+    """Stream pending rewards from a server-side cursor"""
+    for row in _pending_rewards_query(db, None, cursor).yield_per(STREAM_BATCH_SIZE):
+        yield row._asdict()
+
+# Re-reads allowed when a single credit/revoke loses its guarded UPDATE
+TRANSITION_ATTEMPTS = 3
+
+def _transition_reward(db: Session, reward_id: int, new_status: str, from_statuses: tuple) -> None:
+    """
+    Move one reward to new_status. The UPDATE is guarded on the status just
+    read (SQLite ignores FOR UPDATE), so a concurrent transition, e.g. the
+    auto-credit worker, makes this re-read instead of applying a second
+    balance delta on top of it.
+    """
+    ledger = RewardLedger.__table__
+    for _ in range(TRANSITION_ATTEMPTS):
+        reward = db.execute(
+            select(ledger.c.user_id, ledger.c.status, ledger.c.reward_unit, ledger.c.reward_value)
+            .where(ledger.c.id == reward_id).with_for_update()
+        ).first()
+        if not reward:
+            raise ValueError("Reward not found")
+        if reward.status not in from_statuses:
+            raise ValueError(f"Reward is already {reward.status.lower()}")
+        
+        values = {"status": new_status}
+        if new_status == "CREDITED":
+            values["credited_at"] = datetime.now()
+        updated = db.execute(
+            update(ledger).where(ledger.c.id == reward_id, ledger.c.status == reward.status).values(**values)
+        ).rowcount
+        if not updated:
+            db.rollback()
+            continue
+        
+        adjust_balances(db, [transition_delta(
+            reward.user_id, reward.reward_unit, reward.reward_value, reward.status, new_status
+        )])
+        bump_user_versions(db, [reward.user_id])
+        db.commit()
+        dashboard_snapshot.invalidate()
+        return
+    raise RuntimeError("Reward changed concurrently; retry")
 
 def credit_reward(db: Session, reward_id: int) -> None:
     """Credit a pending reward"""
-    reward = db.query(RewardLedger).filter(RewardLedger.id == reward_id).first()
-    if not reward:
-        raise ValueError("Reward not found")
-    
-    if reward.status != "PENDING":
-        raise ValueError(f"Reward is already {reward.status.lower()}")
-    
-    reward.status = "CREDITED"
-    reward.credited_at = datetime.now()
-    db.commit()
+    _transition_reward(db, reward_id, "CREDITED", ("PENDING",))
 
 def revoke_reward(db: Session, reward_id: int) -> None:
     """Revoke a reward"""
-    reward = db.query(RewardLedger).filter(RewardLedger.id == reward_id).first()
-    if not reward:
-        raise ValueError("Reward not found")
+    _transition_reward(db, reward_id, "REVOKED", ("PENDING", "CREDITED", "REVOKED"))
+
+def _bulk_transition(db: Session, new_status: str, from_status: str, ids: Optional[list],
+                     reward_type: Optional[str], created_from: Optional[datetime],
+                     created_to: Optional[datetime]) -> dict:
+    """
+    Move every matching reward in `from_status` to `new_status` with
+    guarded set-based UPDATEs in one transaction. Rows in any other status
+    are left alone and reported as skipped (ids mode only).
+    """
+    ledger = RewardLedger.__table__
+    conditions = [ledger.c.status == from_status]
+    if reward_type is not None:
+        conditions.append(ledger.c.reward_type == reward_type)
+    if created_from is not None:
+        conditions.append(ledger.c.created_at >= created_from)
+    if created_to is not None:
+        conditions.append(ledger.c.created_at < created_to)
+    
+    values = {"status": new_status}
+    if new_status == "CREDITED":
+        values["credited_at"] = datetime.now()
     
-    reward.status = "REVOKED"
+    id_scopes = [ledger.c.id.in_(chunk) for chunk in chunked(ids)] if ids is not None else [None]
+    returning = db.get_bind().dialect.update_returning
+    changed_columns = (ledger.c.id, ledger.c.user_id, ledger.c.reward_unit, ledger.c.reward_value)
+    changed = []
+    for id_scope in id_scopes:
+        where = conditions + ([id_scope] if id_scope is not None else [])
+        if returning:
+            changed.extend(db.execute(update(ledger).where(*where).values(**values).returning(*changed_columns)))
+        else:
+            matched = db.execute(select(*changed_columns).where(*where).with_for_update()).all()
+            if matched:
+                db.execute(update(ledger).where(ledger.c.id.in_([row.id for row in matched])).values(**values))
+            changed.extend(matched)
+    
+    adjust_balances(db, [
+        transition_delta(row.user_id, row.reward_unit, row.reward_value, from_status, new_status)
+        for row in changed
+    ])
+    bump_user_versions(db, [row.user_id for row in changed])
+    transitioned = [row.id for row in changed]
     db.commit()
+    dashboard_snapshot.invalidate()
+    
+    transitioned.sort()
+    done = set(transitioned)
+    skipped = sorted(set(ids) - done) if ids is not None else []
+    return {
+        "status": new_status,
+        "transitioned": transitioned,
+        "skipped": skipped,
+        "transitioned_count": len(transitioned),
+        "skipped_count": len(skipped)
+    }
+
+def bulk_credit_rewards(db: Session, ids: Optional[list] = None, reward_type: Optional[str] = None,
+                        created_from: Optional[datetime] = None, created_to: Optional[datetime] = None) -> dict:
+    """Credit every PENDING reward selected by ids or filter"""
+    return _bulk_transition(db, "CREDITED", "PENDING", ids, reward_type, created_from, created_to)
+
+def bulk_revoke_rewards(db: Session, ids: Optional[list] = None, status: str = "PENDING",
+                        reward_type: Optional[str] = None, created_from: Optional[datetime] = None,
+                        created_to: Optional[datetime] = None) -> dict:
+    """Revoke every reward in `status` (PENDING by default, or CREDITED) selected by ids or filter"""
+    if status not in ("PENDING", "CREDITED"):
+        raise ValueError("Only PENDING or CREDITED rewards can be revoked")
+    return _bulk_transition(db, "REVOKED", status, ids, reward_type, created_from, created_to)
 
 def create_reward_config(db: Session, reward_type: str, reward_value: int, reward_unit: str) -> dict:
     """Create a new reward configuration"""
@@ -98,8 +197,11 @@ def create_reward_config(db: Session, reward_type: str, reward_value: int, rewar
             reward_unit=reward_unit
         )
         db.add(config)
+    # Other workers notice the new version on their next check
+    bump_config_version(db)
     
     db.commit()
+    reward_config_cache.invalidate()
     db.refresh(existing if existing else config)
     
     return existing if existing else config
@@ -0,0 +1,39 @@
+from collections import namedtuple
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.core.cache import VersionedCache
+from app.core.config import settings
+from app.core.database import upsert
+from app.models.models import ConfigVersion, RewardConfig
+
+REWARD_CONFIGS = "reward_configs"
+
+# Detached copy of an active config row; safe to share across sessions
+ActiveRewardConfig = namedtuple("ActiveRewardConfig", ["reward_type", "reward_value", "reward_unit"])
+
+reward_config_cache = VersionedCache(
+    ttl_seconds=settings.REWARD_CONFIG_CACHE_TTL_SECONDS,
+    check_seconds=settings.REWARD_CONFIG_VERSION_CHECK_SECONDS
+)
+
+def read_config_version(db: Session, name: str = REWARD_CONFIGS) -> int:
+    return db.query(ConfigVersion.version).filter(ConfigVersion.name == name).scalar() or 0
+
+def bump_config_version(db: Session, name: str = REWARD_CONFIGS) -> None:
+    """Increment the version in the caller's transaction (no commit)"""
+    table = ConfigVersion.__table__
+    upsert(db, table, {"name": name, "version": 1}, ["name"], lambda incoming: {"version": table.c.version + 1})
+
+def _load_active_configs(db: Session) -> dict:
+    rows = db.query(
+        RewardConfig.reward_type, RewardConfig.reward_value, RewardConfig.reward_unit
+    ).filter(RewardConfig.is_active == True)
+    return {row.reward_type: ActiveRewardConfig(*row) for row in rows}
+
+def get_active_reward_config(db: Session, reward_type: str) -> Optional[ActiveRewardConfig]:
+    """Active config for a reward type, read through the process-local cache"""
+    configs = reward_config_cache.get(
+        lambda: read_config_version(db),
+        lambda: _load_active_configs(db)
+    )
+    return configs.get(reward_type)
@@ -0,0 +1,55 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.core.cache import LRUCache, MISSING
+from app.core.config import settings
+from app.core.database import chunked, upsert
+from app.models.models import User, UserVersion
+
+# Usernames never change owner, so a cached id only goes stale by expiry
+username_cache = LRUCache(
+    max_size=settings.USERNAME_CACHE_SIZE,
+    ttl_seconds=settings.USERNAME_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.USERNAME_CACHE_NEGATIVE_TTL_SECONDS
+)
+
+def resolve_user_id(db: Session, username: str) -> Optional[int]:
+    """User id for a username, or None for an unknown user"""
+    user_id = username_cache.get(username)
+    if user_id is MISSING:
+        user_id = db.query(User.id).filter(User.username == username).scalar()
+        username_cache.put(username, user_id)
+    return user_id
+
+def resolve_user_ids(db: Session, usernames: list) -> dict:
+    """username -> id for the names that exist; unknown names are left out and not cached"""
+    user_ids = {}
+    missing = []
+    for username in usernames:
+        user_id = username_cache.get(username)
+        if user_id is MISSING or user_id is None:
+            missing.append(username)
+        else:
+            user_ids[username] = user_id
+    for chunk in chunked(missing):
+        for username, user_id in db.query(User.username, User.id).filter(User.username.in_(chunk)):
+            user_ids[username] = user_id
+            username_cache.put(username, user_id)
+    return user_ids
+
+def remember_user_id(username: str, user_id: int) -> None:
+    username_cache.put(username, user_id)
+
+def get_user_version(db: Session, username: str) -> int:
+    """Change version of a user's data; 0 for unknown users and users never changed"""
+    user_id = resolve_user_id(db, username)
+    if user_id is None:
+        return 0
+    return db.query(UserVersion.version).filter(UserVersion.user_id == user_id).scalar() or 0
+
+def bump_user_versions(db: Session, user_ids) -> None:
+    """Increment the change version of each user in the caller's transaction (no commit)"""
+    rows = [{"user_id": user_id, "version": 1} for user_id in sorted(set(user_ids))]
+    if not rows:
+        return
+    table = UserVersion.__table__
+    upsert(db, table, rows, ["user_id"], lambda incoming: {"version": table.c.version + 1})
@@ -1,8 +1,18 @@
 # app/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.api import referral, reward, admin
-from app.core.database import engine, Base
+from app.core import metrics
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.config import settings
+from app.core.database import engine, async_engine, Base, SessionLocal
+from app.core.workers import WorkerPool
+from app.crud.balance import backfill_balances
+from app.crud.outbox import outbox_task
+from app.crud.referral import rebuild_leaderboard
+from app.crud.referral_graph import rebuild_referral_graph
+from app.crud.referral_stats import backfill_referral_stats
 from app.models import models
 
 # Create all tables
@@ -13,6 +23,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Innermost of the middlewares, so 429s still get CORS headers and metrics
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -21,11 +34,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    for db_engine in (engine, async_engine):
+        if db_engine is not None:
+            metrics.instrument_engine(db_engine)
+
+outbox_workers = WorkerPool(
+    "outbox", outbox_task(SessionLocal), settings.OUTBOX_WORKERS, settings.OUTBOX_POLL_SECONDS
+)
+
 # Include routers
 app.include_router(referral.router)
 app.include_router(reward.router)
 app.include_router(admin.router)
 
+@app.on_event("startup")
+def backfill_derived_tables():
+    """Fill maintained tables that create_all added to an existing database"""
+    if not settings.STARTUP_TASKS_ENABLED:
+        return
+    db = SessionLocal()
+    try:
+        backfill_balances(db)
+        backfill_referral_stats(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def seed_leaderboard():
+    """Load the in-memory leaderboard (and referral graph index) before the first request"""
+    if not settings.STARTUP_TASKS_ENABLED:
+        return
+    db = SessionLocal()
+    try:
+        rebuild_leaderboard(db)
+        if settings.REFERRAL_GRAPH_INDEX_ENABLED:
+            rebuild_referral_graph(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def start_outbox_workers():
+    """Auto-credit rewards in the background (OUTBOX_WORKERS=0 leaves it to outbox_worker.py)"""
+    if settings.STARTUP_TASKS_ENABLED:
+        outbox_workers.start()
+
+@app.on_event("shutdown")
+def stop_outbox_workers():
+    outbox_workers.stop()
+
 @app.get("/")
 def read_root():
     return {
@@ -36,4 +94,9 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "timestamp": "2024-01-15T00:00:00Z"}
\ No newline at end of file
+    return {"status": "healthy", "timestamp": "2024-01-15T00:00:00Z"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Request latency and SQL metrics in Prometheus text format"""
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -1,3 +1,3 @@
-from app.models.models import Base, User, Referral,  RewardLedger
+from app.models.models import Base, User, Referral,  RewardLedger, UserRewardBalance, UserReferralStats, ConfigVersion, UserVersion
 
-__all__ = ["Base", "User", "Referral", "RewardLedger"]
\ No newline at end of file
+__all__ = ["Base", "User", "Referral", "RewardLedger", "UserRewardBalance", "UserReferralStats", "ConfigVersion", "UserVersion"]
\ No newline at end of file
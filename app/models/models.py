@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -28,6 +28,16 @@ class Referral(Base):
     referred_user = relationship("User", foreign_keys=[referred_user_id], back_populates="referrals_received")
     reward = relationship("RewardLedger", back_populates="referral", uselist=False)
 
+    __table_args__ = (
+        # Summary/list lookups by referrer, plus the "successful" count and leaderboard
+        Index("ix_referrals_referred_by_referred_user_id", "referred_by", "referred_user_id"),
+        # "Already used a referral code" check in apply_referral_code
+        Index("ix_referrals_referred_user_id", "referred_user_id"),
+        # Activity analytics windows
+        Index("ix_referrals_created_at", "created_at"),
+        Index("ix_referrals_used_at", "used_at"),
+    )
+
 class RewardLedger(Base):
     __tablename__ = "reward_ledger"
     
@@ -43,6 +53,39 @@ class RewardLedger(Base):
     user = relationship("User", back_populates="rewards")
     referral = relationship("Referral", back_populates="reward")
 
+    __table_args__ = (
+        # Reward summary: SUM(...) per user split by status
+        Index("ix_reward_ledger_user_id_status", "user_id", "status"),
+        # Reward history: per user, newest first
+        Index("ix_reward_ledger_user_id_created_at", "user_id", "created_at"),
+        # Admin pending queue, newest first
+        Index("ix_reward_ledger_status_created_at", "status", "created_at"),
+        # Activity analytics window
+        Index("ix_reward_ledger_created_at", "created_at"),
+    )
+
+class UserReferralStats(Base):
+    """Per-referrer counters kept in step with referrals on every write"""
+    __tablename__ = "user_referral_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    referral_code = Column(String, nullable=True)
+    codes_issued = Column(Integer, nullable=False, default=0)
+    codes_used = Column(Integer, nullable=False, default=0)
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class UserRewardBalance(Base):
+    """Per-user, per-unit reward totals kept in step with reward_ledger on every write"""
+    __tablename__ = "user_reward_balances"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    reward_unit = Column(String, primary_key=True)
+    pending = Column(Integer, nullable=False, default=0)
+    credited = Column(Integer, nullable=False, default=0)
+    revoked = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class RewardConfig(Base):
     __tablename__ = "reward_configs"
     
@@ -51,4 +94,62 @@ class RewardConfig(Base):
     reward_value = Column(Integer, nullable=False)
     reward_unit = Column(String, nullable=False, default="points")
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ConfigVersion(Base):
+    """Change counter per config table, so workers can check cached copies cheaply"""
+    __tablename__ = "config_versions"
+    
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class UserVersion(Base):
+    """Per-user change counter behind the ETags of the user read endpoints"""
+    __tablename__ = "user_versions"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class RewardOutbox(Base):
+    """
+    Reward events written in the ledger insert's transaction and drained by
+    the auto-credit workers. A row is claimed by setting claimed_by and a
+    lease; it is deleted once handled.
+    """
+    __tablename__ = "reward_outbox"
+    
+    id = Column(Integer, primary_key=True)
+    reward_id = Column(Integer, ForeignKey("reward_ledger.id"), nullable=False)
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    claimed_by = Column(String, nullable=True)
+    claimed_until = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Claim scan: due rows in id order
+        Index("ix_reward_outbox_available_at", "available_at"),
+        # Claimed batch lookup after the claiming UPDATE
+        Index("ix_reward_outbox_claimed_by", "claimed_by"),
+    )
+
+class IdempotencyKey(Base):
+    """
+    First response per Idempotency-Key, replayed to retries. A row without
+    a status is a request still in flight; expires_at bounds both that
+    lock and how long a finished response is kept.
+    """
+    __tablename__ = "idempotency_keys"
+    
+    # sha256 of scope + client key, so the key column stays fixed-width
+    key = Column(String(64), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response = Column(Text, nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        # Purge of expired keys
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
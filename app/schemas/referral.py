@@ -6,11 +6,26 @@ from typing import Optional
 class ReferralApplyRequest(BaseModel):
     referral_code: str
 
+class ReferralBulkApplyItem(BaseModel):
+    user_id: str
+    referral_code: str
+
+class ReferralBulkApplyRequest(BaseModel):
+    items: list[ReferralBulkApplyItem]
+
+class ReferralBulkApplyResult(BaseModel):
+    user_id: str
+    referral_code: str
+    status: str
+    message: str
+    referrer_id: Optional[int] = None
+
 class ReferralSummaryResponse(BaseModel):
-    my_referral_code: str
+    my_referral_code: Optional[str] = None
     total_referrals: int
     successful_referrals: int
     conversion_rate: str
+    last_used_at: Optional[datetime] = None
     
     model_config = ConfigDict(from_attributes=True)
 
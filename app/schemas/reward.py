@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class RewardSummaryResponse(BaseModel):
     total_earned: int
@@ -16,6 +16,21 @@ class RewardHistoryItem(BaseModel):
     status: str
     created_at: datetime
 
+class RewardBulkActionRequest(BaseModel):
+    """Select rewards by explicit ids, or by filter when ids is omitted"""
+    ids: Optional[List[int]] = None
+    status: str = "PENDING"
+    reward_type: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+class RewardBulkActionResponse(BaseModel):
+    status: str
+    transitioned: List[int]
+    skipped: List[int]
+    transitioned_count: int
+    skipped_count: int
+
 class RewardConfigCreate(BaseModel):
     reward_type: str
     reward_value: int
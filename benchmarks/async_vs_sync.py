@@ -0,0 +1,122 @@
+# benchmarks/async_vs_sync.py
+"""
+Requests/sec and latency percentiles for the read endpoints served from a
+sync Session (threadpool) vs an AsyncSession (aiosqlite on the event loop).
+
+Both modes run the same app in-process through an ASGI transport against
+the same seeded SQLite file, selected by overriding get_db.
+
+Usage:
+    python -m benchmarks.async_vs_sync --users 2000 --requests 4000 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.core.database import Base, async_url, get_db
+from app.crud.balance import backfill_balances
+from app.crud.referral_stats import backfill_referral_stats
+from app.models.models import User, Referral, RewardLedger
+
+def seed(url: str, users: int) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": i, "username": f"user{i}"} for i in range(1, users + 1)])
+        conn.execute(Referral.__table__.insert(), [
+            {"referral_code": f"SVH-{i:08d}", "referred_by": i, "referred_user_id": i % users + 1}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(RewardLedger.__table__.insert(), [
+            {"user_id": i % users + 1, "reward_type": "SIGNUP", "reward_value": 100,
+             "reward_unit": "points", "status": "PENDING"}
+            for i in range(users * 5)
+        ])
+    # The rows above bypass the CRUD writes, so fill the maintained tables the summaries read
+    db = sessionmaker(bind=engine)()
+    backfill_referral_stats(db)
+    backfill_balances(db)
+    db.close()
+    engine.dispose()
+
+def sync_override(url: str):
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+    return override_get_db, engine.dispose
+
+def async_override(url: str):
+    engine = create_async_engine(async_url(url))
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_db():
+        async with Session() as db:
+            yield db
+    return override_get_db, None
+
+async def drive(users: int, requests: int, concurrency: int) -> dict:
+    paths = [
+        lambda i: f"/api/rewards/summary?user_id=user{i % users + 1}",
+        lambda i: f"/api/rewards/history?user_id=user{i % users + 1}&limit=20",
+        lambda i: f"/api/referral/analytics/summary?user_id=user{i % users + 1}",
+        lambda i: f"/api/referral/analytics/list?user_id=user{i % users + 1}",
+    ]
+    latencies = []
+    counter = iter(range(requests))
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for i in counter:
+                started = time.perf_counter()
+                response = await client.get(paths[i % len(paths)](i))
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(url, args.users)
+        for mode, build in (("sync", sync_override), ("async", async_override)):
+            override, dispose = build(url)
+            app.dependency_overrides[get_db] = override
+            result = asyncio.run(drive(args.users, args.requests, args.concurrency))
+            app.dependency_overrides.pop(get_db, None)
+            if dispose:
+                dispose()
+            print(f"{mode:>5}: {result['rps']:8.1f} req/s  p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms")
+
+if __name__ == "__main__":
+    main()
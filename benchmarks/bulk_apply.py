@@ -0,0 +1,64 @@
+# benchmarks/bulk_apply.py
+"""
+Referral applies per second: one apply_referral_code call per pair vs a
+single bulk_apply_referral_codes batch, on identically seeded SQLite files.
+
+Usage:
+    python -m benchmarks.bulk_apply --items 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.crud.referral import apply_referral_code, bulk_apply_referral_codes
+from app.models.models import User, Referral, RewardConfig, RewardLedger
+
+def seeded_session(path: str, referrers: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": i, "username": f"referrer{i}"} for i in range(1, referrers + 1)])
+        conn.execute(Referral.__table__.insert(), [
+            {"referral_code": f"SVH-{i:08d}", "referred_by": i} for i in range(1, referrers + 1)
+        ])
+        conn.execute(RewardConfig.__table__.insert(), {
+            "reward_type": "SIGNUP", "reward_value": 100, "reward_unit": "points", "is_active": True
+        })
+    return sessionmaker(bind=engine)()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5000)
+    args = parser.parse_args()
+
+    items = [(f"signup{i}", f"SVH-{i:08d}") for i in range(1, args.items + 1)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = seeded_session(os.path.join(tmp, "single.db"), args.items)
+        started = time.perf_counter()
+        for user_id, code in items:
+            apply_referral_code(db, user_id=user_id, code=code)
+        single = time.perf_counter() - started
+        single_rewards = db.query(func.count(RewardLedger.id)).scalar()
+        db.close()
+
+        db = seeded_session(os.path.join(tmp, "bulk.db"), args.items)
+        started = time.perf_counter()
+        results = bulk_apply_referral_codes(db, items)
+        bulk = time.perf_counter() - started
+        bulk_rewards = db.query(func.count(RewardLedger.id)).scalar()
+        db.close()
+
+    assert all(r["status"] == "success" for r in results)
+    assert single_rewards == bulk_rewards == args.items
+    print(f"single-item path: {single:8.2f} s  {args.items / single:10,.0f} applies/s")
+    print(f"bulk path:        {bulk:8.2f} s  {args.items / bulk:10,.0f} applies/s")
+    print(f"speedup:          {single / bulk:8.1f}x")
+
+if __name__ == "__main__":
+    main()
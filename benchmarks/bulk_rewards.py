@@ -0,0 +1,69 @@
+# benchmarks/bulk_rewards.py
+"""
+Time to credit a large PENDING queue: bulk_credit_rewards by filter and by
+id list vs one credit_reward call (load, mutate, commit) per row.
+
+The per-row path is timed on a sample and extrapolated.
+
+Usage:
+    python -m benchmarks.bulk_rewards --rows 100000 --sample 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.crud.reward import bulk_credit_rewards, credit_reward
+from app.models.models import User, RewardLedger
+
+def seeded_session(path: str, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": i, "username": f"user{i}"} for i in range(1, 1001)])
+        conn.execute(RewardLedger.__table__.insert(), [
+            {"id": i, "user_id": i % 1000 + 1, "reward_type": "SIGNUP", "reward_value": 100,
+             "reward_unit": "points", "status": "PENDING"}
+            for i in range(1, rows + 1)
+        ])
+    return sessionmaker(bind=engine)()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = seeded_session(os.path.join(tmp, "filter.db"), args.rows)
+        started = time.perf_counter()
+        result = bulk_credit_rewards(db, reward_type="SIGNUP")
+        by_filter = time.perf_counter() - started
+        assert result["transitioned_count"] == args.rows
+        db.close()
+
+        db = seeded_session(os.path.join(tmp, "ids.db"), args.rows)
+        started = time.perf_counter()
+        result = bulk_credit_rewards(db, ids=list(range(1, args.rows + 1)))
+        by_ids = time.perf_counter() - started
+        assert result["transitioned_count"] == args.rows
+        db.close()
+
+        db = seeded_session(os.path.join(tmp, "single.db"), args.sample)
+        started = time.perf_counter()
+        for reward_id in range(1, args.sample + 1):
+            credit_reward(db, reward_id)
+        per_row = (time.perf_counter() - started) / args.sample
+        db.close()
+
+    print(f"rows:                     {args.rows:,}")
+    print(f"bulk-credit by filter:    {by_filter:8.2f} s")
+    print(f"bulk-credit by ids:       {by_ids:8.2f} s")
+    print(f"per-row credit_reward:    {per_row * args.rows:8.2f} s (extrapolated from {args.sample:,})")
+
+if __name__ == "__main__":
+    main()
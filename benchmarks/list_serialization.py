@@ -0,0 +1,136 @@
+# benchmarks/list_serialization.py
+"""
+CPU time per 1,000 rows for the list endpoints' response bodies: the
+previous path (ORM/row -> dict per row, then Pydantic validation and
+FastAPI's JSON encoding) against query rows encoded directly by orjson.
+"query" includes fetching the rows; "encode" is serialization alone.
+
+Usage:
+    python -m benchmarks.list_serialization --rows 50000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import aliased, sessionmaker
+
+import synthetic_data
+from app.core.pagination import encode_rows
+from app.crud.referral import _referral_list_query
+from app.crud.reward import _pending_rewards_query
+from app.models.models import Referral, RewardLedger, User
+from app.schemas.referral import ReferralListItem
+
+REFERRAL_LIST_FIELDS = tuple(ReferralListItem.model_fields)
+
+def legacy_referral_list(db, referrer_id: int, limit: int) -> list:
+    ReferredUser = aliased(User)
+    rows = db.query(
+        Referral.id, Referral.referral_code, Referral.referred_user_id, Referral.used_at, ReferredUser.username
+    ).outerjoin(ReferredUser, ReferredUser.id == Referral.referred_user_id).filter(
+        Referral.referred_by == referrer_id
+    ).order_by(Referral.created_at.desc(), Referral.id.desc()).limit(limit).all()
+    return [
+        {
+            "id": row.id,
+            "referral_code": row.referral_code,
+            "used_by_user_id": row.username,
+            "used_at": row.used_at,
+            "status": "SUCCESS" if row.referred_user_id else "PENDING"
+        }
+        for row in rows
+    ]
+
+def legacy_pending(db, limit: int) -> list:
+    rows = db.query(RewardLedger, User.username).outerjoin(User, User.id == RewardLedger.user_id).filter(
+        RewardLedger.status == "PENDING"
+    ).order_by(RewardLedger.created_at.desc(), RewardLedger.id.desc()).limit(limit).all()
+    return [
+        {
+            "id": reward.id,
+            "user_id": username if username else str(reward.user_id),
+            "reward_type": reward.reward_type,
+            "reward_value": reward.reward_value,
+            "reward_unit": reward.reward_unit,
+            "created_at": reward.created_at,
+            "referral_id": reward.referral_id
+        }
+        for reward, username in rows
+    ]
+
+referral_list_adapter = TypeAdapter(List[ReferralListItem])
+
+def fastapi_encode(items: list, adapter=None) -> bytes:
+    """What FastAPI 0.104 does with a returned list: validate, dump, json.dumps"""
+    if adapter is not None:
+        content = adapter.dump_python(adapter.validate_python(items), mode="json")
+    else:
+        content = jsonable_encoder(items)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+def cpu_ms_per_thousand(fn, rows: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        fn()
+        best = min(best, time.process_time() - started)
+    return best * 1000 / (rows / 1000)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="rows per response")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'lists.db')}")
+        # A steep Zipf exponent gives one referrer most of the codes
+        synthetic_data.generate(engine, args.rows, args.rows * 2, used_ratio=0.5, alpha=3.0, seed=7)
+        db = sessionmaker(bind=engine)()
+        referrer_id = db.execute(
+            select(Referral.referred_by).group_by(Referral.referred_by).order_by(func.count().desc()).limit(1)
+        ).scalar()
+        limit = args.rows
+
+        referral_rows = _referral_list_query(db, referrer_id, limit, None).all()
+        legacy_referrals = legacy_referral_list(db, referrer_id, limit)
+        pending_rows = _pending_rewards_query(db, limit, None).all()
+        legacy_pending_items = legacy_pending(db, limit)
+        assert json.loads(encode_rows(referral_rows, REFERRAL_LIST_FIELDS)) == json.loads(
+            fastapi_encode(legacy_referrals, referral_list_adapter)
+        )
+        assert json.loads(encode_rows(pending_rows)) == json.loads(fastapi_encode(legacy_pending_items))
+
+        cases = {
+            f"referral list ({len(referral_rows):,} rows)": (len(referral_rows), {
+                "before query+encode": lambda: fastapi_encode(
+                    legacy_referral_list(db, referrer_id, limit), referral_list_adapter
+                ),
+                "after  query+encode": lambda: encode_rows(
+                    _referral_list_query(db, referrer_id, limit, None).all(), REFERRAL_LIST_FIELDS
+                ),
+                "before encode": lambda: fastapi_encode(legacy_referrals, referral_list_adapter),
+                "after  encode": lambda: encode_rows(referral_rows, REFERRAL_LIST_FIELDS),
+            }),
+            f"pending rewards ({len(pending_rows):,} rows)": (len(pending_rows), {
+                "before query+encode": lambda: fastapi_encode(legacy_pending(db, limit)),
+                "after  query+encode": lambda: encode_rows(_pending_rewards_query(db, limit, None).all()),
+                "before encode": lambda: fastapi_encode(legacy_pending_items),
+                "after  encode": lambda: encode_rows(pending_rows),
+            }),
+        }
+        for title, (rows, runs) in cases.items():
+            print(title)
+            for name, fn in runs.items():
+                print(f"  {name:<22} {cpu_ms_per_thousand(fn, rows, args.repeat):8.2f} ms CPU / 1k rows")
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
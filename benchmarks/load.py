@@ -0,0 +1,272 @@
+# benchmarks/load.py
+"""
+Load test the API in-process: seed a synthetic dataset (synthetic_data.py), drive a weighted
+mix of endpoints through an ASGI client at a fixed concurrency, and report
+throughput, latency percentiles and SQL statements per request for each
+endpoint as JSON.
+
+SQL counts come from the app's own request metrics (METRICS_ENABLED).
+Pass --baseline with an earlier report to fail on regressions.
+
+Usage:
+    python -m benchmarks.load --users 100000 --referrals 300000 --requests 20000 --concurrency 64 --output run.json
+    python -m benchmarks.load --db bench.db --requests 20000 --baseline previous.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import synthetic_data
+from app.main import app
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import create_db_engine, get_db
+from app.core.rate_limit import rate_limiter
+from app.models.models import Referral, User
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+
+DEFAULT_MIX = (
+    "rewards_summary=20,rewards_history=15,referral_summary=20,referral_list=15,referral_rank=5,"
+    "top_referrers=5,admin_pending=5,admin_dashboard=3,generate=5,apply=7"
+)
+
+class Traffic:
+    """Request parameters for each scenario; apply consumes unused codes in order"""
+
+    def __init__(self, users: int, unused_codes: list, seed_value: int):
+        self.users = users
+        self.rng = random.Random(seed_value)
+        self.unused_codes = iter(unused_codes)
+        self.sequence = 0
+
+    def user(self) -> str:
+        return f"user{self.rng.randint(1, self.users)}"
+
+    def new_user(self) -> str:
+        self.sequence += 1
+        return f"load-{os.getpid()}-{self.sequence}"
+
+    def next_code(self) -> str:
+        return next(self.unused_codes, "SYN-EXHAUSTED")
+
+# name -> (method, route template, request kwargs)
+SCENARIOS = {
+    "rewards_summary": ("GET", "/api/rewards/summary", lambda t: {"params": {"user_id": t.user()}}),
+    "rewards_history": ("GET", "/api/rewards/history", lambda t: {"params": {"user_id": t.user(), "limit": 20}}),
+    "referral_summary": ("GET", "/api/referral/analytics/summary", lambda t: {"params": {"user_id": t.user()}}),
+    "referral_list": ("GET", "/api/referral/analytics/list", lambda t: {"params": {"user_id": t.user(), "limit": 20}}),
+    "referral_rank": ("GET", "/api/referral/analytics/rank", lambda t: {"params": {"user_id": t.user()}}),
+    "top_referrers": ("GET", "/api/referral/admin/top", lambda t: {}),
+    "admin_pending": ("GET", "/api/rewards/admin/pending", lambda t: {"params": {"limit": 50}, "headers": ADMIN}),
+    "admin_dashboard": ("GET", "/api/admin/dashboard", lambda t: {"headers": ADMIN}),
+    "generate": ("POST", "/api/referral/generate", lambda t: {"params": {"user_id": t.new_user()}}),
+    "apply": ("POST", "/api/referral/apply", lambda t: {
+        "params": {"user_id": t.new_user()}, "json": {"referral_code": t.next_code()}
+    }),
+}
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def sql_totals() -> dict:
+    """route template -> (statements, requests) from the app's metrics"""
+    totals = {}
+    for (method, route, status), (total, count) in metrics.request_statements.totals().items():
+        statements, requests = totals.get(route, (0, 0))
+        totals[route] = (statements + total, requests + count)
+    return totals
+
+async def drive(traffic: Traffic, weights: dict, requests: int, concurrency: int) -> tuple:
+    names, cumulative = list(weights), list(weights.values())
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    remaining = iter(range(requests))
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+        async def worker():
+            for _ in remaining:
+                name = traffic.rng.choices(names, weights=cumulative)[0]
+                method, route, build = SCENARIOS[name]
+                started = time.perf_counter()
+                response = await client.request(method, route, **build(traffic))
+                latencies[name].append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, errors, elapsed
+
+def summarize(latencies: dict, errors: dict, elapsed: float, sql_before: dict, sql_after: dict) -> dict:
+    endpoints = {}
+    for name, samples in latencies.items():
+        if not samples:
+            continue
+        samples.sort()
+        route = SCENARIOS[name][1]
+        statements = sql_after.get(route, (0, 0))[0] - sql_before.get(route, (0, 0))[0]
+        requests = sql_after.get(route, (0, 0))[1] - sql_before.get(route, (0, 0))[1]
+        endpoints[name] = {
+            "route": route,
+            "requests": len(samples),
+            "errors": errors[name],
+            "rps": round(len(samples) / elapsed, 1),
+            "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+            "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+            "sql_per_request": round(statements / requests, 2) if requests else None,
+        }
+    total = sum(len(samples) for samples in latencies.values())
+    return {
+        "overall": {"requests": total, "errors": sum(errors.values()), "seconds": round(elapsed, 3),
+                    "rps": round(total / elapsed, 1)},
+        "endpoints": endpoints,
+    }
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """Endpoints whose p95 grew by more than `threshold` or that issue more SQL"""
+    regressions = []
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} ms -> {current['p95_ms']} ms")
+        # Cache warm-up moves the average a little; flag only real extra statements
+        before, after = previous["sql_per_request"] or 0, current["sql_per_request"] or 0
+        if after > before * (1 + threshold) and after - before >= 0.5:
+            regressions.append(f"{name}: SQL/request {previous['sql_per_request']} -> {current['sql_per_request']}")
+    return regressions
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+def dataset_info(url: str, codes_needed: int) -> tuple:
+    """(user count, unused synthetic codes) of a seeded database"""
+    engine = create_db_engine(url)
+    with engine.connect() as conn:
+        users = conn.execute(select(func.max(User.id))).scalar() or 0
+        codes = conn.execute(
+            select(Referral.referral_code)
+            .where(Referral.referred_user_id.is_(None), Referral.referral_code.like("SYN-%"))
+            .limit(codes_needed)
+        ).scalars().all()
+    engine.dispose()
+    return users, codes
+
+def run(url: str, args) -> dict:
+    engine = create_db_engine(url)
+    metrics.instrument_engine(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    users, codes = dataset_info(url, args.requests)
+    traffic = Traffic(users, codes, args.seed)
+    app.dependency_overrides[get_db] = override_get_db
+    # Every simulated user shares one client IP, so throttling is opt-in here
+    rate_limiter.enabled = args.rate_limit
+    try:
+        sql_before = sql_totals()
+        latencies, errors, elapsed = asyncio.run(
+            drive(traffic, parse_mix(args.mix), args.requests, args.concurrency)
+        )
+        sql_after = sql_totals()
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        engine.dispose()
+
+    report = summarize(latencies, errors, elapsed, sql_before, sql_after)
+    report["meta"] = {
+        "commit": git_commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "db_mode": settings.DB_MODE,
+        "metrics_enabled": settings.METRICS_ENABLED,
+        "users": users,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "seed": args.seed,
+        "rate_limit": args.rate_limit,
+    }
+    return report
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--used-ratio", type=float, default=0.6)
+    parser.add_argument("--referrals", type=int, default=0, help="total referral codes (at least one per user)")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="comma-separated scenario=weight pairs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rate-limit", action="store_true", help="keep the per-user/per-IP rate limits on")
+    parser.add_argument("--db", help="reuse (or create once) this SQLite file instead of a temporary one")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p95 growth vs the baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "load.db")
+        url = f"sqlite:///{path}"
+        if not os.path.exists(path):
+            started = time.perf_counter()
+            engine = create_engine(url)
+            synthetic_data.generate(engine, args.users, args.referrals, args.used_ratio, seed=args.seed)
+            engine.dispose()
+            print(f"seeded {path} in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+        report = run(url, args)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(report, json.load(handle), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
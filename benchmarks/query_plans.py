@@ -0,0 +1,140 @@
+# benchmarks/query_plans.py
+"""
+Compare SQLite query plans and timings for the hot CRUD lookups with and
+without the secondary indexes declared in app/models/models.py.
+
+Usage:
+    python -m benchmarks.query_plans --users 20000 --rewards 200000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.dialects import sqlite
+
+from app.core.database import Base
+from app.models.models import User, Referral, RewardLedger
+
+
+def hot_queries(user_id: int) -> dict:
+    """Statements with the same shape as the CRUD read paths"""
+    return {
+        "analytics_summary.total": select(func.count(Referral.id)).where(
+            Referral.referred_by == user_id
+        ),
+        "analytics_summary.successful": select(func.count(Referral.id)).where(
+            Referral.referred_by == user_id,
+            Referral.referred_user_id.isnot(None)
+        ),
+        "apply.already_used": select(Referral.id).where(
+            Referral.referred_user_id == user_id
+        ).limit(1),
+        "top_referrers": select(
+            Referral.referred_by, func.count(Referral.id).label("successful_referrals")
+        ).where(
+            Referral.referred_user_id.isnot(None)
+        ).group_by(Referral.referred_by).order_by(text("successful_referrals DESC")).limit(10),
+        "reward_summary": select(
+            func.sum(RewardLedger.reward_value).filter(RewardLedger.status == "CREDITED"),
+            func.sum(RewardLedger.reward_value).filter(RewardLedger.status == "PENDING"),
+        ).where(RewardLedger.user_id == user_id),
+        "reward_history": select(RewardLedger.id).where(
+            RewardLedger.user_id == user_id
+        ).order_by(RewardLedger.created_at.desc()),
+        "pending_rewards": select(RewardLedger.id).where(
+            RewardLedger.status == "PENDING"
+        ).order_by(RewardLedger.created_at.desc()).limit(100),
+    }
+
+
+def seed(engine, users: int, rewards: int, seed_value: int) -> None:
+    rng = random.Random(seed_value)
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "username": f"user{i}"} for i in range(1, users + 1)
+        ])
+        conn.execute(Referral.__table__.insert(), [
+            {
+                "id": i,
+                "referral_code": f"SVH-{i:08d}",
+                "referred_by": i,
+                "referred_user_id": rng.randint(1, users) if rng.random() < 0.4 else None,
+                "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)),
+            }
+            for i in range(1, users + 1)
+        ])
+        conn.execute(RewardLedger.__table__.insert(), [
+            {
+                "user_id": rng.randint(1, users),
+                "reward_type": "SIGNUP",
+                "reward_value": 100,
+                "reward_unit": "points",
+                "status": rng.choice(("PENDING", "CREDITED", "CREDITED", "REVOKED")),
+                "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)),
+            }
+            for _ in range(rewards)
+        ])
+
+
+def measure(engine, user_id: int, repeat: int) -> dict:
+    results = {}
+    with engine.connect() as conn:
+        for name, stmt in hot_queries(user_id).items():
+            sql = str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+            started = time.perf_counter()
+            for _ in range(repeat):
+                conn.exec_driver_sql(sql).fetchall()
+            elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+            results[name] = {"plan": plan, "ms": elapsed_ms}
+    return results
+
+
+def drop_secondary_indexes(engine) -> None:
+    with engine.begin() as conn:
+        for table in (Referral.__table__, RewardLedger.__table__):
+            for index in table.indexes:
+                if index.name != f"ix_{table.name}_id":
+                    conn.exec_driver_sql(f"DROP INDEX {index.name}")
+        conn.exec_driver_sql("ANALYZE")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--rewards", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    seed(engine, args.users, args.rewards, args.seed)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    user_id = args.users // 2
+    indexed = measure(engine, user_id, args.repeat)
+    drop_secondary_indexes(engine)
+    unindexed = measure(engine, user_id, args.repeat)
+
+    regressions = []
+    for name in indexed:
+        before, after = unindexed[name], indexed[name]
+        print(f"\n{name}")
+        print(f"  without indexes: {before['ms']:8.3f} ms  {' | '.join(before['plan'])}")
+        print(f"  with indexes:    {after['ms']:8.3f} ms  {' | '.join(after['plan'])}")
+        if any(step.startswith("SCAN referrals") or step.startswith("SCAN reward_ledger")
+               for step in after["plan"] if "INDEX" not in step):
+            regressions.append(name)
+
+    if regressions:
+        raise SystemExit(f"\nFull table scans remain for: {', '.join(regressions)}")
+    print("\nAll hot lookups use an index.")
+
+
+if __name__ == "__main__":
+    main()
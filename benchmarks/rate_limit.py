@@ -0,0 +1,68 @@
+# benchmarks/rate_limit.py
+"""
+Rate limiter overhead: the bucket check on its own (fresh keys, repeat
+keys, and a full store that evicts on every check) and the middleware
+in front of a no-op ASGI app, for a limited and an unlimited route.
+
+Usage:
+    python -m benchmarks.rate_limit --checks 200000
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.rate_limit import MemoryBucketStore, RateLimiter, RateLimitMiddleware
+
+RULES = {("POST", "/limited"): {"user": (1e9, 1e9), "ip": (1e9, 1e9)}}
+
+def check_cost(checks: int, distinct_users: int, max_keys: int) -> float:
+    """Microseconds per RateLimiter.check()"""
+    limiter = RateLimiter(RULES, MemoryBucketStore(max_keys))
+    users = [f"user{i}" for i in range(distinct_users)]
+    started = time.perf_counter()
+    for i in range(checks):
+        limiter.check("POST", "/limited", users[i % distinct_users], "10.0.0.1")
+    return (time.perf_counter() - started) / checks * 1e6
+
+async def noop_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+async def asgi_cost(app, path: str, requests: int) -> float:
+    """Microseconds per request through `app`"""
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for i in range(requests):
+        scope = {
+            "type": "http", "method": "POST", "path": path,
+            "query_string": f"user_id=user{i % 1000}".encode(), "client": ("10.0.0.1", 5000)
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=200000)
+    args = parser.parse_args()
+
+    print("RateLimiter.check")
+    print(f"  1,000 repeat users        {check_cost(args.checks, 1000, 100000):6.2f} us")
+    print(f"  all distinct users        {check_cost(args.checks, args.checks, args.checks * 2):6.2f} us")
+    print(f"  full store, evicting      {check_cost(args.checks, args.checks, 1000):6.2f} us")
+
+    middleware = RateLimitMiddleware(noop_app, RateLimiter(RULES, MemoryBucketStore(100000)))
+    bare = asyncio.run(asgi_cost(noop_app, "/limited", args.checks))
+    unlimited = asyncio.run(asgi_cost(middleware, "/unlimited", args.checks))
+    limited = asyncio.run(asgi_cost(middleware, "/limited", args.checks))
+    print("ASGI request (no-op app)")
+    print(f"  bare app                  {bare:6.2f} us")
+    print(f"  unlimited route           {unlimited:6.2f} us  (+{unlimited - bare:.2f})")
+    print(f"  limited route             {limited:6.2f} us  (+{limited - bare:.2f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/referral_graph.py
+"""
+Downline and upline reads over a synthetic referral graph: the recursive
+CTE against the in-memory adjacency index, for the referrer with the
+largest downline. Also reports how long loading the index takes.
+
+Usage:
+    python -m benchmarks.referral_graph --users 200000 --depth 5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import synthetic_data
+from app.crud.referral_graph import _downline_sql, _upline_sql, rebuild_referral_graph, referral_graph
+from app.models.models import Referral
+
+def ms_per_call(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'graph.db')}")
+        synthetic_data.generate(engine, args.users, args.users * 2, used_ratio=0.5, alpha=1.5, seed=7)
+        db = sessionmaker(bind=engine)()
+
+        started = time.perf_counter()
+        rebuild_referral_graph(db)
+        load_ms = (time.perf_counter() - started) * 1000
+        stats = referral_graph.stats()
+        print(f"index load                 {load_ms:9.1f} ms  ({stats['edges']:,} edges)")
+
+        # The root with the largest downline, not just the most direct referrals
+        referrers = db.execute(
+            select(Referral.referred_by).where(Referral.referred_user_id.isnot(None))
+            .group_by(Referral.referred_by).order_by(func.count().desc()).limit(20)
+        ).scalars().all()
+        root = max(referrers, key=lambda user: sum(referral_graph.downline(user, args.depth)[0].values()))
+        levels, branches = referral_graph.downline(root, args.depth)
+        assert (levels, branches) == _downline_sql(db, root, args.depth)
+        print(f"downline of user {root}: {sum(levels.values()):,} users over {len(levels)} levels")
+
+        # The user with the longest referral chain above them
+        leaf = max(range(1, args.users + 1), key=lambda user: len(referral_graph.upline(user, 20)))
+        assert referral_graph.upline(leaf, 20) == _upline_sql(db, leaf, 20)
+
+        cases = {
+            f"downline depth {args.depth} (CTE)": lambda: _downline_sql(db, root, args.depth),
+            f"downline depth {args.depth} (index)": lambda: referral_graph.downline(root, args.depth),
+            "upline (CTE)": lambda: _upline_sql(db, leaf, 20),
+            "upline (index)": lambda: referral_graph.upline(leaf, 20),
+        }
+        for name, fn in cases.items():
+            print(f"{name:<26} {ms_per_call(fn, args.repeat):9.3f} ms")
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
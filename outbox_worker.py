@@ -0,0 +1,65 @@
+# outbox_worker.py
+"""
+Run auto-credit outbox workers outside the API process. Workers claim
+disjoint batches, so throughput grows with --workers and with the number
+of processes running this script.
+
+Usage:
+    python outbox_worker.py --workers 4     # run until interrupted
+    python outbox_worker.py --once          # drain everything due, then exit
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine, Base
+from app.core.workers import WorkerPool
+from app.crud.outbox import drain_once, get_outbox_stats, outbox_task
+
+def drain(batch_size: int) -> dict:
+    """Process every due event in this thread; returns totals"""
+    worker = f"cli-{os.getpid()}"
+    processed, batches = 0, 0
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        while True:
+            done = drain_once(db, worker, batch_size)
+            if not done:
+                break
+            processed += done
+            batches += 1
+        stats = get_outbox_stats(db)
+    finally:
+        db.close()
+    return {"processed": processed, "batches": batches, "seconds": round(time.perf_counter() - started, 3),
+            "outbox": stats}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.OUTBOX_WORKERS or 1)
+    parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+    parser.add_argument("--once", action="store_true", help="drain what is due in one thread and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(threadName)s %(levelname)s %(message)s")
+    Base.metadata.create_all(bind=engine)
+    if args.once:
+        print(json.dumps(drain(args.batch_size), indent=2, default=str))
+        return 0
+
+    pool = WorkerPool("outbox", outbox_task(SessionLocal, args.batch_size), args.workers, settings.OUTBOX_POLL_SECONDS)
+    pool.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
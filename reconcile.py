@@ -0,0 +1,41 @@
+# reconcile.py
+"""
+Check derived tables against the source of truth and optionally rebuild them.
+
+Usage:
+    python reconcile.py balances          # report drift only
+    python reconcile.py balances --fix    # rebuild from reward_ledger
+    python reconcile.py counters --fix    # rebuild referral counters from referrals
+"""
+import argparse
+import json
+import sys
+
+from app.core.database import SessionLocal, engine, Base
+from app.crud.balance import reconcile_balances
+from app.crud.referral_stats import reconcile_referral_stats
+
+CHECKS = {
+    "balances": reconcile_balances,
+    "counters": reconcile_referral_stats,
+}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("check", choices=sorted(CHECKS))
+    parser.add_argument("--fix", action="store_true", help="rebuild the derived table when drift is found")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        report = CHECKS[args.check](db, fix=args.fix)
+    finally:
+        db.close()
+
+    print(json.dumps(report, indent=2, default=str))
+    # Non-zero exit on unfixed drift so it can gate deploys / cron alerts
+    return 1 if report["drift_count"] and not report["fixed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 # seed_data.py
 from app.core.database import SessionLocal, engine
+from app.crud.referral_stats import reconcile_referral_stats
+from app.crud.reward_config import bump_config_version
 from app.models.models import Base, User, Referral, RewardConfig
 import random
 import string
@@ -31,6 +33,7 @@ def init_db():
             ).first()
             if not existing:
                 db.add(RewardConfig(**config))
+                bump_config_version(db)
         
         # Create sample users
         sample_users = ["Alice", "Bob", "Charlie", "David", "Eve"]
@@ -53,6 +56,9 @@ def init_db():
                 db.add(referral)
         
         db.commit()
+        # Codes above bypass the app's counters; rebuild them from referrals
+        reconcile_referral_stats(db, fix=True)
+        
         print("✅ Database seeded with sample data!")
         print("\nSample Users & Codes:")
         print("-" * 30)
@@ -0,0 +1,244 @@
+# synthetic_data.py
+"""
+Generate a large, reproducible synthetic dataset with batched Core inserts.
+
+Every user owns one code; the remaining referrals go to referrers drawn
+from a power-law (Zipf) distribution, so a few users hold most codes. A
+share of codes is used, each use by a distinct user, and every use earns
+the referrer a SIGNUP ledger row in a PENDING/CREDITED/REVOKED mix. The
+derived tables (balances, referral counters) are filled from the result.
+
+Synthetic codes use the SYN- prefix so they never collide with SVH- codes
+the app issues later. Only an empty database is accepted, and the app's
+own DATABASE_URL only with --force.
+
+Usage:
+    python synthetic_data.py --database-url sqlite:///./load.db --users 1000000 --referrals 3000000 --seed 42
+    python synthetic_data.py --database-url sqlite:///./load.db --users 100000 --used-ratio 0.4
+"""
+import argparse
+import random
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import DateTime, create_engine, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import Base
+from app.core.referral_codes import CODE_SPACE, format_code
+from app.crud.balance import backfill_balances
+from app.crud.referral_stats import backfill_referral_stats
+from app.models.models import User, Referral, RewardConfig, RewardLedger
+
+BATCH_SIZE = 50000
+
+STATUSES = ("PENDING", "CREDITED", "REVOKED")
+DEFAULT_STATUS_WEIGHTS = (0.3, 0.6, 0.1)
+
+REWARD_CONFIGS = [
+    {"reward_type": "SIGNUP", "reward_value": 100, "reward_unit": "points"},
+    {"reward_type": "CONVERSION", "reward_value": 500, "reward_unit": "points"},
+    {"reward_type": "PREMIUM_SIGNUP", "reward_value": 1000, "reward_unit": "points"},
+]
+
+USER_COLUMNS = ("id", "username")
+REFERRAL_COLUMNS = ("id", "referral_code", "referred_by", "referred_user_id", "used_at", "created_at")
+LEDGER_COLUMNS = ("user_id", "referral_id", "reward_type", "reward_value", "reward_unit",
+                  "status", "created_at", "credited_at")
+
+# Tables loaded with explicit ids, whose PostgreSQL sequences need moving after
+SEQUENCED_TABLES = (User.__table__, Referral.__table__)
+
+# Coprime with CODE_SPACE, so index -> index * stride spreads codes over the
+# whole space without repeats
+CODE_STRIDE = 7_919_993
+
+def synthetic_code(index: int) -> str:
+    return "SYN-" + format_code(index * CODE_STRIDE % CODE_SPACE)[4:]
+
+def _insert_rows(conn, table, columns: tuple, rows: list) -> None:
+    """
+    executemany a Core insert() of `columns` with rows given as tuples.
+    On SQLite the statement is compiled once and fed to the driver with
+    datetimes pre-rendered as ISO strings (the format SQLAlchemy stores
+    and parses), skipping per-row parameter processing; other dialects
+    take the regular path.
+    """
+    if conn.dialect.name != "sqlite":
+        conn.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+        return
+    compiled = insert(table).compile(dialect=conn.dialect, column_keys=list(columns))
+    order = [columns.index(name) for name in compiled.positiontup]
+    datetimes = [order.index(i) for i, name in enumerate(columns) if isinstance(table.c[name].type, DateTime)]
+    params = []
+    for row in rows:
+        row = [row[i] for i in order]
+        for i in datetimes:
+            if row[i] is not None:
+                row[i] = row[i].isoformat(" ")
+        params.append(tuple(row))
+    conn.exec_driver_sql(compiled.string, params)
+
+def _batches(rows, size: int = BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _referrers(rng: random.Random, users: int, referrals: int, alpha: float):
+    """Owner of each referral id: one code per user, then Zipf-distributed extras"""
+    yield from range(1, users + 1)
+    extra = referrals - users
+    if extra <= 0:
+        return
+    # Rank 1 is the heaviest referrer; ranks map to shuffled user ids
+    ranked = list(range(1, users + 1))
+    rng.shuffle(ranked)
+    cum_weights = list(accumulate(1 / rank ** alpha for rank in range(1, users + 1)))
+    while extra > 0:
+        size = min(extra, BATCH_SIZE)
+        yield from rng.choices(ranked, cum_weights=cum_weights, k=size)
+        extra -= size
+
+def generate(engine, users: int, referrals: int, used_ratio: float = 0.5, alpha: float = 1.1,
+             status_weights=DEFAULT_STATUS_WEIGHTS, days: int = 365, seed: int = 42,
+             now: datetime = None) -> dict:
+    """Fill an empty database; returns row counts per table"""
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    referrals = max(referrals, users)
+    Base.metadata.create_all(bind=engine)
+
+    config = next(c for c in REWARD_CONFIGS if c["reward_type"] == "SIGNUP")
+    # Each user can be referred once, and never by themselves
+    referred_pool = deque(rng.sample(range(1, users + 1), users))
+    counts = {"users": users, "referrals": referrals, "used": 0, "reward_ledger": 0}
+    status_cum_weights = list(accumulate(status_weights))
+
+    def referral_rows():
+        for referral_id, referrer in enumerate(_referrers(rng, users, referrals, alpha), start=1):
+            created_at = now - timedelta(seconds=rng.uniform(0, days * 86400))
+            referred, used_at = None, None
+            if referred_pool and rng.random() < used_ratio:
+                referred = referred_pool.popleft()
+                if referred == referrer:
+                    referred_pool.append(referred)
+                    referred = None
+                else:
+                    used_at = min(now, created_at + timedelta(days=rng.expovariate(1 / 3)))
+            yield (referral_id, synthetic_code(referral_id), referrer, referred, used_at, created_at)
+
+    def ledger_rows(batch):
+        for referral_id, _, referrer, referred, used_at, _ in batch:
+            if referred is None:
+                continue
+            status = rng.choices(STATUSES, cum_weights=status_cum_weights)[0]
+            credited_at = used_at + timedelta(hours=rng.uniform(1, 72)) if status == "CREDITED" else None
+            yield (referrer, referral_id, config["reward_type"], config["reward_value"],
+                   config["reward_unit"], status, used_at, credited_at)
+
+    indexed_tables = (Referral.__table__, RewardLedger.__table__)
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(User.__table__)).scalar():
+            raise ValueError("Refusing to generate into a database that already has users")
+        if engine.dialect.name == "sqlite":
+            # Bulk load only: a crash leaves a database to delete, not to recover
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            conn.exec_driver_sql("PRAGMA journal_mode=MEMORY")
+        conn.commit()
+
+        # Building secondary indexes once at the end beats updating them per
+        # row; they are put back even when the load fails part-way
+        try:
+            for table in indexed_tables:
+                for index in table.indexes:
+                    index.drop(conn, checkfirst=True)
+            conn.commit()
+
+            for batch in _batches((i, f"user{i}") for i in range(1, users + 1)):
+                _insert_rows(conn, User.__table__, USER_COLUMNS, batch)
+                conn.commit()
+            for batch in _batches(referral_rows()):
+                _insert_rows(conn, Referral.__table__, REFERRAL_COLUMNS, batch)
+                rewards = list(ledger_rows(batch))
+                if rewards:
+                    _insert_rows(conn, RewardLedger.__table__, LEDGER_COLUMNS, rewards)
+                conn.commit()
+                counts["reward_ledger"] += len(rewards)
+            counts["used"] = counts["reward_ledger"]
+        finally:
+            conn.rollback()
+            for table in indexed_tables:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+            conn.commit()
+
+        conn.execute(insert(RewardConfig.__table__), REWARD_CONFIGS)
+        if engine.dialect.name == "postgresql":
+            # Explicit ids don't advance the serial sequences; move them past
+            # the loaded rows so the app's next insert doesn't collide
+            for table in SEQUENCED_TABLES:
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), MAX(id)) FROM {table.name}"
+                ))
+        conn.commit()
+        # Same rebuild the app runs on startup for tables it finds empty
+        with Session(bind=conn) as db:
+            backfill_balances(db)
+            backfill_referral_stats(db)
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("ANALYZE")
+            conn.commit()
+    return counts
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--force", action="store_true", help="allow loading into the app's DATABASE_URL")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--referrals", type=int, default=0, help="total referral codes (at least one per user)")
+    parser.add_argument("--used-ratio", type=float, default=0.5, help="share of codes that have been used")
+    parser.add_argument("--alpha", type=float, default=1.1, help="Zipf exponent of the referrer distribution")
+    parser.add_argument("--status-weights", default="0.3,0.6,0.1", help="PENDING,CREDITED,REVOKED weights")
+    parser.add_argument("--days", type=int, default=365, help="spread of created_at into the past")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--now", type=datetime.fromisoformat, help="anchor timestamp, for byte-identical reruns")
+    args = parser.parse_args()
+    if args.database_url == settings.DATABASE_URL and not args.force:
+        print(
+            f"Refusing to load into the app's database ({settings.DATABASE_URL}); "
+            "pass --database-url, or --force to use it anyway", file=sys.stderr
+        )
+        return 2
+
+    engine = create_engine(args.database_url)
+    started = time.perf_counter()
+    try:
+        counts = generate(
+            engine, args.users, args.referrals, args.used_ratio, args.alpha,
+            tuple(float(w) for w in args.status_weights.split(",")), args.days, args.seed, args.now
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        engine.dispose()
+    elapsed = time.perf_counter() - started
+
+    rows = counts["users"] + counts["referrals"] + counts["reward_ledger"]
+    print(
+        f"{counts['users']:,} users, {counts['referrals']:,} referrals ({counts['used']:,} used), "
+        f"{counts['reward_ledger']:,} ledger rows in {elapsed:.1f} s ({rows / elapsed:,.0f} rows/s)"
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
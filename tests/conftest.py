@@ -0,0 +1,56 @@
+# tests/conftest.py
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.main import app
+from app.core.config import settings
+from app.core.database import Base, get_db
+from app.core.rate_limit import rate_limiter
+from app.crud.admin import dashboard_snapshot
+from app.crud.referral import leaderboard
+from app.crud.referral_graph import referral_graph
+from app.crud.reward_config import reward_config_cache
+from app.crud.user import username_cache
+
+@pytest.fixture(autouse=True, scope="session")
+def no_startup_tasks():
+    """`with TestClient(app)` runs the startup hooks; keep them off the real DATABASE_URL"""
+    enabled = settings.STARTUP_TASKS_ENABLED
+    settings.STARTUP_TASKS_ENABLED = False
+    yield
+    settings.STARTUP_TASKS_ENABLED = enabled
+
+@pytest.fixture
+def isolated_db():
+    """Fresh in-memory database wired into get_db for the duration of a test"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = TestingSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    dashboard_snapshot.invalidate()
+    leaderboard.invalidate()
+    referral_graph.invalidate()
+    reward_config_cache.invalidate()
+    username_cache.clear()
+    rate_limiter.store.clear()
+    yield engine, TestingSession
+    app.dependency_overrides.pop(get_db, None)
+    dashboard_snapshot.invalidate()
+    leaderboard.invalidate()
+    referral_graph.invalidate()
+    reward_config_cache.invalidate()
+    username_cache.clear()
+    engine.dispose()
@@ -0,0 +1,118 @@
+# tests/test_admin.py
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.models.models import User, Referral, RewardLedger
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+
+@pytest.fixture
+def client(isolated_db):
+    engine, Session = isolated_db
+    db = Session()
+    db.add_all([User(id=1, username="Alice"), User(id=2, username="Bob")])
+    db.flush()
+    db.add_all([
+        Referral(id=1, referral_code="SVH-AA11AA", referred_by=1, referred_user_id=2),
+        Referral(id=2, referral_code="SVH-BB22BB", referred_by=2),
+    ])
+    db.flush()
+    db.add_all([
+        RewardLedger(id=1, user_id=1, referral_id=1, reward_type="SIGNUP", reward_value=100, status="PENDING"),
+        RewardLedger(id=2, user_id=1, reward_type="SIGNUP", reward_value=250, status="CREDITED"),
+    ])
+    db.commit()
+    db.close()
+    return TestClient(app)
+
+def test_dashboard_stats(client):
+    data = client.get("/api/admin/dashboard", headers=ADMIN).json()
+
+    assert data["total_users"] == 2
+    assert data["total_referrals"] == 2
+    assert data["successful_referrals"] == 1
+    assert data["conversion_rate"] == "50.0%"
+    assert data["total_rewards"] == 2
+    assert data["pending_rewards"] == 1
+    assert data["credited_rewards"] == 1
+    assert data["total_reward_value"] == 250
+    assert data["snapshot_age_seconds"] >= 0
+
+def test_dashboard_served_from_snapshot(client, isolated_db):
+    engine, _ = isolated_db
+    client.get("/api/admin/dashboard", headers=ADMIN)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        data = client.get("/api/admin/dashboard", headers=ADMIN).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert statements == []
+    assert data["total_users"] == 2
+
+def test_credit_invalidates_dashboard_snapshot(client):
+    client.get("/api/admin/dashboard", headers=ADMIN)
+
+    response = client.post("/api/rewards/admin/rewards/1/credit", headers=ADMIN)
+    assert response.status_code == 200
+
+    data = client.get("/api/admin/dashboard", headers=ADMIN).json()
+    assert data["pending_rewards"] == 0
+    assert data["credited_rewards"] == 2
+    assert data["total_reward_value"] == 350
+
+def test_activity_series_is_bucketed_and_zero_filled(isolated_db):
+    _, Session = isolated_db
+    now = datetime.now()
+    two_days_ago, yesterday = now - timedelta(days=2), now - timedelta(days=1)
+    db = Session()
+    db.add_all([User(id=1, username="Alice"), User(id=2, username="Bob"), User(id=3, username="Cara")])
+    db.flush()
+    db.add_all([
+        Referral(id=1, referral_code="SVH-AA11AA", referred_by=1, referred_user_id=2,
+                 created_at=two_days_ago, used_at=yesterday),
+        Referral(id=2, referral_code="SVH-BB22BB", referred_by=2, created_at=two_days_ago),
+        Referral(id=3, referral_code="SVH-CC33CC", referred_by=3, created_at=now - timedelta(days=40)),
+    ])
+    db.flush()
+    db.add(RewardLedger(user_id=1, referral_id=1, reward_type="SIGNUP", reward_value=100,
+                        status="PENDING", created_at=yesterday))
+    db.commit()
+    db.close()
+
+    response = TestClient(app).get(
+        "/api/admin/analytics/daily", params={"days": 7, "granularity": "day"}, headers=ADMIN
+    )
+
+    assert response.status_code == 200
+    series = {point["date"]: point for point in response.json()}
+    assert len(series) == 8
+    assert series[two_days_ago.strftime("%Y-%m-%d")]["created"] == 2
+    assert series[yesterday.strftime("%Y-%m-%d")]["used"] == 1
+    assert series[yesterday.strftime("%Y-%m-%d")]["rewarded"] == 1
+    assert sum(point["created"] for point in series.values()) == 2
+
+@pytest.mark.parametrize("granularity, buckets", [("hour", 48), ("week", 1)])
+def test_activity_series_granularity(isolated_db, granularity, buckets):
+    response = TestClient(app).get(
+        "/api/admin/analytics/daily", params={"days": 2, "granularity": granularity}, headers=ADMIN
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()) >= buckets
+
+def test_db_diagnostics_report_pool_and_pragmas():
+    response = TestClient(app).get("/api/admin/diagnostics/db", headers=ADMIN)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["pool"]["pool_class"] == "QueuePool"
+    assert data["pool"]["size"] == 10
+    assert data["sqlite_pragmas"]["journal_mode"] == "wal"
+    assert data["sqlite_pragmas"]["synchronous"] == 1  # NORMAL
+    assert data["sqlite_pragmas"]["busy_timeout"] == 5000
@@ -0,0 +1,63 @@
+# tests/test_async_db.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.core.database import Base, get_db
+from app.crud.admin import dashboard_snapshot
+from app.models.models import RewardConfig
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+
+@pytest.fixture
+def async_client(tmp_path):
+    """Routes served from an AsyncSession (aiosqlite) on a scratch database"""
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as conn:
+        conn.execute(RewardConfig.__table__.insert(), {"reward_type": "SIGNUP", "reward_value": 100, "reward_unit": "points", "is_active": True})
+    sync_engine.dispose()
+
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    dashboard_snapshot.invalidate()
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.pop(get_db, None)
+    dashboard_snapshot.invalidate()
+
+def test_referral_flow_on_async_session(async_client):
+    code = async_client.post("/api/referral/generate", params={"user_id": "Alice"}).json()["referral_code"]
+
+    applied = async_client.post(
+        "/api/referral/apply", params={"user_id": "Bob"}, json={"referral_code": code},
+        headers={"Idempotency-Key": "async-1"}
+    )
+    assert applied.status_code == 200
+
+    summary = async_client.get("/api/referral/analytics/summary", params={"user_id": "Alice"}).json()
+    assert summary["successful_referrals"] == 1
+    rewards = async_client.get("/api/rewards/summary", params={"user_id": "Alice"}).json()
+    assert rewards["pending"] == 100
+
+    history = async_client.get("/api/rewards/history", params={"user_id": "Alice"}).json()
+    credited = async_client.post(f"/api/rewards/admin/rewards/{history[0]['id']}/credit", headers=ADMIN)
+    assert credited.status_code == 200
+
+    dashboard = async_client.get("/api/admin/dashboard", headers=ADMIN).json()
+    assert dashboard["credited_rewards"] == 1
+    assert dashboard["total_reward_value"] == 100
+
+def test_errors_surface_on_async_session(async_client):
+    response = async_client.post("/api/referral/apply", params={"user_id": "Bob"}, json={"referral_code": "SVH-NOPE00"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid referral code"
@@ -0,0 +1,122 @@
+# tests/test_balances.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.core.database import Base
+from app.crud.balance import adjust_balances, backfill_balances, reconcile_balances, transition_delta
+from app.crud.reward import bulk_credit_rewards, revoke_reward
+from app.models.models import User, Referral, RewardConfig, RewardLedger, UserRewardBalance
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+
+@pytest.fixture
+def client(isolated_db):
+    _, Session = isolated_db
+    db = Session()
+    db.add_all([User(id=1, username="Alice"), User(id=2, username="Bob")])
+    db.flush()
+    db.add_all(Referral(referral_code=f"SVH-AA{i:02d}AA", referred_by=1) for i in range(3))
+    db.add(RewardConfig(reward_type="SIGNUP", reward_value=100, reward_unit="points"))
+    db.commit()
+    db.close()
+    return TestClient(app)
+
+def summary(client):
+    return client.get("/api/rewards/summary", params={"user_id": "Alice"}).json()
+
+def ledger_ids(isolated_db):
+    _, Session = isolated_db
+    db = Session()
+    ids = [r.id for r in db.query(RewardLedger).order_by(RewardLedger.id)]
+    db.close()
+    return ids
+
+def test_balances_follow_every_write_path(client, isolated_db):
+    client.post("/api/referral/apply", params={"user_id": "Bob"}, json={"referral_code": "SVH-AA00AA"})
+    client.post("/api/referral/apply/bulk", json={"items": [
+        {"user_id": "Cara", "referral_code": "SVH-AA01AA"},
+        {"user_id": "Dan", "referral_code": "SVH-AA02AA"},
+    ]})
+    assert summary(client) == {"total_earned": 300, "pending": 300, "credited": 0, "unit": "points"}
+
+    first, second, third = ledger_ids(isolated_db)
+    client.post(f"/api/rewards/admin/rewards/{first}/credit", headers=ADMIN)
+    client.post(f"/api/rewards/admin/rewards/{second}/revoke", headers=ADMIN)
+    assert summary(client) == {"total_earned": 200, "pending": 100, "credited": 100, "unit": "points"}
+
+    client.post("/api/rewards/admin/rewards/bulk-credit", json={"ids": [third]}, headers=ADMIN)
+    client.post("/api/rewards/admin/rewards/bulk-revoke", json={"ids": [first], "status": "CREDITED"}, headers=ADMIN)
+    assert summary(client) == {"total_earned": 100, "pending": 0, "credited": 100, "unit": "points"}
+
+    _, Session = isolated_db
+    db = Session()
+    assert reconcile_balances(db)["drift_count"] == 0
+    db.close()
+
+def test_reconcile_reports_and_fixes_drift(client, isolated_db):
+    client.post("/api/referral/apply", params={"user_id": "Bob"}, json={"referral_code": "SVH-AA00AA"})
+    _, Session = isolated_db
+    db = Session()
+    db.query(UserRewardBalance).update({"pending": 999})
+    db.commit()
+
+    report = reconcile_balances(db)
+    assert report["drift_count"] == 1
+    assert report["drifted"][0]["expected"]["pending"] == 100
+    assert report["drifted"][0]["actual"]["pending"] == 999
+    assert not report["fixed"]
+
+    assert reconcile_balances(db, fix=True)["fixed"]
+    assert reconcile_balances(db)["drift_count"] == 0
+    db.close()
+    assert summary(client)["pending"] == 100
+
+def test_empty_balances_table_falls_back_to_ledger_and_backfills(client, isolated_db):
+    client.post("/api/referral/apply", params={"user_id": "Bob"}, json={"referral_code": "SVH-AA00AA"})
+    _, Session = isolated_db
+    db = Session()
+    # As on a database that predates the table: ledger rows, no balances
+    db.query(UserRewardBalance).delete()
+    db.commit()
+    assert summary(client) == {"total_earned": 100, "pending": 100, "credited": 0, "unit": "points"}
+
+    assert backfill_balances(db)
+    assert not backfill_balances(db)
+    assert reconcile_balances(db)["drift_count"] == 0
+    db.close()
+
+def test_unknown_user_summary_is_zero(client):
+    response = client.get("/api/rewards/summary", params={"user_id": "Nobody"})
+    assert response.json() == {"total_earned": 0, "pending": 0, "credited": 0, "unit": "points"}
+
+def test_revoke_racing_a_credit_applies_one_delta(tmp_path):
+    """The auto-credit worker credits the reward between revoke's read and its first write"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(User(id=1, username="Alice"))
+    db.add(RewardLedger(id=1, user_id=1, reward_type="SIGNUP", reward_value=100, reward_unit="points"))
+    adjust_balances(db, [transition_delta(1, "points", 100, None, "PENDING")])
+    db.commit()
+
+    raced = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def credit_first(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith(("UPDATE", "INSERT")) and not raced:
+            raced.append(True)
+            worker = Session()
+            assert bulk_credit_rewards(worker, ids=[1])["transitioned"] == [1]
+            worker.close()
+
+    revoke_reward(db, 1)
+
+    assert db.query(RewardLedger.status).scalar() == "REVOKED"
+    balance = db.query(UserRewardBalance).one()
+    assert (balance.pending, balance.credited, balance.revoked) == (0, 0, 100)
+    assert reconcile_balances(db)["drift_count"] == 0
+    db.close()
+    engine.dispose()
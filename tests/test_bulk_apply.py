@@ -0,0 +1,84 @@
+# tests/test_bulk_apply.py
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.crud import referral as referral_crud
+from app.crud.user import username_cache
+from app.models.models import User, Referral, RewardLedger, RewardConfig
+
+@pytest.fixture
+def client(isolated_db):
+    _, Session = isolated_db
+    db = Session()
+    db.add_all([User(id=1, username="Alice"), User(id=2, username="Bob"), User(id=3, username="Cara")])
+    db.flush()
+    db.add_all([
+        Referral(referral_code="SVH-AA11AA", referred_by=1),
+        Referral(referral_code="SVH-BB22BB", referred_by=2),
+        Referral(referral_code="SVH-CC33CC", referred_by=3, referred_user_id=2),
+        Referral(referral_code="SVH-DD44DD", referred_by=3),
+    ])
+    db.add(RewardConfig(reward_type="SIGNUP", reward_value=100, reward_unit="points"))
+    db.commit()
+    db.close()
+    return TestClient(app)
+
+def test_bulk_apply_reports_each_item(client, isolated_db):
+    items = [
+        {"user_id": "Dan", "referral_code": "SVH-AA11AA"},    # new user, success
+        {"user_id": "Eve", "referral_code": "SVH-AA11AA"},    # same code again in batch
+        {"user_id": "Alice", "referral_code": "SVH-AA11AA"},  # own code
+        {"user_id": "Bob", "referral_code": "SVH-DD44DD"},    # Bob already referred
+        {"user_id": "Fay", "referral_code": "SVH-NOPE00"},    # unknown code
+        {"user_id": "Dan", "referral_code": "SVH-BB22BB"},    # Dan used one earlier in batch
+        {"user_id": "Eve", "referral_code": "SVH-BB22BB"},    # success
+    ]
+
+    response = client.post("/api/referral/apply/bulk", json={"items": items})
+
+    assert response.status_code == 200
+    assert [(r["status"], r["message"]) for r in response.json()] == [
+        ("success", "Referral code applied successfully"),
+        ("error", "Referral code already used"),
+        ("error", "Cannot use your own referral code"),
+        ("error", "You have already used a referral code"),
+        ("error", "Invalid referral code"),
+        ("error", "You have already used a referral code"),
+        ("success", "Referral code applied successfully"),
+    ]
+
+    _, Session = isolated_db
+    db = Session()
+    assert {u.username for u in db.query(User)} >= {"Dan", "Eve", "Fay"}
+    rewards = db.query(RewardLedger).order_by(RewardLedger.user_id).all()
+    assert [(r.user_id, r.reward_value, r.status) for r in rewards] == [(1, 100, "PENDING"), (2, 100, "PENDING")]
+    db.close()
+
+def test_bulk_apply_matches_single_apply_afterwards(client):
+    client.post("/api/referral/apply/bulk", json={"items": [{"user_id": "Dan", "referral_code": "SVH-AA11AA"}]})
+
+    response = client.post("/api/referral/apply", params={"user_id": "Eve"}, json={"referral_code": "SVH-AA11AA"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Referral code already used"
+
+def test_claim_returns_only_referrals_still_unused(client, isolated_db):
+    _, Session = isolated_db
+    db = Session()
+    claimed = referral_crud._claim_referrals(db, [
+        {"referral_id": 1, "referred_id": 2, "referrer_id": 1},
+        {"referral_id": 3, "referred_id": 1, "referrer_id": 3},  # used by Bob already
+    ], datetime.now())
+
+    assert claimed == {1}
+    assert [r.referred_user_id for r in db.query(Referral).order_by(Referral.id)] == [2, None, 2, None]
+    db.close()
+
+def test_bulk_apply_replaces_negative_cache_entries(client):
+    assert client.get("/api/rewards/summary", params={"user_id": "Dan"}).json()["total_earned"] == 0
+    assert username_cache.get("Dan") is None
+
+    client.post("/api/referral/apply/bulk", json={"items": [{"user_id": "Dan", "referral_code": "SVH-AA11AA"}]})
+
+    assert username_cache.get("Dan") == 4
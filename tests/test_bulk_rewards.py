@@ -0,0 +1,65 @@
+# tests/test_bulk_rewards.py
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.models import User, RewardLedger
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+
+@pytest.fixture
+def client(isolated_db):
+    _, Session = isolated_db
+    now = datetime.now()
+    db = Session()
+    db.add(User(id=1, username="Alice"))
+    db.flush()
+    db.add_all([
+        RewardLedger(id=1, user_id=1, reward_type="SIGNUP", reward_value=100, status="PENDING", created_at=now - timedelta(days=2)),
+        RewardLedger(id=2, user_id=1, reward_type="SIGNUP", reward_value=100, status="PENDING", created_at=now),
+        RewardLedger(id=3, user_id=1, reward_type="CONVERSION", reward_value=500, status="PENDING", created_at=now),
+        RewardLedger(id=4, user_id=1, reward_type="SIGNUP", reward_value=100, status="CREDITED", created_at=now),
+    ])
+    db.commit()
+    db.close()
+    return TestClient(app)
+
+def statuses(isolated_db):
+    _, Session = isolated_db
+    db = Session()
+    result = {r.id: r.status for r in db.query(RewardLedger)}
+    db.close()
+    return result
+
+def test_bulk_credit_by_ids_reports_skipped(client, isolated_db):
+    response = client.post("/api/rewards/admin/rewards/bulk-credit", json={"ids": [1, 2, 4, 99]}, headers=ADMIN)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["transitioned"] == [1, 2]
+    assert data["skipped"] == [4, 99]
+    assert statuses(isolated_db) == {1: "CREDITED", 2: "CREDITED", 3: "PENDING", 4: "CREDITED"}
+
+def test_bulk_credit_by_filter(client, isolated_db):
+    created_from = (datetime.now() - timedelta(days=1)).isoformat()
+    response = client.post(
+        "/api/rewards/admin/rewards/bulk-credit",
+        json={"reward_type": "SIGNUP", "created_from": created_from},
+        headers=ADMIN
+    )
+
+    assert response.json()["transitioned"] == [2]
+    assert statuses(isolated_db)[1] == "PENDING"
+
+def test_bulk_revoke_credited(client, isolated_db):
+    response = client.post(
+        "/api/rewards/admin/rewards/bulk-revoke", json={"ids": [1, 4], "status": "CREDITED"}, headers=ADMIN
+    )
+
+    assert response.json()["transitioned"] == [4]
+    assert response.json()["skipped"] == [1]
+    assert statuses(isolated_db)[4] == "REVOKED"
+
+def test_bulk_action_needs_a_selection(client):
+    response = client.post("/api/rewards/admin/rewards/bulk-revoke", json={}, headers=ADMIN)
+    assert response.status_code == 400
@@ -0,0 +1,91 @@
+# tests/test_concurrency.py
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.core.database import Base, get_db
+from app.core.rate_limit import rate_limiter
+from app.crud.referral import apply_referral_code
+from app.crud.referral_stats import reconcile_referral_stats
+from app.models.models import User, Referral, RewardConfig, RewardLedger, RewardOutbox
+
+THREADS = 16
+REQUESTS_PER_THREAD = 20
+
+@pytest.fixture
+def file_db(tmp_path):
+    """File-backed SQLite so every thread gets its own connection"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'concurrency.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield Session
+    app.dependency_overrides.pop(get_db, None)
+    engine.dispose()
+
+def test_concurrent_first_requests_create_each_user_once(file_db, monkeypatch):
+    # One client IP sending 320 requests in a burst; this is about races, not throttling
+    monkeypatch.setattr(rate_limiter, "enabled", False)
+    client = TestClient(app)
+
+    def burst(thread: int):
+        statuses = []
+        for i in range(REQUESTS_PER_THREAD):
+            # Half the usernames are shared by every thread, half are unique
+            username = f"shared{i}" if i % 2 else f"user{thread}-{i}"
+            response = client.post("/api/referral/generate", params={"user_id": username})
+            statuses.append(response.status_code)
+        return statuses
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        statuses = [status for result in pool.map(burst, range(THREADS)) for status in result]
+
+    assert statuses == [200] * (THREADS * REQUESTS_PER_THREAD)
+    db = file_db()
+    shared = REQUESTS_PER_THREAD // 2
+    unique = THREADS * (REQUESTS_PER_THREAD - shared)
+    assert db.query(func.count(User.id)).scalar() == shared + unique
+    assert db.query(func.count(func.distinct(User.username))).scalar() == shared + unique
+    assert db.query(func.count(Referral.id)).scalar() == shared + unique
+    db.close()
+
+def test_concurrent_applies_of_one_code_pay_out_once(file_db):
+    """Another apply of the same code commits between this one's checks and its claim"""
+    db = file_db()
+    db.add_all([User(id=1, username="Alice"), User(id=2, username="Bob")])
+    db.add(Referral(referral_code="SVH-AA00AA", referred_by=1))
+    db.add(RewardConfig(reward_type="SIGNUP", reward_value=100, reward_unit="points"))
+    db.commit()
+    reconcile_referral_stats(db, fix=True)
+
+    raced = []
+
+    @event.listens_for(db.get_bind(), "before_cursor_execute")
+    def apply_first(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith(("UPDATE", "INSERT")) and not raced:
+            raced.append(True)
+            other = file_db()
+            assert apply_referral_code(other, "Cara", "SVH-AA00AA")["status"] == "success"
+            other.close()
+
+    with pytest.raises(ValueError, match="already used"):
+        apply_referral_code(db, "Bob", "SVH-AA00AA")
+
+    assert db.query(func.count(RewardLedger.id)).scalar() == 1
+    assert db.query(func.count(RewardOutbox.id)).scalar() == 1
+    assert db.query(Referral.referred_user_id).scalar() == db.query(User.id).filter_by(username="Cara").scalar()
+    assert reconcile_referral_stats(db)["drift_count"] == 0
+    db.close()
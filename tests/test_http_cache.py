@@ -0,0 +1,66 @@
+# tests/test_http_cache.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.models.models import RewardConfig, RewardLedger
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+
+ROUTES = [
+    "/api/rewards/summary",
+    "/api/rewards/history",
+    "/api/referral/analytics/summary",
+    "/api/referral/analytics/list",
+]
+
+@pytest.fixture
+def client(isolated_db):
+    _, Session = isolated_db
+    db = Session()
+    db.add(RewardConfig(reward_type="SIGNUP", reward_value=100, reward_unit="points"))
+    db.commit()
+    db.close()
+    client = TestClient(app)
+    client.post("/api/referral/generate", params={"user_id": "Alice"})
+    return client
+
+@pytest.mark.parametrize("url", ROUTES)
+def test_conditional_get_returns_304_after_one_lookup(client, isolated_db, url):
+    engine, _ = isolated_db
+    first = client.get(url, params={"user_id": "Alice"})
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        again = client.get(url, params={"user_id": "Alice"}, headers={"If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert len(statements) == 1
+
+def test_writes_change_the_etag(client, isolated_db):
+    def etag():
+        return client.get("/api/rewards/summary", params={"user_id": "Alice"}).headers["etag"]
+
+    seen = [etag()]
+    code = client.get("/api/referral/analytics/summary", params={"user_id": "Alice"}).json()["my_referral_code"]
+    client.post("/api/referral/apply", params={"user_id": "Bob"}, json={"referral_code": code})
+    seen.append(etag())
+
+    _, Session = isolated_db
+    db = Session()
+    reward_id = db.query(RewardLedger.id).scalar()
+    db.close()
+    client.post(f"/api/rewards/admin/rewards/{reward_id}/credit", headers=ADMIN)
+    seen.append(etag())
+    client.post("/api/rewards/admin/rewards/bulk-revoke", json={"ids": [reward_id], "status": "CREDITED"}, headers=ADMIN)
+    seen.append(etag())
+
+    assert len(set(seen)) == 4
+    response = client.get("/api/rewards/summary", params={"user_id": "Alice"}, headers={"If-None-Match": seen[-2]})
+    assert response.status_code == 200
@@ -0,0 +1,107 @@
+# tests/test_idempotency.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.core import idempotency
+from app.core.config import settings
+from app.models.models import RewardConfig, RewardLedger, User
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+
+@pytest.fixture
+def client(isolated_db):
+    _, Session = isolated_db
+    db = Session()
+    db.add(RewardConfig(reward_type="SIGNUP", reward_value=100, reward_unit="points"))
+    db.commit()
+    db.close()
+    return TestClient(app)
+
+def apply(client, code, key, user="Bob"):
+    return client.post(
+        "/api/referral/apply", params={"user_id": user}, json={"referral_code": code},
+        headers={"Idempotency-Key": key}
+    )
+
+def test_retried_apply_replays_first_response_without_touching_referrals(client, isolated_db):
+    engine, _ = isolated_db
+    code = client.post("/api/referral/generate", params={"user_id": "Alice"}).json()["referral_code"]
+    first = apply(client, code, "retry-1")
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        second = apply(client, code, "retry-1")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert (second.status_code, second.json()) == (200, first.json())
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert statements and all("idempotency_keys" in statement for statement in statements)
+
+    # Without the key the retry runs again and fails
+    assert client.post(
+        "/api/referral/apply", params={"user_id": "Bob"}, json={"referral_code": code}
+    ).status_code == 400
+
+def test_client_errors_replay_and_key_reuse_is_rejected(client, isolated_db):
+    first = apply(client, "SVH-NOPE00", "bad-code")
+    second = apply(client, "SVH-NOPE00", "bad-code")
+    assert first.status_code == second.status_code == 400
+    assert second.json() == first.json() == {"detail": "Invalid referral code"}
+    assert apply(client, "SVH-OTHER0", "bad-code").status_code == 422
+
+    # What the failed request committed (creating Bob) is kept with its response
+    _, Session = isolated_db
+    db = Session()
+    assert db.query(User.username).all() == [("Bob",)]
+    db.close()
+
+def test_retried_credit_and_expired_keys(client, isolated_db, monkeypatch):
+    _, Session = isolated_db
+    code = client.post("/api/referral/generate", params={"user_id": "Alice"}).json()["referral_code"]
+    apply(client, code, "apply-1")
+    db = Session()
+    reward_id = db.query(RewardLedger.id).one()[0]
+    db.close()
+
+    url = f"/api/rewards/admin/rewards/{reward_id}/credit"
+    headers = {**ADMIN, "Idempotency-Key": "credit-1"}
+    assert client.post(url, headers=headers).json()["status"] == "success"
+    replay = client.post(url, headers=headers)
+    assert replay.status_code == 200 and replay.headers["Idempotent-Replayed"] == "true"
+
+    # Same client key on another endpoint is a different request
+    revoke = client.post(f"/api/rewards/admin/rewards/{reward_id}/revoke", headers=headers)
+    assert "Idempotent-Replayed" not in revoke.headers
+
+    monkeypatch.setattr(settings, "IDEMPOTENCY_TTL_SECONDS", -1)
+    client.post(url, headers={**ADMIN, "Idempotency-Key": "credit-2"})
+    assert "Idempotent-Replayed" not in client.post(url, headers={**ADMIN, "Idempotency-Key": "credit-2"}).headers
+
+def test_keys_are_per_user(client):
+    alice = client.post("/api/referral/generate", params={"user_id": "Alice"}).json()["referral_code"]
+    cara = client.post("/api/referral/generate", params={"user_id": "Cara"}).json()["referral_code"]
+    assert apply(client, alice, "signup", user="Bob").status_code == 200
+    second = apply(client, cara, "signup", user="Dan")
+    assert second.status_code == 200 and "Idempotent-Replayed" not in second.headers
+
+def test_writes_commit_only_with_the_stored_response(client, isolated_db, monkeypatch):
+    code = client.post("/api/referral/generate", params={"user_id": "Alice"}).json()["referral_code"]
+
+    def crash(*args):
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(idempotency, "complete_key", crash)
+    with pytest.raises(RuntimeError):
+        apply(client, code, "crash-1")
+
+    _, Session = isolated_db
+    db = Session()
+    assert db.query(RewardLedger).count() == 0
+    db.close()
+    monkeypatch.undo()
+    assert apply(client, code, "crash-2", user="Cara").status_code == 200
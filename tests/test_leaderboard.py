@@ -0,0 +1,112 @@
+# tests/test_leaderboard.py
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.core.leaderboard import Leaderboard, RankedCounts
+from app.crud.referral import leaderboard
+from app.models.models import User, Referral
+
+def test_ranked_counts_top_and_rank():
+    counts = RankedCounts()
+    for key in ["a", "b", "b", "c", "c", "c", "d"]:
+        counts.add(key)
+    assert counts.top(3) == [("c", 3), ("b", 2), ("a", 1)]
+    assert counts.rank("d") == (3, 1)
+    counts.add("c", -3)
+    assert counts.rank("c") is None
+    assert counts.top(10) == [("b", 2), ("a", 1), ("d", 1)]
+
+def test_windows_expire_old_events():
+    board = Leaderboard(windows_days=(7,), max_age_seconds=60)
+    now = datetime.now()
+    board.load([(1, 2), (2, 1)], [(now - timedelta(days=10), 1), (now - timedelta(days=1), 2)])
+    board.record(1, now)
+    assert board.top(5) == [(1, 3), (2, 1)]
+    assert board.top(5, window_days=7) == [(2, 1), (1, 1)]
+
+def test_rebuild_replays_records_made_during_its_query():
+    board = Leaderboard(windows_days=(7,), max_age_seconds=60)
+    now = datetime.now()
+    board.load([(1, 1)], [(now, 1)])
+    assert board.begin_load()
+    assert not board.begin_load()   # one rebuild at a time
+
+    # The first apply is in the rebuild's snapshot, the second isn't
+    seen, missed = now + timedelta(seconds=1), now + timedelta(seconds=2)
+    board.record(2, seen)
+    board.record(2, missed)
+    assert board.top(5) == [(2, 2), (1, 1)]
+    board.load([(1, 1), (2, 1)], [(now, 1), (seen, 2)])
+
+    assert board.top(5) == [(2, 2), (1, 1)]
+    assert board.top(5, window_days=7) == [(2, 2), (1, 1)]
+    assert board.wait_loaded(0)
+
+def seed(Session):
+    db = Session()
+    db.add_all(User(id=i, username=f"user{i}") for i in range(1, 6))
+    db.flush()
+    old = datetime.now() - timedelta(days=20)
+    db.add_all([
+        Referral(referral_code="SVH-AA01AA", referred_by=1, referred_user_id=2, used_at=old),
+        Referral(referral_code="SVH-AA02AA", referred_by=1, referred_user_id=3, used_at=old),
+        Referral(referral_code="SVH-AA03AA", referred_by=2, referred_user_id=4, used_at=datetime.now()),
+        Referral(referral_code="SVH-AA04AA", referred_by=2),
+        Referral(referral_code="SVH-AA05AA", referred_by=2),
+    ])
+    db.commit()
+    db.close()
+
+def test_apply_updates_boards_without_queries(isolated_db):
+    engine, Session = isolated_db
+    seed(Session)
+    client = TestClient(app)
+    assert client.get("/api/referral/admin/top").json() == [
+        {"user_id": "user1", "successful_referrals": 2},
+        {"user_id": "user2", "successful_referrals": 1},
+    ]
+
+    client.post("/api/referral/apply", params={"user_id": "user5"}, json={"referral_code": "SVH-AA04AA"})
+    client.post("/api/referral/apply/bulk", json={"items": [{"user_id": "new", "referral_code": "SVH-AA05AA"}]})
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        top = client.get("/api/referral/admin/top", params={"limit": 1}).json()
+        week = client.get("/api/referral/admin/top", params={"window_days": 7}).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert top == [{"user_id": "user2", "successful_referrals": 3}]
+    assert week == [{"user_id": "user2", "successful_referrals": 3}]
+    assert statements == []
+
+    rank = client.get("/api/referral/analytics/rank", params={"user_id": "user1"}).json()
+    assert (rank["rank"], rank["successful_referrals"]) == (2, 2)
+    rank = client.get("/api/referral/analytics/rank", params={"user_id": "user1", "window_days": 30}).json()
+    assert (rank["rank"], rank["successful_referrals"]) == (2, 2)
+    rank = client.get("/api/referral/analytics/rank", params={"user_id": "user1", "window_days": 7}).json()
+    assert (rank["rank"], rank["successful_referrals"]) == (None, 0)
+
+def test_unsupported_window_is_rejected(isolated_db):
+    response = TestClient(app).get("/api/referral/admin/top", params={"window_days": 3})
+    assert response.status_code == 400
+
+def test_stale_board_is_rebuilt_by_one_request(isolated_db, monkeypatch):
+    engine, Session = isolated_db
+    seed(Session)
+    client = TestClient(app)
+    before = client.get("/api/referral/admin/top").json()
+
+    monkeypatch.setattr(leaderboard, "max_age_seconds", 0)
+    assert leaderboard.begin_load()   # another request is rebuilding
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/api/referral/admin/top").json() == before
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+        leaderboard.cancel_load()
+    assert not any("GROUP BY" in statement for statement in statements)
@@ -0,0 +1,42 @@
+# tests/test_metrics.py
+import logging
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core import metrics
+from app.core.config import settings
+
+def series(text: str, name: str, route: str) -> dict:
+    """{metric line prefix: value} for one route's series of a histogram"""
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line.startswith(name) and f'route="{route}"' in line
+    }
+
+def test_metrics_count_latency_and_sql_per_route(isolated_db):
+    engine, _ = isolated_db
+    metrics.instrument_engine(engine)
+    client = TestClient(app)
+    client.post("/api/referral/generate", params={"user_id": "Alice"})
+    for _ in range(2):
+        client.get("/api/referral/analytics/list", params={"user_id": "Alice"})
+    client.get("/no/such/route")
+
+    text = client.get("/metrics").text
+    route = "/api/referral/analytics/list"
+    duration = series(text, "http_request_duration_seconds_count", route)
+    statements = series(text, "http_request_sql_statements_sum", route)
+    assert sum(duration.values()) >= 2
+    assert sum(statements.values()) >= 2
+    assert f'route="{metrics.UNMATCHED_ROUTE}"' in text
+    assert "http_requests_in_progress 1" in text
+
+def test_slow_requests_log_their_sql(isolated_db, monkeypatch, caplog):
+    engine, _ = isolated_db
+    metrics.instrument_engine(engine)
+    monkeypatch.setattr(settings, "SLOW_REQUEST_SECONDS", 0.0)
+    with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+        TestClient(app).get("/api/rewards/history", params={"user_id": "Nobody"})
+    message = caplog.records[-1].getMessage()
+    assert "slow request GET /api/rewards/history -> 200" in message
+    assert "FROM users" in message
@@ -0,0 +1,93 @@
+# tests/test_outbox.py
+import threading
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import settings
+from app.crud.balance import reconcile_balances
+from app.crud.outbox import claim_batch, drain_once, get_outbox_stats
+from app.crud.referral import leaderboard
+from app.models.models import RewardConfig, RewardLedger, RewardOutbox
+
+@pytest.fixture
+def client(isolated_db, monkeypatch):
+    monkeypatch.setattr(settings, "AUTO_CREDIT_HOLD_SECONDS", 0)
+    _, Session = isolated_db
+    db = Session()
+    db.add(RewardConfig(reward_type="SIGNUP", reward_value=100, reward_unit="points"))
+    db.commit()
+    db.close()
+    return TestClient(app)
+
+def refer(client, referrer, referred):
+    code = client.post("/api/referral/generate", params={"user_id": referrer}).json()["referral_code"]
+    response = client.post("/api/referral/apply", params={"user_id": referred}, json={"referral_code": code})
+    assert response.status_code == 200
+
+def statuses(Session):
+    db = Session()
+    try:
+        return sorted(status for (status,) in db.query(RewardLedger.status))
+    finally:
+        db.close()
+
+def test_apply_queues_reward_and_worker_credits_it(client, isolated_db):
+    _, Session = isolated_db
+    refer(client, "Alice", "Bob")
+    client.post("/api/referral/apply/bulk", json={"items": [
+        {"user_id": "Dan", "referral_code": client.post(
+            "/api/referral/generate", params={"user_id": "Cara"}
+        ).json()["referral_code"]},
+    ]})
+    db = Session()
+    assert get_outbox_stats(db)["queued"] == 2
+    assert statuses(Session) == ["PENDING", "PENDING"]
+
+    assert drain_once(db, "test") == 2
+    assert drain_once(db, "test") == 0
+    assert statuses(Session) == ["CREDITED", "CREDITED"]
+    assert get_outbox_stats(db)["queued"] == 0
+    assert reconcile_balances(db)["drift_count"] == 0
+    db.close()
+    assert client.get("/api/rewards/summary", params={"user_id": "Alice"}).json()["credited"] == 100
+
+def test_rules_hold_large_and_skip_revoked_rewards(client, isolated_db, monkeypatch):
+    _, Session = isolated_db
+    refer(client, "Alice", "Bob")
+    refer(client, "Cara", "Dan")
+    db = Session()
+    revoked = db.query(RewardLedger.id).order_by(RewardLedger.id).first()[0]
+    client.post(f"/api/rewards/admin/rewards/{revoked}/revoke", headers={"Authorization": "Bearer admin-token"})
+    monkeypatch.setattr(settings, "AUTO_CREDIT_MAX_VALUE", 50)
+
+    assert drain_once(db, "test") == 2
+    assert statuses(Session) == ["PENDING", "REVOKED"]
+    assert db.query(RewardOutbox).count() == 0
+    db.close()
+
+def test_hold_period_and_leases(client, isolated_db, monkeypatch):
+    _, Session = isolated_db
+    monkeypatch.setattr(settings, "AUTO_CREDIT_HOLD_SECONDS", 3600)
+    for i in range(3):
+        refer(client, f"Referrer{i}", f"Referred{i}")
+    db = Session()
+    assert claim_batch(db, "a") == []
+
+    later = datetime.now() + timedelta(hours=2)
+    first = claim_batch(db, "a", limit=2, now=later)
+    second = claim_batch(db, "b", limit=2, now=later)
+    assert len(first) == 2 and len(second) == 1
+    assert not {row.id for row in first} & {row.id for row in second}
+
+    # Nobody finished: once the leases run out the events are claimable again
+    expired = later + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS + 1)
+    assert len(claim_batch(db, "c", now=expired)) == 3
+    stats = get_outbox_stats(db)
+    assert (stats["queued"], stats["dead"]) == (3, 0)
+    db.close()
+
+def test_startup_hooks_leave_the_app_database_alone(isolated_db):
+    with TestClient(app):
+        assert not [thread for thread in threading.enumerate() if thread.name.startswith("outbox-")]
+        assert leaderboard.is_stale()
@@ -0,0 +1,106 @@
+# tests/test_pagination.py
+import json
+from datetime import datetime
+from typing import List
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from app.main import app
+from app.crud import referral as referral_crud
+from app.crud import reward as reward_crud
+from app.models.models import User, Referral, RewardLedger
+from app.schemas.referral import ReferralListItem
+from app.schemas.reward import RewardHistoryItem
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+ROWS = 25
+
+@pytest.fixture
+def seeded(isolated_db):
+    """ROWS used referrals and PENDING rewards for 'Owner', all sharing one created_at second"""
+    engine, Session = isolated_db
+    db = Session()
+    db.add(User(id=1, username="Owner"))
+    db.add_all(User(id=i + 2, username=f"Friend{i}") for i in range(ROWS))
+    db.flush()
+    db.add_all(
+        Referral(referral_code=f"SVH-P{i:05d}", referred_by=1, referred_user_id=i + 2, used_at=datetime(2026, 3, 1))
+        for i in range(ROWS)
+    )
+    db.add_all(
+        RewardLedger(user_id=1, reward_type="SIGNUP", reward_value=100, reward_unit="points", status="PENDING")
+        for _ in range(ROWS)
+    )
+    db.commit()
+    db.close()
+    return TestClient(app)
+
+ENDPOINTS = [
+    ("/api/rewards/history", {"user_id": "Owner"}, None),
+    ("/api/referral/analytics/list", {"user_id": "Owner"}, None),
+    ("/api/rewards/admin/pending", {}, ADMIN),
+]
+# A field unique per row in each endpoint's body (list items carry no id,
+# but every seeded code was used by a different user)
+ROW_KEYS = ["id", "used_by_user_id", "id"]
+
+@pytest.mark.parametrize("url, params, headers, key", [
+    endpoint + (key,) for endpoint, key in zip(ENDPOINTS, ROW_KEYS)
+])
+def test_cursor_walks_every_row_once(seeded, url, params, headers, key):
+    pages, cursor = [], None
+    while True:
+        page_params = dict(params, limit=7)
+        if cursor:
+            page_params["cursor"] = cursor
+        response = seeded.get(url, params=page_params, headers=headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert [len(page) for page in pages] == [7, 7, 7, 4]
+    keys = [row[key] for page in pages for row in page]
+    assert len(set(keys)) == ROWS
+
+@pytest.mark.parametrize("url, params, headers", ENDPOINTS)
+def test_stream_returns_ndjson(seeded, url, params, headers):
+    response = seeded.get(url, params=dict(params, stream=True), headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == ROWS
+
+def test_list_bodies_match_response_models(isolated_db):
+    """The orjson path emits what Pydantic serialization of the same rows would"""
+    engine, Session = isolated_db
+    db = Session()
+    db.add_all([User(id=1, username="Owner"), User(id=2, username="Friend")])
+    db.flush()
+    db.add_all([
+        Referral(referral_code="SVH-F00001", referred_by=1, referred_user_id=2,
+                 used_at=datetime(2026, 3, 1, 12, 30, 5, 123456)),
+        Referral(referral_code="SVH-F00002", referred_by=1, created_at=datetime(2026, 3, 2)),
+    ])
+    db.add(RewardLedger(user_id=1, reward_type="SIGNUP", reward_value=100, reward_unit="points",
+                        status="PENDING", created_at=datetime(2026, 3, 1, 12, 30, 6)))
+    db.commit()
+    client = TestClient(app)
+
+    for url, model, rows in (
+        ("/api/referral/analytics/list", ReferralListItem, referral_crud.get_referral_list(db, "Owner")),
+        ("/api/rewards/history", RewardHistoryItem, reward_crud.get_reward_history(db, "Owner")),
+    ):
+        expected = TypeAdapter(List[model]).dump_python(
+            TypeAdapter(List[model]).validate_python([row._asdict() for row in rows]), mode="json"
+        )
+        assert client.get(url, params={"user_id": "Owner"}).json() == expected
+
+    pending = client.get("/api/rewards/admin/pending", headers=ADMIN).json()
+    assert pending == [{
+        "id": 1, "user_id": "Owner", "reward_type": "SIGNUP", "reward_value": 100, "reward_unit": "points",
+        "created_at": "2026-03-01T12:30:06", "referral_id": None
+    }]
+    db.close()
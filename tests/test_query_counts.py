@@ -0,0 +1,80 @@
+# tests/test_query_counts.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.models.models import User, Referral, RewardLedger
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+
+# Upper bound on SQL statements per request, independent of row count
+MAX_STATEMENTS = 3
+
+def seed(Session, rows: int):
+    """'Owner' referred `rows` users; each of those referred the next one"""
+    db = Session()
+    db.add(User(id=1, username="Owner"))
+    db.add_all(User(id=i + 2, username=f"Referred{i}") for i in range(rows))
+    db.flush()
+    for i in range(rows):
+        referrals = [
+            Referral(referral_code=f"SVH-O{i:05d}", referred_by=1, referred_user_id=i + 2),
+            Referral(referral_code=f"SVH-R{i:05d}", referred_by=i + 2,
+                     referred_user_id=(i + 1) % rows + 2),
+        ]
+        db.add_all(referrals)
+        db.flush()
+        db.add_all(
+            RewardLedger(
+                user_id=referral.referred_by,
+                referral_id=referral.id,
+                reward_type="SIGNUP",
+                reward_value=100,
+                reward_unit="points",
+                status="PENDING",
+            )
+            for referral in referrals
+        )
+    db.commit()
+    db.close()
+
+def count_statements(engine, request):
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        response = request()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    assert response.status_code == 200
+    return len(statements), response.json()
+
+@pytest.mark.parametrize("method, url, params, headers", [
+    ("get", "/api/referral/analytics/list", {"user_id": "Owner"}, None),
+    ("get", "/api/referral/admin/top", None, None),
+    ("get", "/api/rewards/admin/pending", None, ADMIN),
+])
+def test_list_endpoints_issue_constant_statements(isolated_db, method, url, params, headers):
+    engine, Session = isolated_db
+    client = TestClient(app)
+    seed(Session, 50)
+
+    count, body = count_statements(
+        engine, lambda: getattr(client, method)(url, params=params, headers=headers)
+    )
+
+    assert len(body) >= 10
+    assert count <= MAX_STATEMENTS, f"{url} issued {count} SQL statements"
+
+def test_referral_list_resolves_usernames(isolated_db):
+    engine, Session = isolated_db
+    seed(Session, 3)
+
+    response = TestClient(app).get("/api/referral/analytics/list", params={"user_id": "Owner"})
+
+    assert response.status_code == 200
+    used_by = sorted(item["used_by_user_id"] for item in response.json())
+    assert used_by == ["Referred0", "Referred1", "Referred2"]
@@ -0,0 +1,89 @@
+# tests/test_rate_limit.py
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.database import get_db
+from app.core.rate_limit import MemoryBucketStore, RateLimiter, RateLimitMiddleware
+
+@pytest.fixture
+def client(isolated_db):
+    return TestClient(app)
+
+def generate(client, user):
+    return client.post("/api/referral/generate", params={"user_id": user})
+
+def test_user_bucket_throttles_without_opening_a_session(client):
+    sessions = []
+    override = app.dependency_overrides[get_db]
+
+    def counting_get_db():
+        sessions.append(1)
+        yield from override()
+
+    app.dependency_overrides[get_db] = counting_get_db
+    assert [generate(client, "Alice").status_code for _ in range(5)] == [200] * 5
+    throttled = generate(client, "Alice")
+    assert throttled.status_code == 429
+    assert int(throttled.headers["Retry-After"]) >= 1
+    assert len(sessions) == 5
+
+    # Other users and unlimited routes are unaffected
+    assert generate(client, "Bob").status_code == 200
+    assert client.get("/api/referral/analytics/summary", params={"user_id": "Alice"}).status_code == 200
+
+def test_ip_bucket_covers_many_users(client):
+    statuses = [generate(client, f"user{i}").status_code for i in range(61)]
+    assert statuses[:60] == [200] * 60
+    assert statuses[60] == 429
+
+def test_buckets_refill_take_all_or_nothing_and_stay_bounded():
+    store = MemoryBucketStore(max_keys=3)
+    user, ip = (("u",), 2, 1.0), (("ip",), 1, 0.5)
+    assert store.acquire([user, ip], now=0) == 0
+    # ip is empty: neither bucket pays, and the wait is ip's refill time
+    assert store.acquire([user, ip], now=0) == pytest.approx(2.0)
+    assert store.acquire([user], now=0) == 0
+    assert store.acquire([user], now=0) == pytest.approx(1.0)
+    assert store.acquire([user, ip], now=2.0) == 0
+
+    for i in range(5):
+        store.acquire([((f"k{i}",), 1, 1.0)], now=3.0)
+    assert store.stats()["buckets"] == 3
+    assert store.stats()["evictions"] == 4
+
+def test_client_ip_comes_from_trusted_proxies_only():
+    limiter = RateLimiter({}, MemoryBucketStore(10), trusted_proxies=["10.0.0.0/8", "192.0.2.7"])
+    assert limiter.client_ip("10.0.0.1", "198.51.100.4") == "198.51.100.4"
+    # Hops added by trusted proxies are skipped; a spoofed leftmost entry is not reached
+    assert limiter.client_ip("10.0.0.1", "1.2.3.4, 198.51.100.4, 192.0.2.7") == "198.51.100.4"
+    assert limiter.client_ip("10.0.0.1", "10.0.0.5") == "10.0.0.5"
+    assert limiter.client_ip("10.0.0.1", None) == "10.0.0.1"
+    # Anyone else's header is ignored
+    assert limiter.client_ip("203.0.113.9", "198.51.100.4") == "203.0.113.9"
+    assert limiter.client_ip("testclient", "198.51.100.4") == "testclient"
+
+def test_ip_bucket_behind_a_proxy_is_per_client():
+    limiter = RateLimiter(
+        {("POST", "/api/referral/generate"): {"ip": (1, 0.001)}}, MemoryBucketStore(10),
+        trusted_proxies=["10.0.0.0/8"]
+    )
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    def status(forwarded_for):
+        scope = {
+            "type": "http", "method": "POST", "path": "/api/referral/generate", "query_string": b"",
+            "client": ("10.0.0.1", 50000), "headers": [(b"x-forwarded-for", forwarded_for.encode())]
+        }
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+        asyncio.run(RateLimitMiddleware(endpoint, limiter)(scope, None, send))
+        return sent[0]["status"]
+
+    assert [status("198.51.100.4"), status("198.51.100.5")] == [200, 200]
+    assert status("198.51.100.4") == 429
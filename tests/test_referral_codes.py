@@ -0,0 +1,35 @@
+# tests/test_referral_codes.py
+import re
+from app.core.referral_codes import CODE_SPACE, code_for_sequence, format_code, permute
+from app.crud.referral import get_or_create_referral_code
+from app.models.models import User, Referral
+
+CODE_PATTERN = re.compile(r"^SVH-[A-Z]{2}\d{2}[A-Z]{2}$")
+
+def test_codes_keep_svh_format():
+    assert format_code(0) == "SVH-AA00AA"
+    assert format_code(CODE_SPACE - 1) == "SVH-ZZ99ZZ"
+    assert all(CODE_PATTERN.match(code_for_sequence(n)) for n in range(1000))
+
+def test_permutation_is_collision_free():
+    sample = [permute(n) for n in range(50000)] + [permute(CODE_SPACE - 1 - n) for n in range(50000)]
+    assert len(set(sample)) == len(sample)
+    assert all(0 <= index < CODE_SPACE for index in sample)
+
+def test_permutation_depends_on_key():
+    assert permute(1, key=b"one") != permute(1, key=b"two")
+
+def test_legacy_code_clash_falls_back(isolated_db):
+    _, Session = isolated_db
+    db = Session()
+    db.add_all([User(id=1, username="Alice"), User(id=2, username="Legacy")])
+    db.flush()
+    db.add(Referral(referral_code=code_for_sequence(1), referred_by=2))
+    db.commit()
+
+    result = get_or_create_referral_code(db, "Alice")
+
+    assert CODE_PATTERN.match(result["referral_code"])
+    assert result["referral_code"] != code_for_sequence(1)
+    assert get_or_create_referral_code(db, "Alice") == result
+    db.close()
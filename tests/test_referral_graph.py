@@ -0,0 +1,98 @@
+# tests/test_referral_graph.py
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import settings
+from app.core.referral_graph import ReferralGraph
+from app.crud.referral_graph import referral_graph
+from app.models.models import Referral, User
+
+USERS = ["A", "B", "C", "D", "E", "F", "G"]
+# referrer -> referred: A -> B -> D -> E, A -> C -> F
+EDGES = [("A", "B"), ("A", "C"), ("B", "D"), ("C", "F"), ("D", "E")]
+
+def add_referrals(Session, edges):
+    db = Session()
+    db.add_all(
+        Referral(
+            referral_code=f"SVH-{referrer}{referred or ''}0000", referred_by=USERS.index(referrer) + 1,
+            referred_user_id=USERS.index(referred) + 1 if referred else None,
+            used_at=datetime(2026, 3, 1) if referred else None
+        )
+        for referrer, referred in edges
+    )
+    db.commit()
+    db.close()
+
+@pytest.fixture
+def client(isolated_db):
+    _, Session = isolated_db
+    db = Session()
+    db.add_all(User(id=i, username=name) for i, name in enumerate(USERS, start=1))
+    db.commit()
+    db.close()
+    add_referrals(Session, EDGES)
+    return TestClient(app)
+
+def downline(client, user, **params):
+    return client.get("/api/referral/analytics/downline", params={"user_id": user, **params}).json()
+
+def chain(client, user):
+    return client.get("/api/referral/analytics/chain", params={"user_id": user}).json()
+
+@pytest.fixture(params=[True, False], ids=["index", "sql"])
+def index_enabled(request, monkeypatch):
+    monkeypatch.setattr(settings, "REFERRAL_GRAPH_INDEX_ENABLED", request.param)
+    return request.param
+
+def test_downline_levels_and_top_branches(client, index_enabled):
+    body = downline(client, "A")
+    assert (body["total"], body["depth_reached"]) == (5, 3)
+    assert body["levels"] == [{"depth": 1, "users": 2}, {"depth": 2, "users": 2}, {"depth": 3, "users": 1}]
+    assert body["top_branches"] == [
+        {"user_id": "B", "subtree_size": 3, "conversions": 2},
+        {"user_id": "C", "subtree_size": 2, "conversions": 1},
+    ]
+    assert downline(client, "A", max_depth=2)["total"] == 4
+    assert downline(client, "Nobody")["total"] == 0
+    assert client.get(
+        "/api/referral/analytics/downline", params={"user_id": "A", "max_depth": 0}
+    ).status_code == 400
+
+def test_chain_and_cycles(isolated_db, client, index_enabled):
+    assert chain(client, "E") == {"user_id": "E", "chain_depth": 3, "upline": ["D", "B", "A"]}
+    assert chain(client, "A")["chain_depth"] == 0
+
+    # A joins through E's code: the walk stops before coming back to A
+    add_referrals(isolated_db[1], [("E", "A")])
+    referral_graph.invalidate()
+    assert chain(client, "A")["upline"] == ["E", "D", "B"]
+    body = downline(client, "A")
+    assert (body["total"], body["depth_reached"]) == (5, 3)
+
+def test_index_follows_applies_without_rebuilding(isolated_db, client, index_enabled):
+    add_referrals(isolated_db[1], [("F", None)])
+    downline(client, "A")
+    response = client.post("/api/referral/apply", params={"user_id": "G"}, json={"referral_code": "SVH-F0000"})
+    assert response.status_code == 200, response.text
+    if index_enabled:
+        assert not referral_graph.is_stale()
+    body = downline(client, "A")
+    assert body["total"] == 6
+    assert body["top_branches"][1] == {"user_id": "C", "subtree_size": 3, "conversions": 2}
+
+def test_rebuild_keeps_edges_recorded_during_its_query():
+    graph = ReferralGraph(300)
+    graph.load([(1, 2)])
+    assert graph.begin_load()
+    assert not graph.begin_load()   # one rebuild at a time
+
+    # Committed after the rebuild's snapshot: the query result lacks it
+    graph.record(2, 3)
+    assert graph.downline(1, 5)[0] == {1: 1, 2: 1}
+    graph.load([(1, 2)])
+
+    assert graph.downline(1, 5)[0] == {1: 1, 2: 1}
+    assert graph.upline(3, 5) == [2, 1]
+    assert graph.stats()["edges"] == 2 and not graph.stats()["rebuilding"]
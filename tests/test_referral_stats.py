@@ -0,0 +1,108 @@
+# tests/test_referral_stats.py
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.crud.referral_stats import backfill_referral_stats, bump_referral_stats, reconcile_referral_stats, stats_delta
+from app.models.models import Referral, User, UserReferralStats
+
+@pytest.fixture
+def client(isolated_db):
+    return TestClient(app)
+
+def summary(client, user="Alice"):
+    return client.get("/api/referral/analytics/summary", params={"user_id": user}).json()
+
+def test_counters_follow_generate_and_apply(client, isolated_db):
+    code = client.post("/api/referral/generate", params={"user_id": "Alice"}).json()["referral_code"]
+    client.post("/api/referral/generate", params={"user_id": "Alice"})
+    body = summary(client)
+    assert body["my_referral_code"] == code
+    assert (body["total_referrals"], body["successful_referrals"], body["conversion_rate"]) == (1, 0, "0.0%")
+
+    client.post("/api/referral/apply", params={"user_id": "Bob"}, json={"referral_code": code})
+    body = summary(client)
+    assert (body["successful_referrals"], body["conversion_rate"]) == (1, "100.0%")
+    assert body["last_used_at"] is not None
+
+    other = client.post("/api/referral/generate", params={"user_id": "Cara"}).json()["referral_code"]
+    client.post("/api/referral/apply/bulk", json={"items": [
+        {"user_id": "Dan", "referral_code": other},
+        {"user_id": "Eve", "referral_code": other},
+    ]})
+    assert summary(client, "Cara")["successful_referrals"] == 1
+
+    _, Session = isolated_db
+    db = Session()
+    assert reconcile_referral_stats(db)["drift_count"] == 0
+    db.close()
+
+def test_summary_reads_version_and_counters_only(client, isolated_db):
+    engine, _ = isolated_db
+    client.post("/api/referral/generate", params={"user_id": "Alice"})
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/api/referral/analytics/summary", params={"user_id": "Alice"}).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    # The ETag's change version, then the counters row
+    assert len(statements) == 2
+
+def test_reconcile_backfills_counters(client, isolated_db):
+    _, Session = isolated_db
+    db = Session()
+    db.add_all([User(id=1, username="Alice"), User(id=2, username="Bob")])
+    db.flush()
+    db.add_all([
+        Referral(referral_code="SVH-AA00AA", referred_by=1, referred_user_id=2),
+        Referral(referral_code="SVH-AA01AA", referred_by=1),
+    ])
+    db.commit()
+
+    report = reconcile_referral_stats(db)
+    assert report["drift_count"] == 1 and not report["fixed"]
+    assert reconcile_referral_stats(db, fix=True)["fixed"]
+    assert reconcile_referral_stats(db)["drift_count"] == 0
+    assert db.query(UserReferralStats.codes_issued).filter_by(user_id=1).scalar() == 2
+    db.close()
+
+    body = summary(client)
+    assert (body["my_referral_code"], body["total_referrals"], body["successful_referrals"]) == ("SVH-AA00AA", 2, 1)
+
+def test_summary_without_counters_row_reads_referrals(client, isolated_db):
+    code = client.post("/api/referral/generate", params={"user_id": "Alice"}).json()["referral_code"]
+    client.post("/api/referral/apply", params={"user_id": "Bob"}, json={"referral_code": code})
+    _, Session = isolated_db
+    db = Session()
+    # As on a database that predates the table: referrals, no counters
+    db.query(UserReferralStats).delete()
+    db.commit()
+    body = summary(client)
+    assert (body["my_referral_code"], body["total_referrals"], body["successful_referrals"]) == (code, 1, 1)
+    assert summary(client, "Bob") == {
+        "my_referral_code": None, "total_referrals": 0, "successful_referrals": 0,
+        "conversion_rate": "0%", "last_used_at": None
+    }
+    assert client.get("/api/referral/analytics/summary", params={"user_id": "Nobody"}).status_code == 200
+
+    assert backfill_referral_stats(db)
+    assert not backfill_referral_stats(db)
+    assert reconcile_referral_stats(db)["drift_count"] == 0
+    db.close()
+
+def test_last_used_at_only_moves_forward(isolated_db):
+    _, Session = isolated_db
+    db = Session()
+    db.add(User(id=1, username="Alice"))
+    db.flush()
+    newer, older = datetime(2026, 3, 2), datetime(2026, 3, 1)
+    for used_at in (newer, older, None):
+        bump_referral_stats(db, [stats_delta(1, codes_used=1, used_at=used_at)])
+    db.commit()
+
+    stats = db.query(UserReferralStats).one()
+    assert (stats.codes_used, stats.last_used_at) == (3, newer)
+    db.close()
@@ -0,0 +1,51 @@
+# tests/test_reward_config_cache.py
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.core.cache import VersionedCache
+from app.crud.reward_config import reward_config_cache
+from app.models.models import Referral, RewardLedger, User
+
+ADMIN = {"Authorization": "Bearer admin-token"}
+
+def test_versioned_cache_checks_version_after_interval():
+    cache = VersionedCache(ttl_seconds=60, check_seconds=0)
+    version, loads = [1], []
+    load = lambda: loads.append(1) or len(loads)
+
+    assert cache.get(lambda: version[0], load) == 1
+    assert cache.get(lambda: version[0], load) == 1
+    version[0] = 2
+    assert cache.get(lambda: version[0], load) == 2
+    assert cache.stats() == {"hits": 1, "misses": 2, "version_checks": 2, "hit_rate": 0.3333}
+
+def test_apply_skips_config_query_and_sees_admin_updates(isolated_db):
+    engine, Session = isolated_db
+    db = Session()
+    db.add(User(id=1, username="Alice"))
+    db.flush()
+    db.add_all(Referral(referral_code=f"SVH-AA{i:02d}AA", referred_by=1) for i in range(3))
+    db.commit()
+    client = TestClient(app)
+    before = reward_config_cache.stats()
+    client.post("/api/rewards/admin/config", params={"reward_type": "SIGNUP", "reward_value": 100}, headers=ADMIN)
+
+    client.post("/api/referral/apply", params={"user_id": "Bob"}, json={"referral_code": "SVH-AA00AA"})
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        client.post("/api/referral/apply", params={"user_id": "Cara"}, json={"referral_code": "SVH-AA01AA"})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert not any("reward_configs" in statement for statement in statements)
+
+    client.post("/api/rewards/admin/config", params={"reward_type": "SIGNUP", "reward_value": 250}, headers=ADMIN)
+    client.post("/api/referral/apply", params={"user_id": "Dan"}, json={"referral_code": "SVH-AA02AA"})
+    db = Session()
+    assert [r.reward_value for r in db.query(RewardLedger).order_by(RewardLedger.id)] == [100, 100, 250]
+    db.close()
+
+    stats = client.get("/api/admin/diagnostics/cache", headers=ADMIN).json()["reward_configs"]
+    assert stats["hits"] > before["hits"]
+    assert stats["misses"] - before["misses"] == 2
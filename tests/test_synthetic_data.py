@@ -0,0 +1,70 @@
+# tests/test_synthetic_data.py
+import sys
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, func, inspect, select
+from sqlalchemy.orm import sessionmaker
+import synthetic_data
+from synthetic_data import generate
+from app.crud.balance import reconcile_balances
+from app.crud.referral_stats import reconcile_referral_stats
+from app.models.models import Referral, RewardLedger
+
+NOW = datetime(2026, 1, 1)
+
+def build(path, **kwargs):
+    engine = create_engine(f"sqlite:///{path}")
+    counts = generate(engine, 500, 1500, used_ratio=0.4, seed=7, now=NOW, **kwargs)
+    return engine, counts
+
+def test_generated_dataset_is_consistent(tmp_path):
+    engine, counts = build(tmp_path / "a.db")
+    assert (counts["users"], counts["referrals"]) == (500, 1500)
+    db = sessionmaker(bind=engine)()
+    try:
+        codes = db.execute(select(func.count(func.distinct(Referral.referral_code)))).scalar()
+        assert codes == 1500
+        referred = db.execute(
+            select(Referral.referred_user_id, Referral.referred_by).where(Referral.referred_user_id.is_not(None))
+        ).all()
+        assert len(referred) == counts["used"] == counts["reward_ledger"]
+        assert len({user for user, _ in referred}) == len(referred)
+        assert all(user != referrer for user, referrer in referred)
+        assert db.execute(select(func.count()).select_from(RewardLedger)).scalar() == counts["reward_ledger"]
+        assert reconcile_balances(db)["drift_count"] == 0
+        assert reconcile_referral_stats(db)["drift_count"] == 0
+    finally:
+        db.close()
+        engine.dispose()
+
+def test_same_seed_reproduces_rows_and_refuses_reuse(tmp_path):
+    first, _ = build(tmp_path / "a.db")
+    second, _ = build(tmp_path / "b.db")
+    query = select(Referral.referral_code, Referral.referred_by, Referral.referred_user_id).order_by(Referral.id)
+    with first.connect() as a, second.connect() as b:
+        assert a.execute(query).all() == b.execute(query).all()
+    with pytest.raises(ValueError):
+        generate(first, 10, 10)
+    first.dispose()
+    second.dispose()
+
+def test_failed_load_restores_indexes(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'a.db'}")
+    insert_rows = synthetic_data._insert_rows
+
+    def fail_on_referrals(conn, table, columns, rows):
+        if table is Referral.__table__:
+            raise RuntimeError("disk full")
+        insert_rows(conn, table, columns, rows)
+
+    monkeypatch.setattr(synthetic_data, "_insert_rows", fail_on_referrals)
+    with pytest.raises(RuntimeError):
+        generate(engine, 50, 100, now=NOW)
+
+    indexes = {index["name"] for table in ("referrals", "reward_ledger") for index in inspect(engine).get_indexes(table)}
+    assert indexes == {index.name for table in (Referral, RewardLedger) for index in table.__table__.indexes}
+    engine.dispose()
+
+def test_cli_refuses_the_app_database_without_force(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["synthetic_data.py", "--users", "10"])
+    assert synthetic_data.main() == 2
@@ -0,0 +1,38 @@
+# tests/test_user_cache.py
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.core.cache import LRUCache, MISSING
+from app.crud.user import username_cache
+
+def test_lru_evicts_least_recently_used_and_expires_negatives():
+    cache = LRUCache(max_size=2, ttl_seconds=60, negative_ttl_seconds=0)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is MISSING
+    cache.put("ghost", None)
+    assert cache.get("ghost") is MISSING
+    stats = cache.stats()
+    assert (stats["evictions"], stats["expirations"], stats["hits"], stats["misses"]) == (2, 1, 1, 2)
+
+def test_reads_resolve_usernames_once(isolated_db):
+    engine, _ = isolated_db
+    client = TestClient(app)
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        for _ in range(3):
+            assert client.get("/api/rewards/summary", params={"user_id": "Nobody"}).json()["pending"] == 0
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(statements) == 1
+    assert username_cache.get("Nobody") is None
+
+    # Creating the user replaces the negative entry
+    created = client.post("/api/referral/generate", params={"user_id": "Nobody"}).json()
+    assert username_cache.get("Nobody") == created["id"]
+    summary = client.get("/api/referral/analytics/summary", params={"user_id": "Nobody"}).json()
+    assert summary["my_referral_code"] == created["referral_code"]